@@ -0,0 +1,87 @@
+"""Overhead of each call of a Python integrand, optimized versus profiling build.
+
+Run from the repository root, after building the extensions in place, with:
+
+    python benchmarks/call_overhead.py [repetitions]
+
+The same integrations are timed with the default (optimized) build of the
+extension and with the instrumented one of :func:`cubature.use_profiling_build`,
+and the time per call of the integrand is printed for:
+
+- a scalar integrand, called once per point through ``Integrand._call``,
+- a vectorized integrand over many small integrals of an
+  :class:`~cubature.Integrator`, one call through ``_vcall`` each.
+
+The integrands do almost nothing, so that the times are those of the
+wrappers and of the integration. The line tracing hooks of the instrumented
+build only cost when a tracing function is installed (``sys.settrace``, as by
+``line_profiler`` or ``coverage``), which is measured too.
+"""
+import sys
+import math
+import time
+
+import cubature
+
+
+def scalar(x):
+    return math.sqrt(x[0])
+
+
+def vectorized(x):
+    return x[:, 0]
+
+
+def tracer(frame, event, arg):
+    return tracer
+
+
+def run_scalar(calls):
+    # the refinement towards the singular derivative at x[0] = 0 goes on
+    # until maxEval, this many calls (give or take a region)
+    cubature.cubature(scalar, 2, 1, [0, 0], [1, 1], relerr=1e-15, abserr=0,
+                      maxEval=calls)
+    return calls
+
+
+def run_vectorized(calls):
+    # a linear integrand converges at the first call of each integral
+    integ = cubature.Integrator(vectorized, 1, 1, vectorized=True)
+    for _ in range(calls):
+        integ.integrate([0], [1])
+    return calls
+
+
+def per_call(run, calls, repetitions, trace):
+    best = float('inf')
+    for _ in range(repetitions):
+        if trace:
+            sys.settrace(tracer)
+        t0 = time.perf_counter()
+        try:
+            n = run(calls)
+        finally:
+            sys.settrace(None)
+        best = min(best, (time.perf_counter() - t0)/n)
+    return best
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cases = [('scalar', run_scalar, 20000),
+             ('vectorized', run_vectorized, 2000)]
+    for trace in (False, True):
+        for name, run, calls in cases:
+            times = []
+            for profiling in (False, True):
+                cubature.use_profiling_build(profiling)
+                times.append(per_call(run, calls, repetitions, trace))
+            cubature.use_profiling_build(False)
+            print('{:10s} {:11s}  optimized {:8.2f} us/call  profiling '
+                  '{:8.2f} us/call  ratio = {:5.2f}'.format(
+                      name, 'with tracer' if trace else 'no tracer',
+                      1e6*times[0], 1e6*times[1], times[1]/times[0]))
+
+
+if __name__ == '__main__':
+    main()
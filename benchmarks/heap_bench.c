@@ -0,0 +1,86 @@
+/* Micro-benchmark of the region priority queue in hcubature.c.
+ *
+ * Compile and run from the repository root with:
+ *
+ *     cc -O2 -Icubature/cpackage benchmarks/heap_bench.c -lm -lpthread \
+ *         -o heap_bench
+ *     ./heap_bench
+ *
+ * For N = 10^5, 10^6 and 10^7 regions it times (1) filling the queue
+ * through heap_push_many in batches, the way the parallel (Gladwell)
+ * iterations of rulecubature do, and (2) refinement cycles that pop the
+ * worst regions and push back twice as many children with smaller errors.
+ */
+
+#include <time.h>
+
+#include "hcubature.c"
+
+static double now(void)
+{
+     return wall_time();
+}
+
+static double rand_key(void)
+{
+     return (double) rand() / RAND_MAX;
+}
+
+static void bench(size_t N, size_t batch)
+{
+     static esterr ee = {0, 0};
+     heap regions = heap_alloc(1, 1, 0);
+     region *R = (region *) malloc(sizeof(region) * 2 * batch);
+     size_t i, k, npush = 0;
+     double t0, t_fill, t_cycle;
+
+     memset(R, 0, sizeof(region) * 2 * batch);
+     for (i = 0; i < 2 * batch; ++i) {
+	  R[i].fdim = 1;
+	  R[i].ee = &ee;
+     }
+
+     t0 = now();
+     while (npush < N) {
+	  size_t nb = N - npush < batch ? N - npush : batch;
+	  for (i = 0; i < nb; ++i) R[i].errmax = rand_key();
+	  if (heap_push_many(&regions, nb, R)) abort();
+	  npush += nb;
+     }
+     t_fill = now() - t0;
+
+     t0 = now();
+     for (k = 0; k < N / batch; ++k) {
+	  for (i = 0; i < batch; ++i) {
+	       region Ri;
+	       Ri.ee = &ee;
+	       heap_pop(&regions, &Ri);
+	       R[2*i] = R[2*i+1] = Ri;
+	       R[2*i].errmax = Ri.errmax * 0.5 * rand_key();
+	       R[2*i+1].errmax = Ri.errmax * 0.5 * rand_key();
+	  }
+	  if (heap_push_many(&regions, 2 * batch, R)) abort();
+     }
+     t_cycle = now() - t0;
+
+     printf("N = %8lu  batch = %6lu  fill: %7.3f s (%6.1f ns/region)"
+	    "  refine: %7.3f s (%6.1f ns/region)  final size = %lu\n",
+	    (unsigned long) N, (unsigned long) batch,
+	    t_fill, 1e9 * t_fill / N,
+	    t_cycle, 1e9 * t_cycle / (3 * (N / batch) * batch),
+	    (unsigned long) regions.n);
+
+     heap_free(&regions);
+     free(R);
+}
+
+int main(void)
+{
+     size_t N;
+     srand(12345);
+     for (N = 100000; N <= 10000000; N *= 10) {
+	  bench(N, 64);
+	  bench(N, N / 100);
+     }
+     return EXIT_SUCCESS;
+}
@@ -0,0 +1,105 @@
+"""Throughput of concurrent integrations versus the number of threads.
+
+Run from the repository root, after building the extensions in place, with:
+
+    python benchmarks/thread_scaling.py [seconds per measurement]
+
+Each thread integrates independent small problems for a fixed time, and the
+total number of integrals per second is printed for 1, 2, 4, ... threads up
+to the number of CPUs (at least 4), for:
+
+- a vectorized Python integrand (one ``cubature()`` call per integral),
+- the same integrand through one ``Integrator`` per thread,
+- a :class:`GridIntegrand`, evaluated in C.
+
+On a free-threaded interpreter (``python3.13t``) all three scale with the
+threads. With the GIL only the ``GridIntegrand`` does, the integration
+releasing the GIL when no Python integrand is involved.
+"""
+import os
+import sys
+import time
+import threading
+
+import numpy as np
+
+from cubature import cubature, Integrator, GridIntegrand
+
+
+def gauss(x, a):
+    return np.exp(-a*np.sum(x**2, axis=1))
+
+
+_axes = [np.linspace(-1, 1, 17)]*3
+_grid = GridIntegrand(np.exp(-np.add.outer(np.add.outer(_axes[0]**2,
+                                                        _axes[1]**2),
+                                           _axes[2]**2)), _axes,
+                      method='cubic')
+
+
+def run_cubature(k):
+    cubature(gauss, 3, 1, [0]*3, [1]*3, args=(1. + k % 7,), vectorized=True,
+             relerr=1e-6)
+
+
+def make_integrator():
+    integ = Integrator(gauss, 3, 1, vectorized=True, relerr=1e-6)
+    return lambda k: integ.integrate([0]*3, [1]*3, args=(1. + k % 7,))
+
+
+def run_grid(k):
+    cubature(_grid, 3, 1, [-1]*3, [0.9 - 0.01*(k % 7)]*3, vectorized=True,
+             relerr=1e-4)
+
+
+def throughput(make_task, nthreads, seconds):
+    counts = [0]*nthreads
+    start = threading.Barrier(nthreads + 1)
+    stop = threading.Event()
+
+    def worker(i):
+        task = make_task()
+        start.wait()
+        k = 0
+        while not stop.is_set():
+            task(k)
+            k += 1
+        counts[i] = k
+
+    threads = [threading.Thread(target=worker, args=(i,))
+               for i in range(nthreads)]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(counts)/(time.perf_counter() - t0)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('Python {}, GIL {}'.format(sys.version.split()[0],
+                                     'enabled' if gil else 'disabled'))
+    ncpu = os.cpu_count() or 1
+    nthreads = [1]
+    while nthreads[-1]*2 <= max(ncpu, 4):
+        nthreads.append(nthreads[-1]*2)
+
+    cases = [('cubature, Python func', lambda: run_cubature),
+             ('Integrator per thread', make_integrator),
+             ('GridIntegrand', lambda: run_grid)]
+    for name, make_task in cases:
+        base = None
+        for n in nthreads:
+            rate = throughput(make_task, n, seconds)
+            base = base or rate
+            print('{:24s} threads = {:3d}  {:9.1f} integrals/s  '
+                  'speedup = {:5.2f}'.format(name, n, rate, rate/base))
+
+
+if __name__ == '__main__':
+    main()
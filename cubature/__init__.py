@@ -27,6 +27,38 @@ See the detailed description below on how to use a vector valued fuction
 
 .. autofunction:: cubature
 
+Many integrals of the same function, e.g. with different limits or `args`,
+are cheaper with:
+
+.. autoclass:: Integrator
+    :members: integrate
+
+Tabulated data can be integrated without Python callbacks using:
+
+.. autoclass:: GridIntegrand
+
+Heavy vectorized integrands can be evaluated in parallel processes with:
+
+.. autoclass:: SharedMemoryPool
+
+The progress of an integration can be recorded and exported as a Chrome trace
+with:
+
+.. autoclass:: Tracer
+
+Compiled extensions can integrate C integrands without the GIL through the
+C-level API declared in ``_cubature.pxd``, see:
+
+.. autofunction:: get_include
+
+The compiled extension also comes in an instrumented build, with the line
+tracing hooks of profilers and coverage tools, selected with:
+
+.. autofunction:: use_profiling_build
+
+The Clenshaw-Curtis rules of the p-adaptive scheme beyond the built-in levels
+are generated by :mod:`cubature.clencurt`.
+
 More Examples
 =============
 
@@ -7,12 +7,58 @@ cdef extern from './cpackage/cubature.h':
         ERROR_L1
         ERROR_LINF
 
+    ctypedef void (*cubature_trace) (void *tdata, size_t iteration,
+                                     size_t npts, size_t nregions, double err)
+
+    ctypedef int (*cubature_clencurt) (void *cdata, unsigned M,
+                                       const double **x, const double **w)
+
+    ctypedef struct cubature_workspace:
+        pass
+
+    cubature_workspace *cubature_workspace_new() nogil
+    void cubature_workspace_free(cubature_workspace *ws) nogil
+
+    ctypedef struct cubature_stats:
+        size_t nspeculative
+        size_t ndiscarded
+
+    ctypedef struct cubature_opts:
+        double timeout
+        unsigned layout
+        cubature_trace trace
+        void *tdata
+        unsigned rule
+        cubature_clencurt clencurt
+        void *cdata
+        const unsigned *nbreaks
+        const double *breaks
+        cubature_workspace *workspace
+        unsigned long long seed
+        size_t neval
+        unsigned storage
+        unsigned split
+        int pipeline
+        cubature_stats *stats
+        double *cell_val
+        double *cell_err
+
+    enum: CUBATURE_DEADLINE_REACHED
+    enum: CUBATURE_POINTS_DIM_MAJOR
+    enum: CUBATURE_VALUES_FDIM_MAJOR
+    enum: CUBATURE_RULE_DEGREE5
+    enum: CUBATURE_RULE_DEGREE3
+    enum: CUBATURE_STORAGE_FLOAT
+
     ctypedef int (*integrand) (unsigned ndim, const double *x, void *fdata,
                                unsigned fdim, double *fval)
 
     ctypedef int (*integrand_v) (unsigned ndim, size_t npt, const double *x,
                                  void *fdata, unsigned fdim, double *fval)
 
+    ctypedef int (*integrand_v32) (unsigned ndim, size_t npt, const float *x,
+                                   void *fdata, unsigned fdim, float *fval)
+
     int hcubature(unsigned fdim, integrand f, void *fdata,
                   unsigned ndim, const double *xmin, const double *xmax,
                   unsigned maxEval, double reqAbsError, double reqRelError,
@@ -47,3 +93,192 @@ cdef extern from './cpackage/cubature.h':
                     double **buf, size_t *nbuf, size_t max_nbuf,
                     double *val, double *err)
 
+
+    int hcubature_opts(unsigned fdim, integrand f, void *fdata,
+                       unsigned ndim, const double *xmin, const double *xmax,
+                       size_t maxEval, double reqAbsError, double reqRelError,
+                       error_norm norm, const cubature_opts *opts,
+                       double *val, double *err) nogil
+
+    int hcubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+                         unsigned ndim, const double *xmin, const double *xmax,
+                         size_t maxEval, double reqAbsError, double reqRelError,
+                         error_norm norm, const cubature_opts *opts,
+                         double *val, double *err) nogil
+
+    int pcubature_opts(unsigned fdim, integrand f, void *fdata,
+                       unsigned ndim, const double *xmin, const double *xmax,
+                       size_t maxEval, double reqAbsError, double reqRelError,
+                       error_norm norm, const cubature_opts *opts,
+                       double *val, double *err) nogil
+
+    int pcubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+                         unsigned ndim, const double *xmin, const double *xmax,
+                         size_t maxEval, double reqAbsError, double reqRelError,
+                         error_norm norm, const cubature_opts *opts,
+                         double *val, double *err) nogil
+
+    int pcubature_v_buf_opts(unsigned fdim, integrand_v f, void *fdata,
+                             unsigned ndim, const double *xmin, const double *xmax,
+                             size_t maxEval, double reqAbsError, double reqRelError,
+                             error_norm norm, const cubature_opts *opts,
+                             unsigned *m,
+                             double **buf, size_t *nbuf, size_t max_nbuf,
+                             double *val, double *err) nogil
+
+    int hcubature_v32_opts(unsigned fdim, integrand_v32 f, void *fdata,
+                           unsigned ndim, const double *xmin, const double *xmax,
+                           size_t maxEval, double reqAbsError, double reqRelError,
+                           error_norm norm, const cubature_opts *opts,
+                           double *val, double *err) nogil
+
+    int pcubature_v32_opts(unsigned fdim, integrand_v32 f, void *fdata,
+                           unsigned ndim, const double *xmin, const double *xmax,
+                           size_t maxEval, double reqAbsError, double reqRelError,
+                           error_norm norm, const cubature_opts *opts,
+                           double *val, double *err) nogil
+
+    int hcubature_simplex_opts(unsigned fdim, integrand f, void *fdata,
+                               unsigned ndim, size_t nsimplex,
+                               const double *vertices,
+                               size_t maxEval, double reqAbsError,
+                               double reqRelError, error_norm norm,
+                               const cubature_opts *opts,
+                               double *val, double *err) nogil
+
+    int hcubature_simplex_v_opts(unsigned fdim, integrand_v f, void *fdata,
+                                 unsigned ndim, size_t nsimplex,
+                                 const double *vertices,
+                                 size_t maxEval, double reqAbsError,
+                                 double reqRelError, error_norm norm,
+                                 const cubature_opts *opts,
+                                 double *val, double *err) nogil
+
+    int vegas_opts(unsigned fdim, integrand f, void *fdata,
+                   unsigned ndim, const double *xmin, const double *xmax,
+                   size_t maxEval, double reqAbsError, double reqRelError,
+                   error_norm norm, const cubature_opts *opts,
+                   double *val, double *err) nogil
+
+    int vegas_v_opts(unsigned fdim, integrand_v f, void *fdata,
+                     unsigned ndim, const double *xmin, const double *xmax,
+                     size_t maxEval, double reqAbsError, double reqRelError,
+                     error_norm norm, const cubature_opts *opts,
+                     double *val, double *err) nogil
+
+    int decubature_opts(unsigned fdim, integrand f, void *fdata,
+                        unsigned ndim, const double *xmin, const double *xmax,
+                        size_t maxEval, double reqAbsError, double reqRelError,
+                        error_norm norm, const cubature_opts *opts,
+                        double *val, double *err) nogil
+
+    int decubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+                          unsigned ndim, const double *xmin,
+                          const double *xmax, size_t maxEval,
+                          double reqAbsError, double reqRelError,
+                          error_norm norm, const cubature_opts *opts,
+                          double *val, double *err) nogil
+
+
+# C-level API for compiled extensions
+#
+# Cython code can integrate a C integrand without creating any Python object
+# by cimporting these functions, e.g.
+#
+#     from cubature._cubature cimport integrand, c_hcubature
+#
+# and compiling with ``include_dirs=[cubature.get_include()]``. They take the
+# same arguments as the *_opts routines of cubature.h: `fdata` is passed
+# through to `f`, `opts` may be NULL, and the results are written to the
+# caller-owned arrays `val` and `err` of length `fdim`. The return value is 0
+# on success, CUBATURE_DEADLINE_REACHED if opts.timeout expired, and nonzero
+# otherwise.
+
+cdef int c_hcubature(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+cdef int c_hcubature_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+cdef int c_pcubature(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+cdef int c_pcubature_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+# `buf` (of length `*nbuf * ndim`, may be NULL with *nbuf == 0) holds the
+# points of one batch and is reallocated with malloc as needed, up to
+# max(max_nbuf, 1) points; the caller frees it, so it can be reused across
+# many integrals. `m[ndim]` holds the starting degrees, 2^(m[i]+1) + 1 points
+# along dimension i, and on return the final ones.
+cdef int c_pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts, unsigned *m,
+        double **buf, size_t *nbuf, size_t max_nbuf,
+        double *val, double *err) noexcept nogil
+
+# single-precision integrands, see the *_v32_opts routines of cubature.h
+cdef int c_hcubature_v32(unsigned fdim, integrand_v32 f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+cdef int c_pcubature_v32(unsigned fdim, integrand_v32 f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+# h-adaptive integration over the union of `nsimplex` simplices, with the
+# `ndim + 1` vertices of each stored one after the other in `vertices`
+cdef int c_hcubature_simplex(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, size_t nsimplex, const double *vertices,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+cdef int c_hcubature_simplex_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, size_t nsimplex, const double *vertices,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+# Monte Carlo integration (VEGAS), reproducible for a given opts.seed
+cdef int c_vegas(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+cdef int c_vegas_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+# double-exponential (tanh-sinh) quadrature, for endpoint singularities
+cdef int c_decubature(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
+
+cdef int c_decubature_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil
@@ -3,14 +3,22 @@
 #cython: cdivision=True
 #cython: nonecheck=False
 #cython: infer_types=False
+#cython: freethreading_compatible=True
 
 from cpython.ref cimport PyObject
+from libc.stdlib cimport malloc, realloc, free
+from libc.string cimport memset
+
+import threading
+from time import perf_counter_ns
 
 import numpy as np
 import cython
 
-from ._cubature cimport (error_norm, integrand, integrand_v, hcubature,
-                         pcubature, hcubature_v, pcubature_v)
+from .clencurt import tables as clencurt_tables
+
+# the declarations of cubature.h come from _cubature.pxd, implicitly
+# cimported (and from _cubature_prof.pxd for the instrumented build)
 
 
 cdef extern from "get_ptr.h":
@@ -20,14 +28,21 @@ cdef extern from "get_ptr.h":
 cdef class Integrand:
     cdef object f, args, kwargs
     cdef unsigned int ndim, fdim
+    cdef bint dim_major
+    cdef object error  # exception raised by f during an integration
+    cdef object tracer  # cubature.tracing.Tracer or None
 
     def __cinit__(self, object f, unsigned ndim, unsigned fdim, object args,
-            object kwargs):
+            object kwargs, bint dim_major=False, object tracer=None):
         self.f = f
+        self.tracer = tracer
         self.ndim = ndim
         self.fdim = fdim
         self.args = args
         self.kwargs = kwargs
+        # vectorized calls take x with shape=(ndim, npts) and return
+        # shape=(fdim, npts), matching the C buffers without transposing
+        self.dim_major = dim_major
 
     def __init__(self, *args, **kwargs):
         if not callable(self.f):
@@ -58,11 +73,20 @@ cdef class Integrand:
         return error
 
     cdef int _vcall(self, unsigned npts, const double *x, double *fval) except -1:
-        cdef double [:, ::1] _x = <double [:npts, :self.ndim]>x
-        cdef double [:, ::1] _f = <double [:npts, :self.fdim]>fval
+        cdef double [:, ::1] _x
+        cdef double [:, ::1] _f
         cdef int error
         cdef unsigned i,j
 
+        if self.dim_major:
+            _x = <double [:self.ndim, :npts]>x
+            _f = <double [:self.fdim, :npts]>fval
+            tmp = self.f(np.asarray(_x), *self.args, **self.kwargs)
+            np.asarray(_f)[...] = tmp
+            return 0
+
+        _x = <double [:npts, :self.ndim]>x
+        _f = <double [:npts, :self.fdim]>fval
         try:
             tmp = self.f(np.asarray(_x), *self.args, **self.kwargs)
             if self.fdim == 1:
@@ -78,6 +102,23 @@ cdef class Integrand:
             raise e
         return error
 
+    cdef int _vcall32(self, size_t npts, const float *x, float *fval) except -1:
+        # as _vcall, in single precision; the output is cast by NumPy
+        cdef const float [:, ::1] _x
+        cdef float [:, ::1] _f
+        if self.dim_major:
+            _x = <const float [:self.ndim, :npts]>x
+            _f = <float [:self.fdim, :npts]>fval
+        else:
+            _x = <const float [:npts, :self.ndim]>x
+            _f = <float [:npts, :self.fdim]>fval
+        tmp = self.f(np.asarray(_x), *self.args, **self.kwargs)
+        if self.fdim == 1 and not self.dim_major:
+            np.asarray(_f)[:, 0] = tmp
+        else:
+            np.asarray(_f)[...] = tmp
+        return 0
+
     def call(self, xval):
         cdef double [:] _xval = np.array(xval, dtype=np.float64)
         cdef double [:] fval = np.zeros((self.fdim,), dtype=np.float64)
@@ -88,8 +129,9 @@ cdef class Integrand:
 
     def vcall(self, xval):
         cdef double [:, ::1] _xval = np.array(xval, dtype=np.float64)
-        cdef unsigned npts = _xval.shape[0]
-        cdef double [:, ::1] fval = np.zeros((npts, self.fdim,), dtype=np.float64)
+        cdef unsigned npts = _xval.shape[1] if self.dim_major else _xval.shape[0]
+        cdef double [:, ::1] fval = np.zeros((self.fdim, npts) if self.dim_major
+                                             else (npts, self.fdim), dtype=np.float64)
         err = self._vcall(npts, &_xval[0,0], &fval[0,0])
         if err != 0:
             raise RuntimeError('error while calling vcall()')
@@ -97,92 +139,867 @@ cdef class Integrand:
 
 
 cdef int integrand_wrapper(unsigned int ndim, double *x, void *fdata,
-        unsigned int fdim, double *fval):
+        unsigned int fdim, double *fval) noexcept:
     cdef Integrand wrapped = <Integrand>fdata;
-    return wrapped._call(x, fval)
+    cdef int ret
+    try:
+        if wrapped.tracer is None:
+            return wrapped._call(x, fval)
+        t0 = perf_counter_ns()
+        ret = wrapped._call(x, fval)
+        wrapped.tracer._integrand(t0, 1)
+        return ret
+    except BaseException as e:
+        # kept to be re-raised once the C routine has returned
+        wrapped.error = e
+        return -1
 
 
 cdef int integrand_wrapper_v(unsigned int ndim, unsigned int npts, double *x,
-        void *fdata, unsigned int fdim, double *fval):
+        void *fdata, unsigned int fdim, double *fval) noexcept:
     cdef Integrand wrapped = <Integrand>fdata;
-    return wrapped._vcall(npts, x, fval)
-
-
-def cubature(callable, unsigned ndim, unsigned fdim, xmin, xmax, str method,
-        double abserr, double relerr, int norm, unsigned maxEval, args=(),
-        kwargs={}):
+    cdef int ret
+    try:
+        if wrapped.tracer is None:
+            return wrapped._vcall(npts, x, fval)
+        t0 = perf_counter_ns()
+        ret = wrapped._vcall(npts, x, fval)
+        wrapped.tracer._integrand(t0, npts)
+        return ret
+    except BaseException as e:
+        wrapped.error = e
+        return -1
+
+
+cdef int integrand_wrapper_v32(unsigned int ndim, size_t npts, const float *x,
+        void *fdata, unsigned int fdim, float *fval) noexcept:
+    cdef Integrand wrapped = <Integrand>fdata;
+    cdef int ret
+    try:
+        if wrapped.tracer is None:
+            return wrapped._vcall32(npts, x, fval)
+        t0 = perf_counter_ns()
+        ret = wrapped._vcall32(npts, x, fval)
+        wrapped.tracer._integrand(t0, npts)
+        return ret
+    except BaseException as e:
+        wrapped.error = e
+        return -1
+
+
+cdef enum:
+    METHOD_HCUBATURE_V
+    METHOD_HCUBATURE
+    METHOD_PCUBATURE_V
+    METHOD_PCUBATURE
+    METHOD_VEGAS_V
+    METHOD_VEGAS
+    METHOD_DECUBATURE_V
+    METHOD_DECUBATURE
+
+_METHODS = {'hcubature_v': METHOD_HCUBATURE_V, 'hcubature': METHOD_HCUBATURE,
+            'pcubature_v': METHOD_PCUBATURE_V, 'pcubature': METHOD_PCUBATURE,
+            'vegas_v': METHOD_VEGAS_V, 'vegas': METHOD_VEGAS,
+            'decubature_v': METHOD_DECUBATURE_V,
+            'decubature': METHOD_DECUBATURE}
+
+
+cdef int _run(int method, integrand f, integrand_v fv, integrand_v32 fv32,
+        void *fdata, unsigned ndim, unsigned fdim, const double *xmin,
+        const double *xmax, size_t nsimplex, const double *vertices,
+        size_t maxEval, double abserr, double relerr, error_norm norm,
+        const cubature_opts *opts, double *val, double *err) noexcept nogil:
+    # the C routine of `method`, see _integrate
+    if nsimplex and method == METHOD_HCUBATURE_V:
+        return hcubature_simplex_v_opts(fdim, fv, fdata, ndim, nsimplex,
+                vertices, maxEval, abserr, relerr, norm, opts, val, err)
+    elif nsimplex:
+        return hcubature_simplex_opts(fdim, f, fdata, ndim, nsimplex,
+                vertices, maxEval, abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_HCUBATURE_V and fv32 != NULL:
+        return hcubature_v32_opts(fdim, fv32, fdata, ndim, xmin, xmax,
+                maxEval, abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_PCUBATURE_V and fv32 != NULL:
+        return pcubature_v32_opts(fdim, fv32, fdata, ndim, xmin, xmax,
+                maxEval, abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_HCUBATURE_V:
+        return hcubature_v_opts(fdim, fv, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_HCUBATURE:
+        return hcubature_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_PCUBATURE_V:
+        return pcubature_v_opts(fdim, fv, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_PCUBATURE:
+        return pcubature_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_VEGAS_V:
+        return vegas_v_opts(fdim, fv, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_VEGAS:
+        return vegas_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_DECUBATURE_V:
+        return decubature_v_opts(fdim, fv, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    elif method == METHOD_DECUBATURE:
+        return decubature_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+                abserr, relerr, norm, opts, val, err)
+    return -1
+
+
+# the integrands as called from the slices, which run without the GIL when
+# the integration does (it keeps the GIL for the Python integrands)
+ctypedef int (*slice_f) (unsigned ndim, const double *x, void *fdata,
+        unsigned fdim, double *fval) noexcept nogil
+ctypedef int (*slice_fv) (unsigned ndim, size_t npt, const double *x,
+        void *fdata, unsigned fdim, double *fval) noexcept nogil
+
+
+cdef struct component_slice:
+    # the components lo..lo+n-1 of the fdim ones of the integrand f/fv, for
+    # the chunks of components integrated separately; all of them are
+    # evaluated into buf, of nbuf values, grown for larger batches and freed
+    # by _integrate
+    slice_f f
+    slice_fv fv
+    void *fdata
+    unsigned fdim
+    unsigned lo
+    bint fdim_major  # layout of the values of fv
+    double *buf
+    size_t nbuf
+
+
+cdef double *slice_buf(component_slice *s, size_t n) noexcept nogil:
+    cdef double *nbuf_ptr
+    if n > s.nbuf:
+        nbuf_ptr = <double *>realloc(s.buf, sizeof(double) * n)
+        if nbuf_ptr == NULL:
+            return NULL
+        s.buf = nbuf_ptr
+        s.nbuf = n
+    return s.buf
+
+
+cdef int slice_integrand(unsigned ndim, const double *x, void *fdata,
+        unsigned n, double *fval) noexcept nogil:
+    cdef component_slice *s = <component_slice *>fdata
+    cdef double *buf = slice_buf(s, s.fdim)
+    cdef unsigned k
+    cdef int ret
+    if buf == NULL:
+        return -1
+    ret = s.f(ndim, x, s.fdata, s.fdim, buf)
+    for k in range(n):
+        fval[k] = buf[s.lo + k]
+    return ret
+
+
+cdef int slice_integrand_v(unsigned ndim, size_t npts, const double *x,
+        void *fdata, unsigned n, double *fval) noexcept nogil:
+    cdef component_slice *s = <component_slice *>fdata
+    cdef double *buf = slice_buf(s, s.fdim * npts)
+    cdef size_t i
+    cdef unsigned k
+    cdef int ret
+    if buf == NULL:
+        return -1
+    ret = s.fv(ndim, npts, x, s.fdata, s.fdim, buf)
+    if s.fdim_major:
+        for k in range(n):
+            for i in range(npts):
+                fval[k * npts + i] = buf[(s.lo + k) * npts + i]
+    else:
+        for i in range(npts):
+            for k in range(n):
+                fval[i * n + k] = buf[i * s.fdim + s.lo + k]
+    return ret
+
+
+cdef object _integrate(integrand f, integrand_v fv, void *fdata,
+        unsigned ndim, unsigned fdim, xmin, xmax, str method, double abserr,
+        double relerr, int norm, unsigned maxEval, const cubature_opts *opts,
+        Integrand wrapper=None, tracer=None, integrand_v32 fv32=NULL,
+        simplices=None, components=None):
+    # f and fv are the scalar and vectorized forms of the same integrand,
+    # the one matching `method` is used, or fv32 if not NULL for the
+    # vectorized methods; exceptions raised by a wrapped Python integrand
+    # are propagated. With `simplices`, of shape (nsimplex, ndim + 1, ndim),
+    # the domain is their union instead of [xmin, xmax]. Without a Python
+    # `wrapper` the integration runs without the GIL, so that compiled
+    # integrands run in parallel from several threads. With `components`,
+    # a range(lo, hi) of the fdim components, only these are integrated
+    # (fdim being that of the integrand). With opts.pipeline, the counts of
+    # the pipeline are added to the returned info
+
+    cdef component_slice sl
+    sl.buf = NULL
+    cdef cubature_opts o
+    cdef cubature_stats stats
+    if opts.pipeline:
+        o = opts[0]
+        stats.nspeculative = stats.ndiscarded = 0
+        o.stats = &stats
+        opts = &o
+    if components is not None and components != range(fdim):
+        if fv32 != NULL:
+            raise ValueError('components do not apply to float32 integrands')
+        if not (0 <= components.start < components.stop <= fdim
+                and components.step == 1):
+            raise ValueError('invalid range of components')
+        # the slices call f/fv in the same state of the GIL as _run would:
+        # held for a Python wrapper, released otherwise, for the compiled
+        # integrands that do not need it; hence the cast through void *
+        sl.f = <slice_f><void *>f
+        sl.fv = <slice_fv><void *>fv
+        sl.fdata = fdata
+        sl.fdim = fdim
+        sl.lo = components.start
+        sl.fdim_major = (opts.layout & CUBATURE_VALUES_FDIM_MAJOR) != 0
+        sl.nbuf = 0
+        f = <integrand>slice_integrand
+        fv = <integrand_v>slice_integrand_v
+        fdata = <void *>&sl
+        fdim = len(components)
 
     cdef double [:] _xmin = np.array(xmin, dtype=np.float64)
     cdef double [:] _xmax = np.array(xmax, dtype=np.float64)
 
     cdef double [:] val = np.empty((fdim,), dtype=np.float64)
     cdef double [:] err = np.empty((fdim,), dtype=np.float64)
+    cdef int m, error
 
-    wrapper = Integrand(callable, ndim, fdim, args, kwargs)
-
-    if method == 'hcubature_v':
-        error = hcubature_v(fdim, <integrand_v>integrand_wrapper_v,
-                <void *> wrapper, ndim, &_xmin[0], &_xmax[0], maxEval, abserr,
-                relerr, <error_norm> norm, &val[0], &err[0])
-
-    elif method == 'hcubature':
-        error = hcubature(fdim, <integrand>integrand_wrapper, <void *> wrapper,
-                ndim, &_xmin[0], &_xmax[0], maxEval, abserr, relerr,
-                <error_norm> norm, &val[0], &err[0])
-
-    elif method == 'pcubature_v':
-        error = pcubature_v(fdim, <integrand_v>integrand_wrapper_v,
-                <void *> wrapper, ndim, &_xmin[0], &_xmax[0], maxEval, abserr,
-                relerr, <error_norm> norm, &val[0], &err[0])
-
-    elif method == 'pcubature':
-        error = pcubature(fdim, <integrand>integrand_wrapper, <void *> wrapper,
-                ndim, &_xmin[0], &_xmax[0], maxEval, abserr, relerr,
-                <error_norm> norm, &val[0], &err[0])
-
-    else:
+    if method not in _METHODS:
         raise ValueError('unknown integration method `{!s}`'.format(method))
+    m = _METHODS[method]
+
+    cdef double [::1] _v
+    cdef const double *vertices = NULL
+    cdef size_t nsimplex = 0
+    if simplices is not None:
+        if method not in ('hcubature_v', 'hcubature') or fv32 != NULL:
+            raise ValueError('simplices only apply to hcubature and '
+                             'hcubature_v')
+        _v = np.ascontiguousarray(simplices, dtype=np.float64).ravel()
+        nsimplex = _v.shape[0] // ((ndim + 1) * ndim)
+        if (ndim == 0 or nsimplex == 0
+                or <size_t>_v.shape[0] != nsimplex*(ndim + 1)*ndim):
+            raise ValueError('simplices must have shape (n, ndim + 1, ndim)')
+        vertices = &_v[0]
+
+    if tracer is not None:
+        t0 = tracer._begin()
+
+    try:
+        if wrapper is None:
+            with nogil:
+                error = _run(m, f, fv, fv32, fdata, ndim, fdim, &_xmin[0],
+                        &_xmax[0], nsimplex, vertices, maxEval, abserr,
+                        relerr, <error_norm> norm, opts, &val[0], &err[0])
+        else:
+            error = _run(m, f, fv, fv32, fdata, ndim, fdim, &_xmin[0],
+                    &_xmax[0], nsimplex, vertices, maxEval, abserr, relerr,
+                    <error_norm> norm, opts, &val[0], &err[0])
+    finally:
+        free(sl.buf)
+
+    if error == CUBATURE_DEADLINE_REACHED:
+        status = 'deadline reached'
+    elif error != 0:
+        status = 'failure'
+    else:
+        status = 'success'
+
+    if tracer is not None:
+        tracer._end(t0, {'method': method, 'ndim': ndim, 'fdim': fdim,
+                         'status': status})
 
-    if error != 0:
+    if status == 'failure':
+        if wrapper is not None and wrapper.error is not None:
+            raise wrapper.error
         raise RuntimeError('integration failed')
 
-    return np.asarray(val), np.asarray(err)
+    info = {'status': status}
+    if opts.pipeline:
+        info['speculative'] = stats.nspeculative
+        info['discarded'] = stats.ndiscarded
+    return np.asarray(val), np.asarray(err), info
+
+
+cdef void trace_wrapper(void *tdata, size_t iteration, size_t npts,
+        size_t nregions, double err) noexcept with gil:
+    try:
+        (<object>tdata)._iteration(iteration, npts, nregions, err)
+    except BaseException:
+        # a broken tracer must not abort the integration
+        pass
+
+
+cdef int clencurt_wrapper(void *cdata, unsigned M, const double **x,
+        const double **w) noexcept with gil:
+    # the arrays are cached by cubature.clencurt for the life of the process
+    cdef const double [::1] _x, _w
+    try:
+        _x, _w = clencurt_tables(M)
+    except BaseException:
+        return -1
+    x[0] = &_x[0]
+    w[0] = &_w[0]
+    return 0
+
+
+cdef void _init_opts(cubature_opts *opts, double timeout, str layout,
+        object tracer=None, str rule='default'):
+    # tracer must stay referenced by the caller during the integration
+    memset(opts, 0, sizeof(cubature_opts))
+    opts.timeout = timeout
+    opts.clencurt = clencurt_wrapper
+    if tracer is not None:
+        opts.trace = trace_wrapper
+        opts.tdata = <void *> tracer
+    if layout == 'dim-major':
+        opts.layout = CUBATURE_POINTS_DIM_MAJOR | CUBATURE_VALUES_FDIM_MAJOR
+    elif layout != 'point-major':
+        raise ValueError('unknown layout `{!s}`'.format(layout))
+    if rule == 'degree5':
+        opts.rule = CUBATURE_RULE_DEGREE5
+    elif rule == 'degree3':
+        opts.rule = CUBATURE_RULE_DEGREE3
+    elif rule != 'default':
+        raise ValueError('unknown rule `{!s}`'.format(rule))
+
+
+cdef object _set_breaks(cubature_opts *opts, breaks):
+    # breaks holds the breakpoints of each dimension; returns the arrays
+    # opts points to, which must stay referenced by the caller during the
+    # integration
+    if breaks is None or not any(len(b) for b in breaks):
+        return None
+    cdef unsigned [::1] _nb = np.array([len(b) for b in breaks],
+                                       dtype=np.uintc)
+    cdef double [::1] _b = np.concatenate(breaks).astype(np.float64)
+    opts.nbreaks = &_nb[0]
+    opts.breaks = &_b[0]
+    return _nb, _b
+
+
+cdef object _set_cells(cubature_opts *opts, cells):
+    # cells is None or a pair of float64 arrays of length ncells*fdim, to
+    # which the integrals and errors of the ncells initial regions are
+    # added; returns the arrays opts points to, which must stay referenced
+    # by the caller during the integration
+    if cells is None:
+        return None
+    cdef double [::1] _val = cells[0]
+    cdef double [::1] _err = cells[1]
+    opts.cell_val = &_val[0]
+    opts.cell_err = &_err[0]
+    return _val, _err
 
 
-def cubature_raw_callback(callable, unsigned ndim, unsigned fdim, xmin, xmax, str method,
+def cubature(callable, unsigned ndim, unsigned fdim, xmin, xmax, str method,
         double abserr, double relerr, int norm, unsigned maxEval, args=(),
-        kwargs={}):
-
-    cdef double [:] _xmin = np.array(xmin, dtype=np.float64)
-    cdef double [:] _xmax = np.array(xmax, dtype=np.float64)
+        kwargs={}, double timeout=0., str layout='point-major', tracer=None,
+        str rule='default', breaks=None, bint float32=False,
+        unsigned long long seed=0, simplices=None, bint compact=False,
+        unsigned split=1, bint pipeline=False, cells=None, components=None):
 
-    cdef double [:] val = np.empty((fdim,), dtype=np.float64)
-    cdef double [:] err = np.empty((fdim,), dtype=np.float64)
-
-    if method == 'hcubature_v':
-        error = hcubature_v(fdim, <integrand_v>get_ctypes_function_pointer(<PyObject *>callable),
-                NULL, ndim, &_xmin[0], &_xmax[0], maxEval, abserr,
-                relerr, <error_norm> norm, &val[0], &err[0])
+    cdef cubature_opts opts
+    _init_opts(&opts, timeout, layout, tracer, rule)
+    opts.seed = seed
+    opts.storage = CUBATURE_STORAGE_FLOAT if compact else 0
+    opts.split = split
+    opts.pipeline = pipeline
+    keep = _set_breaks(&opts, breaks), _set_cells(&opts, cells)
 
-    elif method == 'hcubature':
-        error = hcubature(fdim, <integrand>get_ctypes_function_pointer(<PyObject *>callable), NULL,
-                ndim, &_xmin[0], &_xmax[0], maxEval, abserr, relerr,
-                <error_norm> norm, &val[0], &err[0])
+    wrapper = Integrand(callable, ndim, fdim, args, kwargs,
+                        dim_major=opts.layout != 0, tracer=tracer)
 
-    elif method == 'pcubature_v':
-        error = pcubature_v(fdim, <integrand_v>get_ctypes_function_pointer(<PyObject *>callable),
-                NULL, ndim, &_xmin[0], &_xmax[0], maxEval, abserr,
-                relerr, <error_norm> norm, &val[0], &err[0])
+    return _integrate(<integrand>integrand_wrapper,
+            <integrand_v>integrand_wrapper_v, <void *> wrapper, ndim, fdim,
+            xmin, xmax, method, abserr, relerr, norm, maxEval, &opts, wrapper,
+            tracer, <integrand_v32>integrand_wrapper_v32 if float32 else NULL,
+            simplices, components)
 
-    elif method == 'pcubature':
-        error = pcubature(fdim, <integrand>get_ctypes_function_pointer(<PyObject *>callable), NULL,
-                ndim, &_xmin[0], &_xmax[0], maxEval, abserr, relerr,
-                <error_norm> norm, &val[0], &err[0])
 
+def cubature_raw_callback(callable, unsigned ndim, unsigned fdim, xmin, xmax, str method,
+        double abserr, double relerr, int norm, unsigned maxEval, args=(),
+        kwargs={}, double timeout=0., str layout='point-major', tracer=None,
+        str rule='default', breaks=None, bint float32=False,
+        unsigned long long seed=0, simplices=None, bint compact=False,
+        unsigned split=1, bint pipeline=False, cells=None, components=None):
+
+    cdef cubature_opts opts
+    _init_opts(&opts, timeout, layout, tracer, rule)
+    opts.seed = seed
+    opts.storage = CUBATURE_STORAGE_FLOAT if compact else 0
+    opts.split = split
+    opts.pipeline = pipeline
+    keep = _set_breaks(&opts, breaks), _set_cells(&opts, cells)
+
+    cdef void *fptr = get_ctypes_function_pointer(<PyObject *>callable)
+
+    return _integrate(<integrand>fptr, <integrand_v>fptr, NULL, ndim, fdim,
+            xmin, xmax, method, abserr, relerr, norm, maxEval, &opts,
+            None, tracer, <integrand_v32>fptr if float32 else NULL,
+            simplices, components)
+
+
+cdef class Integrator:
+    # the state kept between the integrations of cubature.Integrator: the
+    # options, with a workspace for hcubature, and the integrand wrapper
+    cdef cubature_opts opts
+    cdef Integrand wrapper  # None for a ctypes callback
+    cdef void *fptr
+    cdef object callback  # keeps the ctypes callback alive
+    cdef object tracer, check
+    cdef object lock  # serializes the integrations of several threads
+    cdef object args, kwargs  # defaults of integrate()
+    cdef str method
+    cdef unsigned ndim, fdim, maxEval
+    cdef double abserr, relerr
+    cdef int norm
+    cdef bint float32
+
+    def __init__(self, callable, unsigned ndim, unsigned fdim, str method,
+            double abserr, double relerr, int norm, unsigned maxEval,
+            args=(), kwargs={}, double timeout=0., str layout='point-major',
+            tracer=None, str rule='default', bint float32=False,
+            unsigned long long seed=0, bint compact=False, unsigned split=1,
+            bint pipeline=False, bint raw_callback=False, check=None):
+        # check(xmin, xmax, args, kwargs) validates the integrand, once,
+        # with the arguments of the first integration
+        if method not in _METHODS:
+            raise ValueError('unknown integration method `{!s}`'.format(
+                             method))
+        cdef cubature_workspace *ws = self.opts.workspace
+        _init_opts(&self.opts, timeout, layout, tracer, rule)
+        self.opts.seed = seed
+        self.opts.storage = CUBATURE_STORAGE_FLOAT if compact else 0
+        self.opts.split = split
+        self.opts.pipeline = pipeline
+        self.opts.workspace = ws if ws != NULL else cubature_workspace_new()
+        if self.opts.workspace == NULL:
+            raise MemoryError()
+        if raw_callback:
+            self.fptr = get_ctypes_function_pointer(<PyObject *>callable)
+            self.callback = callable
+            self.wrapper = None
+        else:
+            self.wrapper = Integrand(callable, ndim, fdim, args, kwargs,
+                    dim_major=self.opts.layout != 0, tracer=tracer)
+            self.fptr = NULL
+        self.args = tuple(args)
+        self.kwargs = kwargs
+        self.tracer = tracer
+        self.check = check
+        self.lock = threading.RLock()
+        self.method = method
+        self.ndim = ndim
+        self.fdim = fdim
+        self.abserr = abserr
+        self.relerr = relerr
+        self.norm = norm
+        self.maxEval = maxEval
+        self.float32 = float32
+
+    def __dealloc__(self):
+        cubature_workspace_free(self.opts.workspace)
+
+    def integrate(self, xmin, xmax, args=None, kwargs=None):
+        # the wrapper and the workspace are shared by all the threads; an
+        # integration from within the integrand (same thread) goes through
+        with self.lock:
+            return self._integrate(xmin, xmax, args, kwargs)
+
+    cdef object _integrate(self, xmin, xmax, args, kwargs):
+        cdef Integrand w = self.wrapper
+        if len(xmin) != self.ndim or len(xmax) != self.ndim:
+            raise ValueError('xmin and xmax must have length ndim')
+        if w is None:
+            if args is not None or kwargs is not None:
+                raise ValueError('args and kwargs do not apply to ctypes '
+                                 'callbacks')
+            if self.check is not None:
+                self.check(xmin, xmax, (), {})
+                self.check = None
+            return _integrate(<integrand>self.fptr, <integrand_v>self.fptr,
+                    NULL, self.ndim, self.fdim, xmin, xmax, self.method,
+                    self.abserr, self.relerr, self.norm, self.maxEval,
+                    &self.opts, None, self.tracer,
+                    <integrand_v32>self.fptr if self.float32 else NULL)
+        w.args = self.args if args is None else tuple(args)
+        w.kwargs = self.kwargs if kwargs is None else kwargs
+        if self.check is not None:
+            self.check(xmin, xmax, w.args, w.kwargs)
+            self.check = None
+        return _integrate(<integrand>integrand_wrapper,
+                <integrand_v>integrand_wrapper_v, <void *> w, self.ndim,
+                self.fdim, xmin, xmax, self.method, self.abserr, self.relerr,
+                self.norm, self.maxEval, &self.opts, w, self.tracer,
+                <integrand_v32>integrand_wrapper_v32 if self.float32
+                else NULL)
+
+
+cdef int c_hcubature(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return hcubature_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_hcubature_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return hcubature_v_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_pcubature(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return pcubature_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_pcubature_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return pcubature_v_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts, unsigned *m,
+        double **buf, size_t *nbuf, size_t max_nbuf,
+        double *val, double *err) noexcept nogil:
+    return pcubature_v_buf_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, m, buf, nbuf, max_nbuf,
+            val, err)
+
+
+cdef int c_hcubature_v32(unsigned fdim, integrand_v32 f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return hcubature_v32_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_pcubature_v32(unsigned fdim, integrand_v32 f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return pcubature_v32_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_hcubature_simplex(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, size_t nsimplex, const double *vertices,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return hcubature_simplex_opts(fdim, f, fdata, ndim, nsimplex, vertices,
+            maxEval, reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_hcubature_simplex_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, size_t nsimplex, const double *vertices,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return hcubature_simplex_v_opts(fdim, f, fdata, ndim, nsimplex,
+            vertices, maxEval, reqAbsError, reqRelError, norm, opts, val,
+            err)
+
+
+cdef int c_vegas(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return vegas_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_vegas_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return vegas_v_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_decubature(unsigned fdim, integrand f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return decubature_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef int c_decubature_v(unsigned fdim, integrand_v f, void *fdata,
+        unsigned ndim, const double *xmin, const double *xmax,
+        size_t maxEval, double reqAbsError, double reqRelError,
+        error_norm norm, const cubature_opts *opts,
+        double *val, double *err) noexcept nogil:
+    return decubature_v_opts(fdim, f, fdata, ndim, xmin, xmax, maxEval,
+            reqAbsError, reqRelError, norm, opts, val, err)
+
+
+cdef enum:
+    GRID_MAXDIM = 16
+
+cdef struct grid_data:
+    unsigned ndim, fdim
+    unsigned order              # 1 for multilinear, 3 for cubic
+    const double *values        # C-contiguous values[n0, ..., nd-1, fdim]
+    const double *axes          # grid axes, concatenated
+    size_t shape[GRID_MAXDIM]
+    size_t stride[GRID_MAXDIM]  # in elements of values
+    size_t axis_offset[GRID_MAXDIM]
+    double step[GRID_MAXDIM]    # > 0 for uniformly spaced axes
+
+
+cdef inline int _grid_locate(const grid_data *g, unsigned d, double xd,
+        size_t *base, double *w) noexcept nogil:
+    # stores in base the first node of the stencil along dimension d and in
+    # w[0:order+1] the interpolation weights of the stencil nodes
+    cdef const double *ax = g.axes + g.axis_offset[d]
+    cdef size_t n = g.shape[d]
+    cdef size_t lo, hi, mid, i
+    cdef unsigned a, b
+    cdef double t, num, den
+
+    if not (xd >= ax[0] and xd <= ax[n - 1]):
+        return -1
+
+    if g.step[d] > 0:
+        i = <size_t>((xd - ax[0]) / g.step[d])
+        if i > n - 2:
+            i = n - 2
     else:
-        raise ValueError('unknown integration method `{!s}`'.format(method))
-
-    if error != 0:
-        raise RuntimeError('integration failed')
-
-    return np.asarray(val), np.asarray(err)
+        lo = 0
+        hi = n - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if ax[mid] <= xd:
+                lo = mid
+            else:
+                hi = mid
+        i = lo
+
+    if g.order == 1:
+        t = (xd - ax[i]) / (ax[i + 1] - ax[i])
+        base[0] = i
+        w[0] = 1. - t
+        w[1] = t
+    else:
+        # Lagrange cubic through the four nodes around the interval, shifted
+        # inwards at the boundaries
+        i = 0 if i == 0 else i - 1
+        if i > n - 4:
+            i = n - 4
+        base[0] = i
+        for a in range(4):
+            num = 1.
+            den = 1.
+            for b in range(4):
+                if b != a:
+                    num *= xd - ax[i + b]
+                    den *= ax[i + a] - ax[i + b]
+            w[a] = num / den
+    return 0
+
+
+cdef int grid_integrand_v(unsigned ndim, size_t npt, const double *x,
+        void *fdata, unsigned fdim, double *fval) noexcept nogil:
+    cdef const grid_data *g = <const grid_data *>fdata
+    cdef size_t base[GRID_MAXDIM]
+    cdef double w[GRID_MAXDIM*4]
+    cdef unsigned corner[GRID_MAXDIM]
+    cdef unsigned m = g.order + 1
+    cdef size_t p, offset
+    cdef unsigned d, k
+    cdef double weight
+    cdef double *out
+
+    for p in range(npt):
+        for d in range(ndim):
+            if _grid_locate(g, d, x[p*ndim + d], &base[d], &w[4*d]):
+                return -1
+            corner[d] = 0
+
+        out = fval + p*fdim
+        for k in range(fdim):
+            out[k] = 0.
+        # odometer loop over the m^ndim stencil nodes
+        while True:
+            weight = 1.
+            offset = 0
+            for d in range(ndim):
+                weight *= w[4*d + corner[d]]
+                offset += (base[d] + corner[d]) * g.stride[d]
+            for k in range(fdim):
+                out[k] += weight * g.values[offset + k]
+            d = 0
+            while d < ndim:
+                corner[d] += 1
+                if corner[d] < m:
+                    break
+                corner[d] = 0
+                d += 1
+            if d == ndim:
+                break
+    return 0
+
+
+cdef int grid_integrand(unsigned ndim, const double *x, void *fdata,
+        unsigned fdim, double *fval) noexcept nogil:
+    return grid_integrand_v(ndim, 1, x, fdata, fdim, fval)
+
+
+cdef class GridIntegrand:
+    r"""Integrand interpolating tabulated data, evaluated entirely in C
+
+    Parameters
+    ----------
+    values : array-like
+        Array with shape ``(n_0, ..., n_{ndim-1})`` for scalar data or
+        ``(n_0, ..., n_{ndim-1}, fdim)`` for vector valued data. A
+        C-contiguous ``float64`` array, including a ``np.memmap``, is read
+        in place without being copied.
+    axes : sequence of array-like
+        The ``ndim`` strictly increasing grid coordinates, ``axes[i]`` having
+        length ``n_i``.
+    method : str, optional
+        ``'linear'`` for multilinear interpolation or ``'cubic'`` for
+        piecewise cubic (Lagrange) interpolation, which requires at least 4
+        nodes per axis.
+
+    Notes
+    -----
+    Passed as ``func`` to :func:`cubature.cubature`, the interpolation runs
+    inside the integration loop without calling back into Python. Points
+    outside of the grid make the integration fail.
+
+    """
+    cdef grid_data data
+    cdef readonly object values, axes
+    cdef readonly str method
+    cdef const double [::1] _flat
+    cdef double [::1] _axes
+
+    def __init__(self, values, axes, method='linear'):
+        if method == 'linear':
+            order = 1
+        elif method == 'cubic':
+            order = 3
+        else:
+            raise ValueError('unknown interpolation method `{!s}`'.format(method))
+
+        values = np.asarray(values)
+        if values.dtype != np.float64 or not values.flags.c_contiguous:
+            values = np.ascontiguousarray(values, dtype=np.float64)
+        axes = [np.ascontiguousarray(ax, dtype=np.float64) for ax in axes]
+
+        ndim = len(axes)
+        if ndim == 0 or ndim > GRID_MAXDIM:
+            raise ValueError('number of axes must be between 1 and {}'.format(GRID_MAXDIM))
+        if values.ndim == ndim:
+            fdim = 1
+        elif values.ndim == ndim + 1:
+            fdim = values.shape[ndim]
+        else:
+            raise ValueError('values must have ndim or ndim+1 dimensions')
+        for d, ax in enumerate(axes):
+            if ax.ndim != 1 or ax.shape[0] != values.shape[d]:
+                raise ValueError('axes[{}] does not match values.shape[{}]'.format(d, d))
+            if ax.shape[0] < order + 1:
+                raise ValueError('{} interpolation requires at least {} nodes per axis'
+                                 .format(method, order + 1))
+            if np.any(np.diff(ax) <= 0):
+                raise ValueError('axes[{}] is not strictly increasing'.format(d))
+
+        self.values = values
+        self.axes = axes
+        self.method = method
+        self._flat = values.reshape(-1)
+        self._axes = np.concatenate(axes)
+
+        self.data.ndim = ndim
+        self.data.fdim = fdim
+        self.data.order = order
+        self.data.values = &self._flat[0]
+        self.data.axes = &self._axes[0]
+        stride = fdim
+        offset = 0
+        for d in reversed(range(ndim)):
+            self.data.shape[d] = values.shape[d]
+            self.data.stride[d] = stride
+            stride *= values.shape[d]
+        for d in range(ndim):
+            self.data.axis_offset[d] = offset
+            offset += values.shape[d]
+            h = np.diff(axes[d])
+            self.data.step[d] = h[0] if np.allclose(h, h[0], rtol=1e-12, atol=0) else 0.
+
+    @property
+    def ndim(self):
+        return self.data.ndim
+
+    @property
+    def fdim(self):
+        return self.data.fdim
+
+    def __call__(self, x):
+        """Interpolate at the points ``x`` with ``shape=(npt, ndim)``"""
+        cdef double [:, ::1] _x = np.array(x, dtype=np.float64, ndmin=2)
+        cdef size_t npts = _x.shape[0]
+        if _x.shape[1] != self.data.ndim:
+            raise ValueError('x must have shape=(npt, ndim)')
+        out = np.empty((npts, self.data.fdim), dtype=np.float64)
+        cdef double [:, ::1] _out = out
+        if npts and grid_integrand_v(self.data.ndim, npts, &_x[0, 0],
+                &self.data, self.data.fdim, &_out[0, 0]):
+            raise ValueError('point outside of the interpolation grid')
+        if self.data.fdim == 1:
+            return out[:, 0]
+        return out
+
+
+def cubature_grid(GridIntegrand grid, unsigned ndim, unsigned fdim, xmin,
+        xmax, str method, double abserr, double relerr, int norm,
+        unsigned maxEval, double timeout=0., tracer=None, str rule='default',
+        breaks=None, unsigned long long seed=0, simplices=None,
+        bint compact=False, unsigned split=1, bint pipeline=False,
+        cells=None, components=None):
+
+    cdef cubature_opts opts
+    _init_opts(&opts, timeout, 'point-major', tracer, rule)
+    opts.seed = seed
+    opts.storage = CUBATURE_STORAGE_FLOAT if compact else 0
+    opts.split = split
+    opts.pipeline = pipeline
+    keep = _set_breaks(&opts, breaks), _set_cells(&opts, cells)
+
+    return _integrate(<integrand>grid_integrand, <integrand_v>grid_integrand_v,
+            <void *> &grid.data, ndim, fdim, xmin, xmax, method, abserr,
+            relerr, norm, maxEval, &opts, None, tracer, NULL, simplices,
+            components)
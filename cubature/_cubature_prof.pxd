@@ -0,0 +1,2 @@
+# the declarations of _cubature, for its instrumented build
+include "_cubature.pxd"
@@ -0,0 +1,14 @@
+#cython: boundscheck=False
+#cython: wraparound=False
+#cython: cdivision=True
+#cython: nonecheck=False
+#cython: infer_types=False
+#cython: freethreading_compatible=True
+#cython: linetrace=True
+
+# The instrumented build of _cubature, loaded by cubature.use_profiling_build
+# or with CUBATURE_PROFILING=1 in the environment: the same code, compiled
+# with the line tracing hooks of profilers and coverage tools (CYTHON_TRACE,
+# see setup.py). The directives above must match those of _cubature.pyx.
+
+include "_cubature.pyx"
@@ -3,6 +3,7 @@
 #cython: cdivision=True
 #cython: nonecheck=False
 #cython: infer_types=False
+#cython: freethreading_compatible=True
 import numpy as np
 
 from math import erf, gamma
@@ -239,3 +240,73 @@ cpdef double cubature_seven(double [:] x):
         val *= pow(x[i], p)
 
     return val
+
+
+# Exercise the C-level API of cubature._cubature from compiled code
+
+from libc.stdlib cimport free
+
+from cubature._cubature cimport (integrand, integrand_v, ERROR_INDIVIDUAL,
+                                 c_hcubature, c_hcubature_v, c_pcubature,
+                                 c_pcubature_v, c_pcubature_v_buf)
+
+
+cdef int _gauss1d(unsigned ndim, const double *x, void *fdata,
+        unsigned fdim, double *fval) noexcept nogil:
+    # exp(-a*x^2) with a = *fdata
+    fval[0] = exp(-(<double *>fdata)[0]*x[0]*x[0])
+    return 0
+
+
+cdef int _gauss1d_v(unsigned ndim, size_t npts, const double *x, void *fdata,
+        unsigned fdim, double *fval) noexcept nogil:
+    cdef size_t i
+    for i in range(npts):
+        fval[i] = exp(-(<double *>fdata)[0]*x[i]*x[i])
+    return 0
+
+
+def capi_gauss_integrals(double [:] a, str method, double relerr=1e-10):
+    """Integrals of exp(-a*x^2) over [0, 1] for each a, computed in nogil
+    loops through the C-level API"""
+    cdef double [:] val = np.empty(a.shape[0])
+    cdef double [:] err = np.empty(a.shape[0])
+    cdef double xmin = 0., xmax = 1.
+    cdef double *buf = NULL
+    cdef size_t nbuf = 0
+    cdef unsigned m
+    cdef Py_ssize_t i
+    cdef int ret = 0
+    cdef int imethod = ['h', 'h_v', 'p', 'p_v', 'p_v_buf'].index(method)
+
+    with nogil:
+        for i in range(a.shape[0]):
+            if imethod == 0:
+                ret = c_hcubature(1, <integrand>_gauss1d, &a[i], 1, &xmin,
+                        &xmax, 0, 0, relerr, ERROR_INDIVIDUAL, NULL, &val[i],
+                        &err[i])
+            elif imethod == 1:
+                ret = c_hcubature_v(1, <integrand_v>_gauss1d_v, &a[i], 1,
+                        &xmin, &xmax, 0, 0, relerr, ERROR_INDIVIDUAL, NULL,
+                        &val[i], &err[i])
+            elif imethod == 2:
+                ret = c_pcubature(1, <integrand>_gauss1d, &a[i], 1, &xmin,
+                        &xmax, 0, 0, relerr, ERROR_INDIVIDUAL, NULL, &val[i],
+                        &err[i])
+            elif imethod == 3:
+                ret = c_pcubature_v(1, <integrand_v>_gauss1d_v, &a[i], 1,
+                        &xmin, &xmax, 0, 0, relerr, ERROR_INDIVIDUAL, NULL,
+                        &val[i], &err[i])
+            else:
+                # the same buffer is reused for all the integrals
+                m = 0
+                ret = c_pcubature_v_buf(1, <integrand_v>_gauss1d_v, &a[i], 1,
+                        &xmin, &xmax, 0, 0, relerr, ERROR_INDIVIDUAL, NULL,
+                        &m, &buf, &nbuf, 1024, &val[i], &err[i])
+            if ret != 0:
+                break
+        free(buf)
+
+    if ret != 0:
+        raise RuntimeError('integration failed')
+    return np.asarray(val), np.asarray(err)
@@ -0,0 +1,135 @@
+"""
+Clenshaw-Curtis tables for p-adaptive cubature (:mod:`cubature.clencurt`)
+=========================================================================
+
+.. currentmodule:: cubature.clencurt
+
+``adaptive='p'`` uses nested Clenshaw-Curtis rules with ``2**(m+1) + 1``
+points per dimension. The levels ``m <= 11`` are compiled into the extension
+(``clencurt.h``, generated by ``clencurt_gen.c``); higher levels are computed
+here on demand with NumPy's FFT, in the same layout, so that the refinement
+can continue instead of failing.
+
+The tables are kept in memory for the life of the process. They can also be
+stored in a file, to be reused by later processes, with
+:func:`set_cache_file`.
+
+.. autofunction:: tables
+.. autofunction:: set_cache_file
+
+"""
+import os
+import threading
+
+import numpy as np
+
+__all__ = ['tables', 'set_cache_file']
+
+_lock = threading.Lock()
+_tables = {}  # M -> (x, w); never discarded, the C code may still use them
+_cache_file = None
+
+
+def set_cache_file(filename):
+    """Store the computed tables in `filename` (a ``.npz`` file), or only in
+    memory if `filename` is ``None``
+
+    The file holds the tables for the largest level computed so far, which
+    contain those of all the lower levels.
+
+    """
+    global _cache_file
+    with _lock:
+        _cache_file = None if filename is None else os.fspath(filename)
+
+
+def _permutation(M):
+    # P_M of clencurt_gen.c: the order in which the points of the nested
+    # rules are used, coarsest first
+    P = np.zeros(1, dtype=np.int64)
+    for m in range(1, M + 1):
+        P = np.concatenate((2*P, 2*np.arange(1 << (m - 1)) + 1))
+    return P
+
+
+def _weights(n):
+    # clencurt_weights() of clencurt_gen.c: the DCT-I of
+    # 1/(n*(1 - 4*j**2)), j = 0..n, as the FFT of its even extension
+    j = np.arange(n + 1)
+    v = 1./(n*(1 - 4.*j**2))
+    w = np.fft.rfft(np.concatenate((v, v[-2:0:-1])))[:n + 1].real
+    w[0] *= 0.5
+    return w
+
+
+def _compute(M):
+    x = np.cos(np.pi * _permutation(M) / (1 << (M + 1)))
+    w = []
+    for m in range(M + 1):
+        wm = _weights(1 << m)
+        w.append(wm[1 << m:])
+        w.append(wm[_permutation(m)])
+    return x, np.concatenate(w)
+
+
+def _sizes(M):
+    return 1 << M, M + (1 << (M + 1))
+
+
+def _load(M):
+    try:
+        with np.load(_cache_file) as data:
+            x, w = data['x'], data['w']
+    except (OSError, KeyError, ValueError):
+        return None
+    nx, nw = _sizes(M)
+    if x.shape[0] < nx or w.shape[0] < nw:
+        return None
+    return np.ascontiguousarray(x[:nx]), np.ascontiguousarray(w[:nw])
+
+
+def _save(M, x, w):
+    try:
+        with np.load(_cache_file) as data:
+            if data['x'].shape[0] >= x.shape[0]:
+                return
+    except (OSError, KeyError, ValueError):
+        pass
+    tmp = '{}.{}.tmp.npz'.format(_cache_file, os.getpid())
+    np.savez(tmp, x=x, w=w)
+    os.replace(tmp, _cache_file)
+
+
+def tables(M):
+    """Return the points and weights of the Clenshaw-Curtis rules up to
+    level `M`, laid out as ``clencurt_x`` and ``clencurt_w`` in
+    ``clencurt.h``
+
+    Returns
+    -------
+    x : numpy.ndarray
+        The ``2**M`` points.
+    w : numpy.ndarray
+        The ``M + 2**(M+1)`` weights.
+
+    """
+    M = int(M)
+    if M < 0:
+        raise ValueError('M must be non-negative')
+    with _lock:
+        if M in _tables:
+            return _tables[M]
+        # slices of larger tables in memory are as good
+        for Mi in sorted(_tables):
+            if Mi > M:
+                nx, nw = _sizes(M)
+                x, w = _tables[Mi]
+                _tables[M] = x[:nx], w[:nw]
+                return _tables[M]
+        res = _load(M) if _cache_file is not None else None
+        if res is None:
+            res = _compute(M)
+            if _cache_file is not None:
+                _save(M, *res)
+        _tables[M] = res
+        return res
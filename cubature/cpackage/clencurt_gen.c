@@ -21,7 +21,9 @@
    FFTW (www.fftw.org) version 3 or later, is used to generate the clencurt.h
    file for pcubature.c.  You only need to run it if you want to do
    p-adaptive cubature with more than 8193 points per dimension.  See
-   the README file for more information. */
+   the README file for more information.  (The *_opts routines can also
+   obtain larger tables at runtime through opts->clencurt, which is how
+   the Python wrapper extends the built-in levels.) */
 
 
 #include <stdlib.h>
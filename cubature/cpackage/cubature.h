@@ -56,6 +56,13 @@ typedef int (*integrand_v) (unsigned ndim, size_t npt,
 			    const double *x, void *,
 			    unsigned fdim, double *fval);
 
+/* as integrand_v, but with the points and function values in single
+   precision; the integration itself is still carried out in double
+   precision (see the *_v32_opts routines below) */
+typedef int (*integrand_v32) (unsigned ndim, size_t npt,
+			      const float *x, void *,
+			      unsigned fdim, float *fval);
+
 /* Different ways of measuring the absolute and relative error when
    we have multiple integrands, given a vector e of error estimates
    in the individual components of a vector v of integrands.  These
@@ -69,6 +76,117 @@ typedef enum {
      ERROR_LINF /* abserr is L_\infty norm |e|, and relerr is |e|/|v| */
 } error_norm;
 
+/* Tracing hook for the *_opts variants, called once after the initial
+   evaluation and then after every refinement iteration with: the
+   iteration number (0 for the initial evaluation), the number of points
+   evaluated in that iteration, the number of regions (hcubature) or of
+   cached grids (pcubature), and the largest component of the current
+   error estimate. */
+typedef void (*cubature_trace) (void *tdata, size_t iteration, size_t npts,
+				size_t nregions, double err);
+
+/* Source of Clenshaw-Curtis tables for pcubature beyond the levels
+   built into clencurt.h: called when level M is needed, it must point
+   *x and *w to arrays laid out as clencurt_x and clencurt_w for levels
+   up to M (of lengths 2^M and M + 2^(M+1)), which stay valid until the
+   integration returns, and return 0; or return nonzero, in which case
+   the integration fails as it would without this hook. */
+typedef int (*cubature_clencurt) (void *cdata, unsigned M,
+				  const double **x, const double **w);
+
+/* Storage kept by hcubature between integrations (the rule with its
+   buffer of points, and the arrays of the heap of regions), to save the
+   allocations of many small integrals of the same dimensions.  It is
+   created empty by cubature_workspace_new, filled by the integrations
+   it is passed to through opts->workspace, one at a time, and released
+   by cubature_workspace_free. */
+typedef struct cubature_workspace_s cubature_workspace;
+cubature_workspace *cubature_workspace_new(void);
+void cubature_workspace_free(cubature_workspace *ws);
+
+/* Counts of the pipelined mode of hcubature (opts->pipeline), added to
+   by each integration: the regions prepared ahead in the background, and
+   those of them discarded, for another region was refined first. */
+typedef struct {
+     size_t nspeculative;
+     size_t ndiscarded;
+} cubature_stats;
+
+/* Optional settings for the *_opts variants of the integration routines
+   below.  A zero-initialized struct (or a NULL pointer) gives exactly the
+   behavior of the plain routines. */
+typedef struct {
+     double timeout; /* wall-clock limit in seconds, checked between
+			refinement iterations (<= 0 for no limit) */
+     unsigned layout; /* memory layout of the x and fval arrays passed
+			 to a vectorized integrand: 0 (as described for
+			 integrand_v) or a combination of the flags below */
+     cubature_trace trace; /* tracing hook, or NULL */
+     void *tdata; /* passed through to trace */
+     unsigned rule; /* hcubature rule: 0 for the default (Gauss-Kronrod
+		       in 1d, Genz-Malik otherwise) or one of the
+		       CUBATURE_RULE_* values below */
+     cubature_clencurt clencurt; /* larger pcubature tables, or NULL */
+     void *cdata; /* passed through to clencurt */
+     const unsigned *nbreaks; /* hcubature: if not NULL, the domain is
+				 first split at nbreaks[j] breakpoints in
+				 each dimension j, taken in turn from... */
+     const double *breaks; /* ...the concatenation of the increasing
+			      breakpoints of each dimension, strictly
+			      inside (xmin[j], xmax[j]) */
+     cubature_workspace *workspace; /* hcubature: storage to reuse, or NULL */
+     unsigned long long seed; /* vegas: seed of the random numbers */
+     size_t neval; /* vegas: points per iteration (0 for the default) */
+     unsigned storage; /* hcubature: 0 or CUBATURE_STORAGE_FLOAT */
+     unsigned split; /* hcubature: number of halvings of each region cut,
+			into 2^split pieces (0 or 1 to bisect them), at
+			most CUBATURE_MAX_SPLIT */
+     int pipeline; /* hcubature: nonzero to prepare the next regions (pop,
+		      cut and compute their points) in a background thread
+		      while the integrand is evaluated */
+     cubature_stats *stats; /* hcubature: counts of the pipeline, or NULL */
+     double *cell_val; /* hcubature: if not NULL, the integrals and errors
+			  of each initial region (the cells of the
+			  breakpoints, the first dimension varying
+			  fastest, or the simplices) are added to... */
+     double *cell_err; /* ...cell_val[c*fdim + k] and cell_err[c*fdim + k],
+			  for the cell c and the component k */
+} cubature_opts;
+
+/* maximum opts->split: a cut region is halved along the split dimensions
+   of largest differences (taking them in turn again if there are fewer
+   dimensions than halvings), so that each iteration evaluates 2^split
+   times as many points in a single call of the integrand, at the price
+   of a coarser adaptation */
+#define CUBATURE_MAX_SPLIT 6U
+
+/* flag for opts->storage: keep the values and errors of the regions
+   in single precision, halving the memory of the regions for a large
+   fdim.  The rounding of each value is added to its error (rounded up),
+   and the totals are still accumulated in double precision, so the
+   results are those of a slightly pessimistic double-precision run
+   with an accuracy no better than about 1e-7 relative per region. */
+#define CUBATURE_STORAGE_FLOAT 1U
+
+/* flags for opts->layout.  With CUBATURE_POINTS_DIM_MAJOR, x[j*npt + i]
+   is the j-th coordinate of the i-th point, so that each coordinate is
+   contiguous.  With CUBATURE_VALUES_FDIM_MAJOR, the k-th function
+   evaluation for the i-th point is returned in fval[k*npt + i]. */
+#define CUBATURE_POINTS_DIM_MAJOR 1U
+#define CUBATURE_VALUES_FDIM_MAJOR 2U
+
+/* values for opts->rule, for high dimensions where the 2^dim points of
+   the Genz-Malik rule dominate: a degree-5 rule with 2*dim^2 + 2*dim + 1
+   points and a degree-3 error estimate, and a degree-3 rule with
+   2*dim + 1 points and a degree-1 (midpoint) error estimate */
+#define CUBATURE_RULE_DEGREE5 1U
+#define CUBATURE_RULE_DEGREE3 2U
+
+/* Return value of the *_opts routines when opts->timeout expired before
+   convergence.  In this case val and err hold the estimates reached so
+   far, exactly as if maxEval had been exhausted. */
+#define CUBATURE_DEADLINE_REACHED 2
+
 /* Integrate the function f from xmin[dim] to xmax[dim], with at most
    maxEval function evaluations (0 for no limit), until the given
    absolute or relative error is achieved.  val returns the integral,
@@ -116,6 +234,109 @@ int pcubature(unsigned fdim, integrand f, void *fdata,
 	      error_norm norm,
 	      double *val, double *err);
 
+/* as the routines above, but with the extra settings in opts */
+int hcubature_opts(unsigned fdim, integrand f, void *fdata,
+		   unsigned dim, const double *xmin, const double *xmax,
+		   size_t maxEval, double reqAbsError, double reqRelError,
+		   error_norm norm, const cubature_opts *opts,
+		   double *val, double *err);
+int hcubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		     unsigned dim, const double *xmin, const double *xmax,
+		     size_t maxEval, double reqAbsError, double reqRelError,
+		     error_norm norm, const cubature_opts *opts,
+		     double *val, double *err);
+int pcubature_v_buf_opts(unsigned fdim, integrand_v f, void *fdata,
+			 unsigned dim, const double *xmin, const double *xmax,
+			 size_t maxEval,
+			 double reqAbsError, double reqRelError,
+			 error_norm norm, const cubature_opts *opts,
+			 unsigned *m,
+			 double **buf, size_t *nbuf, size_t max_nbuf,
+			 double *val, double *err);
+int pcubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		     unsigned dim, const double *xmin, const double *xmax,
+		     size_t maxEval, double reqAbsError, double reqRelError,
+		     error_norm norm, const cubature_opts *opts,
+		     double *val, double *err);
+int pcubature_opts(unsigned fdim, integrand f, void *fdata,
+		   unsigned dim, const double *xmin, const double *xmax,
+		   size_t maxEval, double reqAbsError, double reqRelError,
+		   error_norm norm, const cubature_opts *opts,
+		   double *val, double *err);
+
+/* as the *_v_opts routines, but with a single-precision integrand, at
+   the cost of float rounding (relative errors of about 1e-7).  Only f
+   sees floats: the rules still generate double points, which are rounded
+   into a float buffer kept for the whole integration, and the values are
+   widened back to double, two copies per batch (see fv32 in vwrapper.h) */
+int hcubature_v32_opts(unsigned fdim, integrand_v32 f, void *fdata,
+		       unsigned dim, const double *xmin, const double *xmax,
+		       size_t maxEval, double reqAbsError, double reqRelError,
+		       error_norm norm, const cubature_opts *opts,
+		       double *val, double *err);
+int pcubature_v32_opts(unsigned fdim, integrand_v32 f, void *fdata,
+		       unsigned dim, const double *xmin, const double *xmax,
+		       size_t maxEval, double reqAbsError, double reqRelError,
+		       error_norm norm, const cubature_opts *opts,
+		       double *val, double *err);
+
+/* as hcubature_opts and hcubature_v_opts, but over the union of nsimplex
+   simplices, whose dim+1 vertices of dim coordinates each are stored one
+   after the other in vertices[nsimplex * (dim+1) * dim].  A degree 7 rule
+   for simplices is used, with a degree 5 error estimate, and the regions
+   are bisected at the midpoint of their longest edge; opts->rule and
+   opts->nbreaks do not apply. */
+int hcubature_simplex_opts(unsigned fdim, integrand f, void *fdata,
+			   unsigned dim, size_t nsimplex,
+			   const double *vertices,
+			   size_t maxEval, double reqAbsError,
+			   double reqRelError, error_norm norm,
+			   const cubature_opts *opts,
+			   double *val, double *err);
+int hcubature_simplex_v_opts(unsigned fdim, integrand_v f, void *fdata,
+			     unsigned dim, size_t nsimplex,
+			     const double *vertices,
+			     size_t maxEval, double reqAbsError,
+			     double reqRelError, error_norm norm,
+			     const cubature_opts *opts,
+			     double *val, double *err);
+
+/* Monte Carlo integration by adaptive importance sampling (VEGAS): the
+   points are drawn from a separable density that is refined after every
+   iteration, and err is the statistical (one standard deviation) error of
+   the estimates of the iterations combined.  The random numbers depend
+   only on opts->seed, so the results are reproducible.  Suited to peaked
+   integrands in many dimensions, for moderate accuracies. */
+int vegas_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		 unsigned dim, const double *xmin, const double *xmax,
+		 size_t maxEval, double reqAbsError, double reqRelError,
+		 error_norm norm, const cubature_opts *opts,
+		 double *val, double *err);
+int vegas_opts(unsigned fdim, integrand f, void *fdata,
+	       unsigned dim, const double *xmin, const double *xmax,
+	       size_t maxEval, double reqAbsError, double reqRelError,
+	       error_norm norm, const cubature_opts *opts,
+	       double *val, double *err);
+
+/* Double-exponential (tanh-sinh) quadrature: the step of the
+   substitution x = tanh(pi/2 sinh t) is halved at each level, reusing
+   all the earlier points, and err is estimated from the differences
+   between successive levels.  Integrable singularities at the endpoints
+   (x^-0.5, log x) converge about as fast as smooth integrands, and the
+   endpoints are never evaluated.  In several dimensions the tensor
+   product of the one-dimensional rule is used, for low dimensions only.
+   The points of each level are passed to f in batches of up to 4096. */
+int decubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		      unsigned dim, const double *xmin, const double *xmax,
+		      size_t maxEval, double reqAbsError, double reqRelError,
+		      error_norm norm, const cubature_opts *opts,
+		      double *val, double *err);
+int decubature_opts(unsigned fdim, integrand f, void *fdata,
+		    unsigned dim, const double *xmin, const double *xmax,
+		    size_t maxEval, double reqAbsError, double reqRelError,
+		    error_norm norm, const cubature_opts *opts,
+		    double *val, double *err);
+
 #ifdef __cplusplus
 }  /* extern "C" */
 #endif /* __cplusplus */
@@ -0,0 +1,256 @@
+/* Adaptive multidimensional integration of a vector of integrands.
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program; if not, write to the Free Software
+ * Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+ *
+ */
+
+/* Double-exponential (tanh-sinh) quadrature of H. Takahasi and M. Mori,
+   "Double exponential formulas for numerical integration," Publ. RIMS
+   Kyoto Univ. 9, 721-741 (1974): the substitution
+   x = tanh(pi/2 sinh t) maps [-1, 1] to the real line, where the
+   transformed integrand decays double exponentially, so that the
+   trapezoidal rule in t converges very fast, even for integrands with
+   (integrable) singularities at the endpoints, like x^-0.5 or log x,
+   which are never evaluated there.
+
+   The step in t is halved at each level, which only adds the nodes at
+   odd multiples of the new step: the earlier evaluations are all
+   reused.  In several dimensions the rule is the tensor product of the
+   one-dimensional ones, which is only practical in low dimensions. */
+
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <float.h>
+
+#include "cubature.h"
+
+/* error return codes */
+#define SUCCESS 0
+#define FAILURE 1
+
+#include "timer.h"
+
+#define DE_TMAX 6.5 /* nodes for |t| <= DE_TMAX: 1-|x| down to 1e-300 */
+#define DE_MAXLEVEL 12 /* the step in t goes from 1 to 2^-DE_MAXLEVEL */
+#define DE_CHUNK 4096 /* points per call of the integrand */
+
+#ifndef M_PI
+#  define M_PI 3.14159265358979323846
+#endif
+
+static int converged(unsigned fdim, const double *vals, const double *errs,
+		     double reqAbsError, double reqRelError, error_norm norm)
+#define ERR(j) errs[j]
+#define VAL(j) vals[j]
+#include "converged.h"
+
+/* the nodes t = k h of a level, for the step h = 2^-level: all of them
+   at level 0, only the odd k afterwards.  Each node is stored as its
+   distance d[i] to the nearer endpoint of [-1, 1], in units of the half
+   width (the side being the sign of t, the midpoint counting as the
+   lower side), and its weight w[i], which avoids the cancellation of
+   1 - tanh near the endpoints.  Returns the number of nodes. */
+static size_t de_nodes(unsigned level, double *d, int *upper, double *w)
+{
+     double h = ldexp(1., -(int) level);
+     long K = (long) floor(DE_TMAX / h), k;
+     size_t n = 0;
+
+     for (k = -K; k <= K; ++k) {
+	  double t = k * h, u, e;
+	  if (level > 0 && !(k & 1)) continue;
+	  u = M_PI / 2 * sinh(fabs(t));
+	  e = exp(-2 * u);
+	  d[n] = 2 * e / (1 + e); /* 1 - tanh(u) */
+	  /* pi/2 cosh(t) / cosh(u)^2, with 1/cosh(u)^2 = d (2 - d) */
+	  w[n] = M_PI / 2 * cosh(t) * d[n] * (2 - d[n]);
+	  upper[n] = t > 0;
+	  ++n;
+     }
+     return n;
+}
+
+int decubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		      unsigned dim, const double *xmin, const double *xmax,
+		      size_t maxEval, double reqAbsError, double reqRelError,
+		      error_norm norm, const cubature_opts *opts,
+		      double *val, double *err)
+{
+     int status = FAILURE;
+     double deadline = make_deadline(opts);
+     unsigned layout = opts ? opts->layout : 0;
+     size_t nmax = 2 * (size_t) (DE_TMAX * (1 << DE_MAXLEVEL)) + 1;
+     size_t *nv = NULL, *nold, *m, numEval = 0;
+     unsigned level, j, k;
+     double *d = NULL, *w, *pt = NULL, *x, *wt, *fx, *xs = NULL, *ws;
+     double *sum = NULL, *asum, *prev, *dprev;
+     int *upper = NULL;
+
+     if (fdim == 0) return SUCCESS; /* nothing to do */
+     if (dim == 0) { /* trivial integration */
+	  if (f(0, 1, xmin, fdata, fdim, val)) return FAILURE;
+	  for (k = 0; k < fdim; ++k) err[k] = 0;
+	  return SUCCESS;
+     }
+     if (fdim <= 1) norm = ERROR_INDIVIDUAL; /* norm is irrelevant */
+     if (norm < 0 || norm > ERROR_LINF) return FAILURE; /* invalid norm */
+
+     /* nodes of a level, then for each dimension the coordinates and
+	weights of its valid nodes so far (xs, ws), in the order of the
+	levels: nv of them, of which nold come from the previous levels,
+	and m the multi-index of a point.  The points of a chunk are
+	gathered in pt, and laid out in x for the integrand. */
+     d = (double *) malloc(sizeof(double) * nmax * 2);
+     upper = (int *) malloc(sizeof(int) * nmax);
+     xs = (double *) malloc(sizeof(double) * nmax * dim * 2);
+     nv = (size_t *) malloc(sizeof(size_t) * dim * 3);
+     pt = (double *) malloc(sizeof(double) * DE_CHUNK * (2*dim + fdim + 1));
+     sum = (double *) malloc(sizeof(double) * fdim * 4);
+     if (!d || !upper || !xs || !nv || !pt || !sum) goto done;
+     w = d + nmax;
+     ws = xs + nmax * dim;
+     nold = nv + dim; m = nold + dim;
+     x = pt + DE_CHUNK * dim;
+     fx = x + DE_CHUNK * dim;
+     wt = fx + DE_CHUNK * fdim;
+     asum = sum + fdim; prev = asum + fdim; dprev = prev + fdim;
+
+     for (j = 0; j < dim; ++j) nv[j] = 0;
+     for (k = 0; k < fdim; ++k) sum[k] = asum[k] = 0;
+
+     for (level = 0; level <= DE_MAXLEVEL; ++level) {
+	  size_t n = de_nodes(level, d, upper, w), i, npts = 1, nnew, np = 0;
+	  double scale = 1, emax = 0;
+
+	  /* append the new nodes, dropping those that round to an
+	     endpoint (where the integrand may be singular) */
+	  for (j = 0; j < dim; ++j) {
+	       double a = xmin[j], b = xmax[j], hw = 0.5 * (b - a);
+	       double *xj = xs + j * nmax, *wj = ws + j * nmax;
+	       nold[j] = nv[j];
+	       for (i = 0; i < n; ++i) {
+		    double xi = upper[i] ? b - hw * d[i] : a + hw * d[i];
+		    if (xi == a || xi == b || !(w[i] > 0)) continue;
+		    xj[nv[j]] = xi;
+		    wj[nv[j]++] = w[i];
+	       }
+	       npts *= nv[j];
+	       scale *= ldexp(hw, -(int) level);
+	  }
+	  for (nnew = 1, j = 0; j < dim; ++j) nnew *= nold[j];
+	  nnew = npts - nnew; /* points with at least one new coordinate */
+	  if (level > 0 && maxEval && numEval + nnew > maxEval)
+	       break;
+
+	  /* evaluate them, in chunks of DE_CHUNK points */
+	  for (j = 0; j < dim; ++j) m[j] = 0;
+	  for (i = 0; i < npts; ++i) {
+	       int isnew = 0;
+	       for (j = 0; j < dim; ++j) isnew |= m[j] >= nold[j];
+	       if (isnew) {
+		    double wi = 1;
+		    for (j = 0; j < dim; ++j) {
+			 pt[np * dim + j] = xs[j * nmax + m[j]];
+			 wi *= ws[j * nmax + m[j]];
+		    }
+		    wt[np++] = wi;
+	       }
+	       if (np == DE_CHUNK || (np && i + 1 == npts)) {
+		    size_t p, xd = 1, xst = dim, fs = fdim, fd = 1;
+		    if (layout & CUBATURE_POINTS_DIM_MAJOR) {
+			 xd = np; xst = 1;
+		    }
+		    if (layout & CUBATURE_VALUES_FDIM_MAJOR) {
+			 fd = np; fs = 1;
+		    }
+		    for (p = 0; p < np; ++p)
+			 for (j = 0; j < dim; ++j)
+			      x[p * xst + j * xd] = pt[p * dim + j];
+		    if (f(dim, np, x, fdata, fdim, fx)) goto done;
+		    for (p = 0; p < np; ++p)
+			 for (k = 0; k < fdim; ++k) {
+			      double v = wt[p] * fx[p * fs + k * fd];
+			      sum[k] += v;
+			      asum[k] += fabs(v);
+			 }
+		    numEval += np;
+		    np = 0;
+	       }
+	       for (j = 0; j < dim && ++m[j] == nv[j]; ++j) m[j] = 0;
+	  }
+
+	  /* the estimates of this level, and the error from the
+	     differences between the successive levels, whose digits
+	     (nearly) double from one level to the next */
+	  for (k = 0; k < fdim; ++k) {
+	       double v = sum[k] * scale, dk = fabs(v - prev[k]);
+	       double emin = 4 * DBL_EPSILON * asum[k] * fabs(scale);
+	       if (level == 0)
+		    err[k] = HUGE_VAL;
+	       else if (level >= 2 && dk < dprev[k])
+		    err[k] = dk * dk / dprev[k];
+	       else
+		    err[k] = dk;
+	       if (err[k] < emin) err[k] = emin; /* rounding errors */
+	       if (err[k] > emax) emax = err[k];
+	       dprev[k] = dk;
+	       prev[k] = val[k] = v;
+	  }
+	  if (opts && opts->trace)
+	       opts->trace(opts->tdata, level, nnew, nv[0], emax);
+
+	  if (level > 0
+	      && converged(fdim, val, err, reqAbsError, reqRelError, norm))
+	       break;
+	  if (DEADLINE_PASSED(deadline)) {
+	       status = CUBATURE_DEADLINE_REACHED;
+	       goto done;
+	  }
+     }
+     status = SUCCESS;
+
+done:
+     free(sum);
+     free(pt);
+     free(nv);
+     free(xs);
+     free(upper);
+     free(d);
+     return status;
+}
+
+#include "vwrapper.h"
+
+int decubature_opts(unsigned fdim, integrand f, void *fdata,
+		    unsigned dim, const double *xmin, const double *xmax,
+		    size_t maxEval, double reqAbsError, double reqRelError,
+		    error_norm norm, const cubature_opts *opts,
+		    double *val, double *err)
+{
+     fv_data d;
+     cubature_opts o;
+
+     /* fv handles one point at a time, for which layouts are moot */
+     if (opts) {
+	  o = *opts;
+	  o.layout = 0;
+	  opts = &o;
+     }
+     d.f = f; d.fdata = fdata;
+     return decubature_v_opts(fdim, fv, &d, dim, xmin, xmax,
+			      maxEval, reqAbsError, reqRelError, norm, opts,
+			      val, err);
+}
@@ -109,6 +109,9 @@
 #define SUCCESS 0
 #define FAILURE 1
 
+#include "timer.h"
+#include "worker.h"
+
 /***************************************************************************/
 /* Basic datatypes */
 
@@ -129,7 +132,7 @@ typedef struct {
      unsigned dim;
      double *data;	/* length 2*dim = center followed by half-widths */
      double vol;	/* cache volume = product of widths */
-} hypercube;
+} hypercube; /* or a simplex, for rulegm: data holds its dim+1 vertices */
 
 static double compute_vol(const hypercube *h)
 {
@@ -180,9 +183,16 @@ static void destroy_hypercube(hypercube *h)
 typedef struct {
      hypercube h;
      unsigned splitDim;
+     unsigned splitDims[CUBATURE_MAX_SPLIT]; /* for multi-way cuts, the
+						 dimensions of the
+						 successive halvings */
      unsigned fdim; /* dimensionality of vector integrand */
-     esterr *ee; /* array of length fdim */
+     esterr *ee; /* array of length fdim, not owned by the region: a row
+		    of the buffer of the regions being evaluated, see
+		    attach_ee (the heap keeps the values in its slab) */
      double errmax; /* max ee[k].err */
+     size_t cell; /* index of the initial region it was cut from, see
+		     opts->cell_val */
 } region;
 
 static region make_region(const hypercube *h, unsigned fdim)
@@ -190,39 +200,60 @@ static region make_region(const hypercube *h, unsigned fdim)
      region R;
      R.h = make_hypercube(h->dim, h->data, h->data + h->dim);
      R.splitDim = 0;
+     memset(R.splitDims, 0, sizeof(R.splitDims));
      R.fdim = fdim;
-     R.ee = R.h.data ? (esterr *) malloc(sizeof(esterr) * fdim) : NULL;
+     R.ee = NULL;
      R.errmax = HUGE_VAL;
+     R.cell = 0;
      return R;
 }
 
 static void destroy_region(region *R)
 {
      destroy_hypercube(&R->h);
-     free(R->ee);
-     R->ee = 0;
 }
 
+/* point the regions R[0..nR_alloc-1] to the rows of the buffer *work
+   of their values, grown to nR_alloc rows */
+static int attach_ee(region *R, size_t nR_alloc, unsigned fdim,
+		     esterr **work)
+{
+     size_t i;
+     esterr *w = (esterr *) realloc(*work,
+				    sizeof(esterr) * fdim * nR_alloc);
+     if (!w) return FAILURE;
+     *work = w;
+     for (i = 0; i < nR_alloc; ++i) R[i].ee = w + i * fdim;
+     return SUCCESS;
+}
+
+/* split R in two along R->splitDim, the other half in R2 (which keeps
+   its own row of values) */
 static int cut_region(region *R, region *R2)
 {
      unsigned d = R->splitDim, dim = R->h.dim;
+     esterr *ee2 = R2->ee;
      *R2 = *R;
+     R2->ee = ee2;
      R->h.data[d + dim] *= 0.5;
      R->h.vol *= 0.5;
      R2->h = make_hypercube(dim, R->h.data, R->h.data + dim);
      if (!R2->h.data) return FAILURE;
      R->h.data[d] -= R->h.data[d + dim];
      R2->h.data[d] += R->h.data[d + dim];
-     R2->ee = (esterr *) malloc(sizeof(esterr) * R2->fdim);
-     return R2->ee == NULL;
+     return SUCCESS;
 }
 
 struct rule_s; /* forward declaration */
 
-typedef int (*evalError_func)(struct rule_s *r,
-			      unsigned fdim, integrand_v f, void *fdata,
-			      unsigned nR, region *R);
+/* a rule evaluates regions in three steps: their points are written to
+   r->pts, the integrand fills r->vals at these points, and the estimates
+   of the regions are computed from r->vals (see eval_regions) */
+typedef int (*points_func)(struct rule_s *r, unsigned nR, region *R);
+typedef void (*errors_func)(struct rule_s *r, unsigned fdim,
+			    unsigned nR, region *R);
 typedef void (*destroy_func)(struct rule_s *r);
+typedef int (*cut_func)(region *R, region *R2);
 
 
 typedef struct rule_s {
@@ -231,8 +262,14 @@ typedef struct rule_s {
      unsigned num_regions; /* max number of regions evaluated at once */
      double *pts; /* points to eval: num_regions * num_points * dim */
      double *vals; /* num_regions * num_points * fdim */
-     evalError_func evalError;
+     unsigned layout; /* CUBATURE_*_MAJOR flags for pts and vals */
+     points_func points;
+     errors_func errors;
      destroy_func destroy;
+     cut_func cut; /* splits R into R and R2, cut_region by default */
+     unsigned split; /* halvings per cut region, see opts->split */
+     unsigned ndata; /* length of the data of a region (2*dim for a
+			hypercube, its center and half-widths) */
 } rule;
 
 static void destroy_rule(rule *r)
@@ -266,7 +303,8 @@ static int alloc_rule_pts(rule *r, unsigned num_regions)
 
 static rule *make_rule(size_t sz, /* >= sizeof(rule) */
 		       unsigned dim, unsigned fdim, unsigned num_points,
-		       evalError_func evalError, destroy_func destroy)
+		       points_func points, errors_func errors,
+		       destroy_func destroy)
 {
      rule *r;
 
@@ -276,23 +314,118 @@ static rule *make_rule(size_t sz, /* >= sizeof(rule) */
      r->pts = r->vals = NULL;
      r->num_regions = 0;
      r->dim = dim; r->fdim = fdim; r->num_points = num_points;
-     r->evalError = evalError;
+     r->layout = 0;
+     r->points = points;
+     r->errors = errors;
      r->destroy = destroy;
+     r->cut = cut_region;
+     r->split = 1;
+     r->ndata = 2 * dim;
      return r;
 }
 
+/* with r->split > 1, rank after R->splitDim the dimensions of the next
+   largest differences d (the widest first among equal ones), along which
+   a multi-way cut halves R in turn */
+static void rank_split_dims(const rule *r, region *R, const double *d)
+{
+     unsigned dim = r->dim, m = r->split < dim ? r->split : dim, i, l, p;
+     const double *halfwidth = R->h.data + dim;
+
+     R->splitDims[0] = R->splitDim;
+     for (l = 1; l < m; ++l) {
+	  unsigned best = dim;
+	  for (i = 0; i < dim; ++i) {
+	       for (p = 0; p < l && R->splitDims[p] != i; ++p) ;
+	       if (p < l) continue; /* already taken */
+	       if (best == dim || d[i] > d[best]
+		   || (d[i] == d[best] && halfwidth[i] > halfwidth[best]))
+		    best = i;
+	  }
+	  R->splitDims[l] = best;
+     }
+}
+
+/* cut R[0] into the 2^r->split pieces R[0..2^r->split-1] (keeping the
+   rows of values of the regions), halving each piece along the
+   dimensions ranked in R->splitDims in turn */
+static int cut_pieces(rule *r, region *R)
+{
+     unsigned n, l, i, m = r->split < r->dim ? r->split : r->dim;
+
+     for (n = 1, l = 0; l < r->split; ++l, n *= 2)
+	  for (i = 0; i < n; ++i) {
+	       if (r->split > 1) R[i].splitDim = R[i].splitDims[l % m];
+	       if (r->cut(R + i, R + n + i)) return FAILURE;
+	  }
+     return SUCCESS;
+}
+
 /* note: all regions must have same fdim */
 static int eval_regions(unsigned nR, region *R,
 			integrand_v f, void *fdata, rule *r)
 {
      unsigned iR;
      if (nR == 0) return SUCCESS; /* nothing to evaluate */
-     if (r->evalError(r, R->fdim, f, fdata, nR, R)) return FAILURE;
+     if (r->points(r, nR, R)
+	 || f(r->dim, (size_t) nR * r->num_points, r->pts, fdata, R->fdim,
+	      r->vals))
+	  return FAILURE;
+     r->errors(r, R->fdim, nR, R);
      for (iR = 0; iR < nR; ++iR)
 	  R[iR].errmax = errMax(R->fdim, R[iR].ee);
      return SUCCESS;
 }
 
+/***************************************************************************/
+/* Buffer of evaluation points, stored point after point (ld == 0) or
+   coordinate after coordinate (ld == total number of points, for
+   CUBATURE_POINTS_DIM_MAJOR). */
+
+typedef struct {
+     double *pts;
+     size_t n; /* number of points stored so far */
+     size_t ld; /* distance between coordinates of a point, or 0 */
+     unsigned dim;
+} ptbuf;
+
+static ptbuf make_ptbuf(double *pts, unsigned dim, size_t npts, unsigned layout)
+{
+     ptbuf b;
+     b.pts = pts;
+     b.n = 0;
+     b.ld = (layout & CUBATURE_POINTS_DIM_MAJOR) ? npts : 0;
+     b.dim = dim;
+     return b;
+}
+
+static void add_point(ptbuf *b, const double *p)
+{
+     if (b->ld) {
+	  unsigned j;
+	  for (j = 0; j < b->dim; ++j)
+	       b->pts[j * b->ld + b->n] = p[j];
+     }
+     else
+	  memcpy(b->pts + b->n * b->dim, p, sizeof(double) * b->dim);
+     b->n++;
+}
+
+/* distances between consecutive points (*vs) and consecutive
+   components (*cs) of the integrand values for npts points */
+static void vals_strides(unsigned layout, unsigned fdim, size_t npts,
+			 size_t *vs, size_t *cs)
+{
+     if (layout & CUBATURE_VALUES_FDIM_MAJOR) {
+	  *vs = 1;
+	  *cs = npts;
+     }
+     else {
+	  *vs = fdim;
+	  *cs = 1;
+     }
+}
+
 /***************************************************************************/
 /* Functions to loop over points in a hypercube. */
 
@@ -340,7 +473,7 @@ static unsigned ls0(unsigned n)
  *  A Gray-code ordering is used to minimize the number of coordinate updates
  *  in p, although this doesn't matter as much now that we are saving all pts.
  */
-static void evalR_Rfs(double *pts, unsigned dim, double *p, const double *c, const double *r)
+static void evalR_Rfs(ptbuf *pts, unsigned dim, double *p, const double *c, const double *r)
 {
      unsigned i;
      unsigned signs = 0; /* 0/1 bit = +/- for corresponding element of r[] */
@@ -354,7 +487,7 @@ static void evalR_Rfs(double *pts, unsigned dim, double *p, const double *c, con
      for (i = 0;; ++i) {
 	  unsigned mask, d;
 
-	  memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	  add_point(pts, p);
 
 	  d = ls0(i);	/* which coordinate to flip */
 	  if (d >= dim)
@@ -367,7 +500,7 @@ static void evalR_Rfs(double *pts, unsigned dim, double *p, const double *c, con
      }
 }
 
-static void evalRR0_0fs(double *pts, unsigned dim, double *p, const double *c, const double *r)
+static void evalRR0_0fs(ptbuf *pts, unsigned dim, double *p, const double *c, const double *r)
 {
      unsigned i, j;
 
@@ -375,13 +508,13 @@ static void evalRR0_0fs(double *pts, unsigned dim, double *p, const double *c, c
 	  p[i] = c[i] - r[i];
 	  for (j = i + 1; j < dim; ++j) {
 	       p[j] = c[j] - r[j];
-	       memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	       add_point(pts, p);
 	       p[i] = c[i] + r[i];
-	       memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	       add_point(pts, p);
 	       p[j] = c[j] + r[j];
-	       memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	       add_point(pts, p);
 	       p[i] = c[i] - r[i];
-	       memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	       add_point(pts, p);
 
 	       p[j] = c[j];	/* Done with j -> Restore p[j] */
 	  }
@@ -389,25 +522,25 @@ static void evalRR0_0fs(double *pts, unsigned dim, double *p, const double *c, c
      }
 }
 
-static void evalR0_0fs4d(double *pts, unsigned dim, double *p, const double *c,
+static void evalR0_0fs4d(ptbuf *pts, unsigned dim, double *p, const double *c,
 			 const double *r1, const double *r2)
 {
      unsigned i;
 
-     memcpy(pts, p, sizeof(double) * dim); pts += dim;
+     add_point(pts, p);
 
      for (i = 0; i < dim; i++) {
 	  p[i] = c[i] - r1[i];
-	  memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	  add_point(pts, p);
 
 	  p[i] = c[i] + r1[i];
-	  memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	  add_point(pts, p);
 
 	  p[i] = c[i] - r2[i];
-	  memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	  add_point(pts, p);
 
 	  p[i] = c[i] + r2[i];
-	  memcpy(pts, p, sizeof(double) * dim); pts += dim;
+	  add_point(pts, p);
 
 	  p[i] = c[i];
      }
@@ -454,25 +587,20 @@ static void destroy_rule75genzmalik(rule *r_)
      free(r->p);
 }
 
-static int rule75genzmalik_evalError(rule *r_, unsigned fdim, integrand_v f, void *fdata, unsigned nR, region *R)
+/* the points of the regions R[0..nR-1], in r->pts */
+static int rule75genzmalik_points(rule *r_, unsigned nR, region *R)
 {
      /* lambda2 = sqrt(9/70), lambda4 = sqrt(9/10), lambda5 = sqrt(9/19) */
      const double lambda2 = 0.3585685828003180919906451539079374954541;
      const double lambda4 = 0.9486832980505137995996680633298155601160;
      const double lambda5 = 0.6882472016116852977216287342936235251269;
-     const double weight2 = 980. / 6561.;
-     const double weight4 = 200. / 19683.;
-     const double weightE2 = 245. / 486.;
-     const double weightE4 = 25. / 729.;
-     const double ratio = (lambda2 * lambda2) / (lambda4 * lambda4);
 
      rule75genzmalik *r = (rule75genzmalik *) r_;
-     unsigned i, j, iR, dim = r_->dim;
-     size_t npts = 0;
-     double *diff, *pts, *vals;
+     unsigned i, iR, dim = r_->dim;
+     ptbuf b;
 
      if (alloc_rule_pts(r_, nR)) return FAILURE;
-     pts = r_->pts; vals = r_->vals;
+     b = make_ptbuf(r_->pts, dim, (size_t) nR * r_->num_points, r_->layout);
 
      for (iR = 0; iR < nR; ++iR) {
 	  const double *center = R[iR].h.data;
@@ -488,24 +616,41 @@ static int rule75genzmalik_evalError(rule *r_, unsigned fdim, integrand_v f, voi
 
 	  /* Evaluate points in the center, in (lambda2,0,...,0) and
 	     (lambda3=lambda4, 0,...,0).  */
-	  evalR0_0fs4d(pts + npts*dim, dim, r->p, center,
+	  evalR0_0fs4d(&b, dim, r->p, center,
 		       r->widthLambda2, r->widthLambda);
-	  npts += num0_0(dim) + 2 * numR0_0fs(dim);
 
 	  /* Calculate points for (lambda4, lambda4, 0, ...,0) */
-	  evalRR0_0fs(pts + npts*dim, dim, r->p, center, r->widthLambda);
-	  npts += numRR0_0fs(dim);
+	  evalRR0_0fs(&b, dim, r->p, center, r->widthLambda);
 
 	  /* Calculate points for (lambda5, lambda5, ..., lambda5) */
 	  for (i = 0; i < dim; ++i)
 	       r->widthLambda[i] = halfwidth[i] * lambda5;
-	  evalR_Rfs(pts + npts*dim, dim, r->p, center, r->widthLambda);
-	  npts += numR_Rfs(dim);
+	  evalR_Rfs(&b, dim, r->p, center, r->widthLambda);
      }
 
-     /* Evaluate the integrand function(s) at all the points */
-     if (f(dim, npts, pts, fdata, fdim, vals))
-	  return FAILURE;
+     return SUCCESS;
+}
+
+/* the estimates of the regions R[0..nR-1] from the values of the
+   integrand at their points, in r->vals, and the dimensions along which
+   to cut them */
+static void rule75genzmalik_errors(rule *r_, unsigned fdim, unsigned nR,
+				   region *R)
+{
+     const double lambda2 = 0.3585685828003180919906451539079374954541;
+     const double lambda4 = 0.9486832980505137995996680633298155601160;
+     const double weight2 = 980. / 6561.;
+     const double weight4 = 200. / 19683.;
+     const double weightE2 = 245. / 486.;
+     const double weightE4 = 25. / 729.;
+     const double ratio = (lambda2 * lambda2) / (lambda4 * lambda4);
+
+     rule75genzmalik *r = (rule75genzmalik *) r_;
+     unsigned i, j, iR, dim = r_->dim;
+     size_t npts = (size_t) nR * r_->num_points, vs, cs;
+     double *diff, *pts = r_->pts, *vals = r_->vals;
+
+     vals_strides(r_->layout, fdim, npts, &vs, &cs);
 
      /* we are done with the points, and so we can re-use the pts
 	array to store the maximum difference diff[i] in each dimension
@@ -514,8 +659,8 @@ static int rule75genzmalik_evalError(rule *r_, unsigned fdim, integrand_v f, voi
      for (i = 0; i < dim * nR; ++i) diff[i] = 0;
 
      for (j = 0; j < fdim; ++j) {
-	  const double *v = vals + j;
-#         define VALS(i) v[fdim*(i)]
+	  const double *v = vals + j * cs;
+#         define VALS(i) v[vs*(i)]
 	  for (iR = 0; iR < nR; ++iR) {
 	       double result, res5th;
 	       double val0, sum2=0, sum3=0, sum4=0, sum5=0;
@@ -556,7 +701,7 @@ static int rule75genzmalik_evalError(rule *r_, unsigned fdim, integrand_v f, voi
 	       R[iR].ee[j].val = result;
 	       R[iR].ee[j].err = fabs(res5th - result);
 
-	       v += r_->num_points * fdim;
+	       v += r_->num_points * vs;
 	  }
 #         undef VALS
      }
@@ -581,8 +726,8 @@ static int rule75genzmalik_evalError(rule *r_, unsigned fdim, integrand_v f, voi
 			dimDiffMax = i;
 	  }
 	  R[iR].splitDim = dimDiffMax;
+	  if (r_->split > 1) rank_split_dims(r_, R + iR, diff + iR * dim);
      }
-     return SUCCESS;
 }
 
 static rule *make_rule75genzmalik(unsigned dim, unsigned fdim)
@@ -602,7 +747,8 @@ static rule *make_rule75genzmalik(unsigned dim, unsigned fdim)
 				       dim, fdim,
 				       num0_0(dim) + 2 * numR0_0fs(dim)
 				       + numRR0_0fs(dim) + numR_Rfs(dim),
-				       rule75genzmalik_evalError,
+				       rule75genzmalik_points,
+				       rule75genzmalik_errors,
 				       destroy_rule75genzmalik);
      if (!r) return NULL;
 
@@ -624,13 +770,227 @@ static rule *make_rule75genzmalik(unsigned dim, unsigned fdim)
      return (rule *) r;
 }
 
+/***************************************************************************/
+/* Low-cost rules for higher dimensions, without the 2^dim points of the
+   Genz-Malik rule:
+
+   degree 5: the degree-5 rule embedded in the Genz-Malik rule above
+             (center, (lambda2,0,...,0), (lambda4,0,...,0) and
+	     (lambda4,lambda4,0,...,0) points), with an embedded degree-3
+	     rule on the center and (lambda4,0,...,0) points.
+   degree 3: that degree-3 rule, with the midpoint rule embedded.
+
+   The error estimate is the difference between the two rules, and the
+   region is split along the dimension with the largest fourth (degree
+   5) or second (degree 3) difference. */
+
+typedef struct {
+     rule parent;
+     unsigned degree; /* 5 or 3 */
+
+     /* temporary arrays of length dim */
+     double *widthLambda, *widthLambda2, *p;
+
+     /* dimension-dependent constants */
+     double weight1, weight3, weightE1;
+} rule53;
+
+static void destroy_rule53(rule *r_)
+{
+     rule53 *r = (rule53 *) r_;
+     free(r->p);
+}
+
+static void evalR0_0fs(ptbuf *pts, unsigned dim, double *p, const double *c,
+		       const double *r)
+{
+     unsigned i;
+
+     add_point(pts, p);
+
+     for (i = 0; i < dim; i++) {
+	  p[i] = c[i] - r[i];
+	  add_point(pts, p);
+
+	  p[i] = c[i] + r[i];
+	  add_point(pts, p);
+
+	  p[i] = c[i];
+     }
+}
+
+static int rule53_points(rule *r_, unsigned nR, region *R)
+{
+     /* lambda2 = sqrt(9/70), lambda4 = sqrt(9/10), as in rule75genzmalik */
+     const double lambda2 = 0.3585685828003180919906451539079374954541;
+     const double lambda4 = 0.9486832980505137995996680633298155601160;
+
+     rule53 *r = (rule53 *) r_;
+     unsigned i, iR, dim = r_->dim;
+     ptbuf b;
+
+     if (alloc_rule_pts(r_, nR)) return FAILURE;
+     b = make_ptbuf(r_->pts, dim, (size_t) nR * r_->num_points, r_->layout);
+
+     for (iR = 0; iR < nR; ++iR) {
+	  const double *center = R[iR].h.data;
+	  const double *halfwidth = R[iR].h.data + dim;
+
+	  for (i = 0; i < dim; ++i)
+	       r->p[i] = center[i];
+	  for (i = 0; i < dim; ++i)
+	       r->widthLambda[i] = halfwidth[i] * lambda4;
+
+	  if (r->degree == 5) {
+	       for (i = 0; i < dim; ++i)
+		    r->widthLambda2[i] = halfwidth[i] * lambda2;
+	       evalR0_0fs4d(&b, dim, r->p, center,
+			    r->widthLambda2, r->widthLambda);
+	       evalRR0_0fs(&b, dim, r->p, center, r->widthLambda);
+	  }
+	  else
+	       evalR0_0fs(&b, dim, r->p, center, r->widthLambda);
+     }
+
+     return SUCCESS;
+}
+
+static void rule53_errors(rule *r_, unsigned fdim, unsigned nR, region *R)
+{
+     const double lambda2 = 0.3585685828003180919906451539079374954541;
+     const double lambda4 = 0.9486832980505137995996680633298155601160;
+     const double weight2 = 245. / 486.;
+     const double weight4 = 25. / 729.;
+     const double weightE3 = 5. / 27.;
+     const double ratio = (lambda2 * lambda2) / (lambda4 * lambda4);
+
+     rule53 *r = (rule53 *) r_;
+     unsigned i, j, iR, dim = r_->dim;
+     size_t npts = (size_t) nR * r_->num_points, vs, cs;
+     double *diff, *pts = r_->pts, *vals = r_->vals;
+
+     vals_strides(r_->layout, fdim, npts, &vs, &cs);
+
+     /* re-use pts for the differences in each dimension, as in
+	rule75genzmalik_errors */
+     diff = pts;
+     for (i = 0; i < dim * nR; ++i) diff[i] = 0;
+
+     for (j = 0; j < fdim; ++j) {
+	  const double *v = vals + j * cs;
+#         define VALS(i) v[vs*(i)]
+	  for (iR = 0; iR < nR; ++iR) {
+	       double result, resE;
+	       double val0, sum2=0, sum3=0, sum4=0;
+	       unsigned k, k0 = 1;
+
+	       val0 = VALS(0); /* central point */
+
+	       if (r->degree == 5) {
+		    for (k = 0; k < dim; ++k) {
+			 double v0 = VALS(k0 + 4*k);
+			 double v1 = VALS((k0 + 4*k) + 1);
+			 double v2 = VALS((k0 + 4*k) + 2);
+			 double v3 = VALS((k0 + 4*k) + 3);
+
+			 sum2 += v0 + v1;
+			 sum3 += v2 + v3;
+
+			 diff[iR * dim + k] +=
+			      fabs(v0 + v1 - 2*val0
+				   - ratio * (v2 + v3 - 2*val0));
+		    }
+		    k0 += 4*k;
+
+		    for (k = 0; k < numRR0_0fs(dim); ++k)
+			 sum4 += VALS(k0 + k);
+
+		    result = R[iR].h.vol * (r->weight1 * val0 + weight2 * sum2
+					    + r->weight3 * sum3
+					    + weight4 * sum4);
+		    resE = R[iR].h.vol * (r->weightE1 * val0
+					  + weightE3 * sum3);
+	       }
+	       else {
+		    for (k = 0; k < dim; ++k) {
+			 double v0 = VALS(k0 + 2*k);
+			 double v1 = VALS((k0 + 2*k) + 1);
+
+			 sum3 += v0 + v1;
+
+			 diff[iR * dim + k] += fabs(v0 + v1 - 2*val0);
+		    }
+
+		    result = R[iR].h.vol * (r->weightE1 * val0
+					    + weightE3 * sum3);
+		    resE = R[iR].h.vol * val0;
+	       }
+
+	       R[iR].ee[j].val = result;
+	       R[iR].ee[j].err = fabs(resE - result);
+
+	       v += r_->num_points * vs;
+	  }
+#         undef VALS
+     }
+
+     /* split along the largest difference, preferring the widest
+	dimension among (nearly) equal ones */
+     for (iR = 0; iR < nR; ++iR) {
+	  const double *d = diff + iR * dim;
+	  const double *halfwidth = R[iR].h.data + dim;
+	  double maxdiff = 0;
+	  unsigned dimDiffMax = 0;
+
+	  for (i = 0; i < dim; ++i)
+	       if (d[i] > maxdiff) maxdiff = d[i];
+	  maxdiff *= 1 - 1e-10;
+	  for (i = 0; i < dim; ++i)
+	       if (d[i] >= maxdiff
+		   && (d[dimDiffMax] < maxdiff
+		       || halfwidth[i] > halfwidth[dimDiffMax]))
+		    dimDiffMax = i;
+	  R[iR].splitDim = dimDiffMax;
+	  if (r_->split > 1) rank_split_dims(r_, R + iR, diff + iR * dim);
+     }
+}
+
+static rule *make_rule53(unsigned dim, unsigned fdim, unsigned degree)
+{
+     rule53 *r;
+
+     if (dim < 1) return NULL;
+
+     r = (rule53 *) make_rule(sizeof(rule53), dim, fdim,
+			      degree == 5
+			      ? num0_0(dim) + 2 * numR0_0fs(dim)
+			      + numRR0_0fs(dim)
+			      : num0_0(dim) + numR0_0fs(dim),
+			      rule53_points, rule53_errors, destroy_rule53);
+     if (!r) return NULL;
+     r->degree = degree;
+
+     if (degree == 5) {
+	  /* the weightE* of rule75genzmalik */
+	  r->weight1 = (real(729 - 950 * to_int(dim) + 50 * isqr(to_int(dim)))
+			/ real(729));
+	  r->weight3 = real(265 - 100 * to_int(dim)) / real(1458);
+     }
+     r->weightE1 = real(27 - 10 * to_int(dim)) / real(27);
+
+     r->p = (double *) malloc(sizeof(double) * dim * 3);
+     if (!r->p) { destroy_rule((rule *) r); return NULL; }
+     r->widthLambda = r->p + dim;
+     r->widthLambda2 = r->p + 2 * dim;
+
+     return (rule *) r;
+}
+
 /***************************************************************************/
 /* 1d 15-point Gaussian quadrature rule, based on qk15.c and qk.c in
    GNU GSL (which in turn is based on QUADPACK). */
 
-static int rule15gauss_evalError(rule *r,
-				 unsigned fdim, integrand_v f, void *fdata,
-				 unsigned nR, region *R)
+static int rule15gauss_points(rule *r, unsigned nR, region *R)
 {
      /* Gauss quadrature weights and kronrod quadrature abscissae and
 	weights as evaluated with 80 decimal digit arithmetic by
@@ -648,28 +1008,12 @@ static int rule15gauss_evalError(rule *r,
 	  /* xgk[1], xgk[3], ... abscissae of the 7-point gauss rule.
 	     xgk[0], xgk[2], ... to optimally extend the 7-point gauss rule */
      };
-     static const double wg[4] = {  /* weights of the 7-point gauss rule */
-	  0.129484966168869693270611432679082,
-	  0.279705391489276667901467771423780,
-	  0.381830050505118944950369775488975,
-	  0.417959183673469387755102040816327
-     };
-     static const double wgk[8] = { /* weights of the 15-point kronrod rule */
-	  0.022935322010529224963732008058970,
-	  0.063092092629978553290700663189204,
-	  0.104790010322250183839876322541518,
-	  0.140653259715525918745189590510238,
-	  0.169004726639267902826583426598550,
-	  0.190350578064785409913256402421014,
-	  0.204432940075298892414161999234649,
-	  0.209482141084727828012999174891714
-     };
-     unsigned j, k, iR;
+     unsigned j, iR;
      size_t npts = 0;
-     double *pts, *vals;
+     double *pts;
 
      if (alloc_rule_pts(r, nR)) return FAILURE;
-     pts = r->pts; vals = r->vals;
+     pts = r->pts; /* with a single coordinate, both layouts are the same */
 
      for (iR = 0; iR < nR; ++iR) {
 	  const double center = R[iR].h.data[0];
@@ -692,12 +1036,37 @@ static int rule15gauss_evalError(rule *r,
 
 	  R[iR].splitDim = 0; /* no choice but to divide 0th dimension */
      }
+     return SUCCESS;
+}
 
-     if (f(1, npts, pts, fdata, fdim, vals))
-	  return FAILURE;
+static void rule15gauss_errors(rule *r, unsigned fdim, unsigned nR,
+			       region *R)
+{
+     const unsigned n = 8; /* as in rule15gauss_points */
+     static const double wg[4] = {  /* weights of the 7-point gauss rule */
+	  0.129484966168869693270611432679082,
+	  0.279705391489276667901467771423780,
+	  0.381830050505118944950369775488975,
+	  0.417959183673469387755102040816327
+     };
+     static const double wgk[8] = { /* weights of the 15-point kronrod rule */
+	  0.022935322010529224963732008058970,
+	  0.063092092629978553290700663189204,
+	  0.104790010322250183839876322541518,
+	  0.140653259715525918745189590510238,
+	  0.169004726639267902826583426598550,
+	  0.190350578064785409913256402421014,
+	  0.204432940075298892414161999234649,
+	  0.209482141084727828012999174891714
+     };
+     unsigned j, k, iR;
+     size_t npts, vs, cs;
+     const double *vals = r->vals;
+
+     vals_strides(r->layout, fdim, (size_t) nR * 15, &vs, &cs);
 
      for (k = 0; k < fdim; ++k) {
-          const double *vk = vals + k;
+          const double *vk = vals + k * cs;
 	  for (iR = 0; iR < nR; ++iR) {
 	       const double halfwidth = R[iR].h.data[1];
 	       double result_gauss = vk[0] * wg[n/2 - 1];
@@ -709,19 +1078,19 @@ static int rule15gauss_evalError(rule *r,
 	       npts = 1;
 	       for (j = 0; j < (n - 1) / 2; ++j) {
 		    int j2 = 2*j + 1;
-		    double v = vk[fdim*npts] + vk[fdim*npts+fdim];
+		    double v = vk[vs*npts] + vk[vs*npts+vs];
 		    result_gauss += wg[j] * v;
 		    result_kronrod += wgk[j2] * v;
-		    result_abs += wgk[j2] * (fabs(vk[fdim*npts])
-					     + fabs(vk[fdim*npts+fdim]));
+		    result_abs += wgk[j2] * (fabs(vk[vs*npts])
+					     + fabs(vk[vs*npts+vs]));
 		    npts += 2;
 	       }
 	       for (j = 0; j < n/2; ++j) {
 		    int j2 = 2*j;
-		    result_kronrod += wgk[j2] * (vk[fdim*npts]
-						 + vk[fdim*npts+fdim]);
-		    result_abs += wgk[j2] * (fabs(vk[fdim*npts])
-					     + fabs(vk[fdim*npts+fdim]));
+		    result_kronrod += wgk[j2] * (vk[vs*npts]
+						 + vk[vs*npts+vs]);
+		    result_abs += wgk[j2] * (fabs(vk[vs*npts])
+					     + fabs(vk[vs*npts+vs]));
 		    npts += 2;
 	       }
 
@@ -737,14 +1106,14 @@ static int rule15gauss_evalError(rule *r,
 	       npts = 1;
 	       for (j = 0; j < (n - 1) / 2; ++j) {
 		    int j2 = 2*j + 1;
-		    result_asc += wgk[j2] * (fabs(vk[fdim*npts]-mean)
-					     + fabs(vk[fdim*npts+fdim]-mean));
+		    result_asc += wgk[j2] * (fabs(vk[vs*npts]-mean)
+					     + fabs(vk[vs*npts+vs]-mean));
 		    npts += 2;
 	       }
 	       for (j = 0; j < n/2; ++j) {
 		    int j2 = 2*j;
-		    result_asc += wgk[j2] * (fabs(vk[fdim*npts]-mean)
-					     + fabs(vk[fdim*npts+fdim]-mean));
+		    result_asc += wgk[j2] * (fabs(vk[vs*npts]-mean)
+					     + fabs(vk[vs*npts+vs]-mean));
 		    npts += 2;
 	       }
 	       err = fabs(result_kronrod - result_gauss) * halfwidth;
@@ -761,10 +1130,9 @@ static int rule15gauss_evalError(rule *r,
 	       R[iR].ee[k].err = err;
 
 	       /* increment vk to point to next batch of results */
-	       vk += 15*fdim;
+	       vk += 15*vs;
 	  }
      }
-     return SUCCESS;
 }
 
 static rule *make_rule15gauss(unsigned dim, unsigned fdim)
@@ -772,132 +1140,485 @@ static rule *make_rule15gauss(unsigned dim, unsigned fdim)
      if (dim != 1) return NULL; /* this rule is only for 1d integrals */
 
      return make_rule(sizeof(rule), dim, fdim, 15,
-		      rule15gauss_evalError, 0);
+		      rule15gauss_points, rule15gauss_errors, 0);
 }
 
 /***************************************************************************/
-/* binary heap implementation (ala _Introduction to Algorithms_ by
-   Cormen, Leiserson, and Rivest), for use as a priority queue of
-   regions to integrate. */
+/* Degree 7 Grundmann-Moller rule on simplices, with the embedded degree 5
+   rule as error estimate:
 
-typedef region heap_item;
-#define KEY(hi) ((hi).errmax)
+     A. Grundmann and H. M. Moller, "Invariant integration formulas for
+     the n-simplex by combinatorial methods," SIAM J. Numer. Anal. 15 (2),
+     282-290 (1978).
+
+   The rule of degree 2s+1 sums, for i = 0..s, the points with barycentric
+   coordinates (2 beta_k + 1) / (2s+1+dim-2i) over all beta of |beta| =
+   s-i, so the points of the degree 5 rule are those of the degree 7 rule
+   with i >= 1.  The regions are simplices, bisected at the midpoint of
+   their longest edge. */
 
 typedef struct {
-     size_t n, nalloc;
-     heap_item *items;
-     unsigned fdim;
-     esterr *ee; /* array of length fdim of the total integrand & error */
-} heap;
+     rule parent;
+     double *lambda; /* barycentric coordinates, num_points * (dim+1) */
+     double *w7, *w5; /* weights per unit volume, of length num_points */
+     double *p; /* temporary array of length dim */
+} rulegm;
 
-static void heap_resize(heap *h, size_t nalloc)
+static void destroy_rulegm(rule *r_)
 {
-     h->nalloc = nalloc;
-     if (nalloc)
-         h->items = (heap_item *) realloc(h->items, sizeof(heap_item)*nalloc);
-     else {
-         /* BSD realloc does not free for a zero-sized reallocation */
-         free(h->items);
-         h->items = NULL;
-     }
+     rulegm *r = (rulegm *) r_;
+     free(r->lambda);
 }
 
-static heap heap_alloc(size_t nalloc, unsigned fdim)
+/* number of beta in N^n1 with |beta| = m */
+static unsigned num_compositions(unsigned n1, unsigned m)
 {
-     heap h;
-     unsigned i;
-     h.n = 0;
-     h.nalloc = 0;
-     h.items = 0;
-     h.fdim = fdim;
-     h.ee = (esterr *) malloc(sizeof(esterr) * fdim);
-     if (h.ee) {
-	  for (i = 0; i < fdim; ++i) h.ee[i].val = h.ee[i].err = 0;
-	  heap_resize(&h, nalloc);
+     unsigned k;
+     double c = 1;
+     for (k = 1; k <= m; ++k) c = c * (n1 - 1 + k) / k;
+     return (unsigned) (c + 0.5);
+}
+
+/* store in lambda the barycentric coordinates (2 beta_k + 1) / denom of
+   all beta[k..n1-1] of sum m (beta[0..k-1] being fixed), returning the
+   number of points stored */
+static unsigned gm_points(unsigned n1, unsigned k, unsigned m,
+			  unsigned *beta, double denom, double *lambda)
+{
+     unsigned i, n = 0;
+     if (k + 1 == n1) {
+	  beta[k] = m;
+	  for (i = 0; i < n1; ++i)
+	       lambda[i] = (2 * beta[i] + 1) / denom;
+	  return 1;
      }
-     return h;
+     for (i = 0; i <= m; ++i) {
+	  beta[k] = m - i;
+	  n += gm_points(n1, k + 1, i, beta, denom, lambda + n * n1);
+     }
+     return n;
 }
 
-/* note that heap_free does not deallocate anything referenced by the items */
-static void heap_free(heap *h)
+/* weight of the points of set i of the degree 2s+1 rule, per unit volume:
+   (-1)^i 2^-2s (2s+1+dim-2i)^(2s+1) dim! / (i! (2s+1+dim-i)!) */
+static double gm_weight(unsigned dim, unsigned s, unsigned i)
 {
-     h->n = 0;
-     heap_resize(h, 0);
-     h->fdim = 0;
-     free(h->ee);
+     double d = 2 * s + 1 + dim - 2 * i, w = pow(2, -2.0 * s);
+     unsigned k;
+     for (k = 0; k < 2 * s + 1; ++k) w *= d;
+     for (k = 2; k <= i; ++k) w /= k;
+     for (k = dim + 1; k <= 2 * s + 1 + dim - i; ++k) w /= k;
+     return i % 2 ? -w : w;
 }
 
-static int heap_push(heap *h, heap_item hi)
+static int rulegm_points(rule *r_, unsigned nR, region *R)
 {
-     int insert;
-     unsigned i, fdim = h->fdim;
+     rulegm *r = (rulegm *) r_;
+     unsigned i, j, k, iR, dim = r_->dim, np = r_->num_points;
+     ptbuf b;
 
-     for (i = 0; i < fdim; ++i) {
-	  h->ee[i].val += hi.ee[i].val;
-	  h->ee[i].err += hi.ee[i].err;
-     }
-     insert = h->n;
-     if (++(h->n) > h->nalloc) {
-	  heap_resize(h, h->n * 2);
-	  if (!h->items) return FAILURE;
-     }
+     if (alloc_rule_pts(r_, nR)) return FAILURE;
+     b = make_ptbuf(r_->pts, dim, (size_t) nR * np, r_->layout);
 
-     while (insert) {
-	  int parent = (insert - 1) / 2;
-	  if (KEY(hi) <= KEY(h->items[parent]))
-	       break;
+     for (iR = 0; iR < nR; ++iR) {
+	  const double *v = R[iR].h.data;
+	  for (i = 0; i < np; ++i) {
+	       const double *l = r->lambda + i * (dim + 1);
+	       for (j = 0; j < dim; ++j) {
+		    double x = 0;
+		    for (k = 0; k <= dim; ++k)
+			 x += l[k] * v[k * dim + j];
+		    r->p[j] = x;
+	       }
+	       add_point(&b, r->p);
+	  }
+     }
+     return SUCCESS;
+}
+
+static void rulegm_errors(rule *r_, unsigned fdim, unsigned nR, region *R)
+{
+     rulegm *r = (rulegm *) r_;
+     unsigned i, j, iR, np = r_->num_points;
+     size_t vs, cs;
+
+     vals_strides(r_->layout, fdim, (size_t) nR * np, &vs, &cs);
+     for (j = 0; j < fdim; ++j) {
+	  const double *v = r_->vals + j * cs;
+	  for (iR = 0; iR < nR; ++iR) {
+	       double res7 = 0, res5 = 0;
+	       for (i = 0; i < np; ++i) {
+		    res7 += r->w7[i] * v[vs * i];
+		    res5 += r->w5[i] * v[vs * i];
+	       }
+	       R[iR].ee[j].val = R[iR].h.vol * res7;
+	       R[iR].ee[j].err = R[iR].h.vol * fabs(res7 - res5);
+	       v += np * vs;
+	  }
+     }
+}
+
+/* bisect the simplex R at the midpoint of its longest edge */
+static int cut_simplex(region *R, region *R2)
+{
+     unsigned dim = R->h.dim, i, j, k, a = 0, b = 1;
+     double *v = R->h.data, lmax = -1;
+     esterr *ee2;
+
+     for (i = 0; i < dim; ++i)
+	  for (j = i + 1; j <= dim; ++j) {
+	       double l = 0;
+	       for (k = 0; k < dim; ++k) {
+		    double d = v[i * dim + k] - v[j * dim + k];
+		    l += d * d;
+	       }
+	       if (l > lmax) { lmax = l; a = i; b = j; }
+	  }
+     R->h.vol *= 0.5;
+     ee2 = R2->ee;
+     *R2 = *R;
+     R2->ee = ee2;
+     R2->h.data = (double *) malloc(sizeof(double) * dim * (dim + 1));
+     if (!R2->h.data) return FAILURE;
+     memcpy(R2->h.data, v, sizeof(double) * dim * (dim + 1));
+     for (k = 0; k < dim; ++k) {
+	  double m = 0.5 * (v[a * dim + k] + v[b * dim + k]);
+	  v[b * dim + k] = m;
+	  R2->h.data[a * dim + k] = m;
+     }
+     return SUCCESS;
+}
+
+static rule *make_rulegm(unsigned dim, unsigned fdim)
+{
+     const unsigned s = 3; /* degree 2s+1 = 7 */
+     rulegm *r;
+     unsigned i, n = 0, np = 0, *beta;
+
+     if (dim < 1) return NULL;
+     for (i = 0; i <= s; ++i) np += num_compositions(dim + 1, s - i);
+
+     r = (rulegm *) make_rule(sizeof(rulegm), dim, fdim, np,
+			      rulegm_points, rulegm_errors, destroy_rulegm);
+     if (!r) return NULL;
+     r->parent.cut = cut_simplex;
+     r->parent.ndata = dim * (dim + 1); /* the vertices */
+     r->lambda = (double *) malloc(sizeof(double)
+				   * (np * (dim + 1) + 2 * np + dim));
+     beta = (unsigned *) malloc(sizeof(unsigned) * (dim + 1));
+     if (!r->lambda || !beta) {
+	  free(beta);
+	  destroy_rule((rule *) r);
+	  return NULL;
+     }
+     r->w7 = r->lambda + np * (dim + 1);
+     r->w5 = r->w7 + np;
+     r->p = r->w5 + np;
+
+     for (i = 0; i <= s; ++i) {
+	  unsigned k, m = gm_points(dim + 1, 0, s - i, beta,
+				    2 * s + 1 + dim - 2 * i,
+				    r->lambda + n * (dim + 1));
+	  double w7 = gm_weight(dim, s, i);
+	  double w5 = i ? gm_weight(dim, s - 1, i - 1) : 0;
+	  for (k = 0; k < m; ++k) {
+	       r->w7[n + k] = w7;
+	       r->w5[n + k] = w5;
+	  }
+	  n += m;
+     }
+     free(beta);
+     return (rule *) r;
+}
+
+/***************************************************************************/
+/* d-ary heap implementation (generalizing the binary heap of
+   _Introduction to Algorithms_ by Cormen, Leiserson, and Rivest), for
+   use as a priority queue of regions to integrate.
+
+   The regions themselves live in a pool and stay put while they are in
+   the queue; the heap only orders small (key, index) pairs, so that
+   sifting moves 16 bytes per level instead of a whole region.  A 4-ary
+   layout halves the depth of the tree and keeps the children of a node
+   in one cache line. */
+
+#define HEAP_D 4
+
+typedef struct {
+     double errmax; /* copy of regs[i].errmax */
+     size_t i; /* index of the region in the pool */
+} heap_item;
+#define KEY(hi) ((hi).errmax)
+
+/* The values and errors of the regions in the pool are stored apart
+   from them, in one contiguous slab of 2*fdim doubles (or floats, if
+   compact) per pool slot, so that a large fdim costs no allocation per
+   region.  The totals ee are kept up to date as the regions come and go,
+   with compensated sums so that they need no final re-summation. */
+typedef struct {
+     size_t n, nalloc;
+     heap_item *items;
+     region *regs; /* pool of regions, of length nregs, without their ee */
+     void *slab; /* values and errors of the pool slots, interleaved */
+     int compact; /* slab of floats rather than doubles */
+     size_t nregs;
+     size_t *free_regs; /* unused pool slots, of length nfree */
+     size_t nfree;
+     unsigned fdim;
+     esterr *ee; /* array of length fdim of the total integrand & error */
+     esterr *ec; /* rounding errors of ee (compensation terms) */
+} heap;
+
+#define SLAB_SIZE(h) (2 * (size_t) (h)->fdim \
+		      * ((h)->compact ? sizeof(float) : sizeof(double)))
+
+static void heap_resize(heap *h, size_t nalloc)
+{
+     h->nalloc = nalloc;
+     if (nalloc) {
+	 h->items = (heap_item *) realloc(h->items, sizeof(heap_item)*nalloc);
+	 h->regs = (region *) realloc(h->regs, sizeof(region)*nalloc);
+	 h->free_regs = (size_t *) realloc(h->free_regs, sizeof(size_t)*nalloc);
+	 h->slab = realloc(h->slab, SLAB_SIZE(h) * nalloc);
+	 if (!h->items || !h->regs || !h->free_regs || !h->slab)
+	      h->nalloc = 0;
+     }
+     else {
+         /* BSD realloc does not free for a zero-sized reallocation */
+         free(h->items);
+         h->items = NULL;
+         free(h->regs);
+         h->regs = NULL;
+         free(h->free_regs);
+         h->free_regs = NULL;
+         free(h->slab);
+         h->slab = NULL;
+     }
+}
+
+static heap heap_alloc(size_t nalloc, unsigned fdim, int compact)
+{
+     heap h;
+     unsigned i;
+     h.n = 0;
+     h.nalloc = 0;
+     h.items = 0;
+     h.regs = 0;
+     h.slab = 0;
+     h.compact = compact;
+     h.nregs = 0;
+     h.free_regs = 0;
+     h.nfree = 0;
+     h.fdim = fdim;
+     h.ee = (esterr *) malloc(sizeof(esterr) * fdim * 2);
+     h.ec = h.ee ? h.ee + fdim : NULL;
+     if (h.ee) {
+	  for (i = 0; i < 2 * fdim; ++i) h.ee[i].val = h.ee[i].err = 0;
+	  heap_resize(&h, nalloc);
+     }
+     return h;
+}
+
+/* note that heap_free does not deallocate anything referenced by the items */
+static void heap_free(heap *h)
+{
+     h->n = 0;
+     h->nregs = h->nfree = 0;
+     heap_resize(h, 0);
+     h->fdim = 0;
+     free(h->ee);
+     h->ee = h->ec = NULL;
+}
+
+/* *s += x, accumulating the rounding error in *c (Neumaier's variant
+   of Kahan summation) */
+static void sum_add(double *s, double *c, double x)
+{
+     double t = *s + x;
+     if (fabs(*s) >= fabs(x))
+	  *c += (*s - t) + x;
+     else
+	  *c += (x - t) + *s;
+     *s = t;
+}
+
+/* the total values and errors, including the compensation terms */
+static void heap_totals(const heap *h, double *val, double *err)
+{
+     unsigned j;
+     for (j = 0; j < h->fdim; ++j) {
+	  val[j] = h->ee[j].val + h->ec[j].val;
+	  err[j] = h->ee[j].err + h->ec[j].err;
+     }
+}
+
+/* add the values and errors of the regions in the heap to val[c*fdim + j]
+   and err[c*fdim + j], c being the cell of each region */
+static void heap_cell_totals(const heap *h, double *val, double *err)
+{
+     size_t n;
+     unsigned j, fdim = h->fdim;
+
+     for (n = 0; n < h->n; ++n) {
+	  size_t i = h->items[n].i, c = h->regs[i].cell * fdim;
+	  if (h->compact) {
+	       const float *s = (const float *) h->slab + 2 * fdim * i;
+	       for (j = 0; j < fdim; ++j) {
+		    val[c + j] += s[2*j];
+		    err[c + j] += s[2*j+1];
+	       }
+	  }
+	  else {
+	       const double *s = (const double *) h->slab + 2 * fdim * i;
+	       for (j = 0; j < fdim; ++j) {
+		    val[c + j] += s[2*j];
+		    err[c + j] += s[2*j+1];
+	       }
+	  }
+     }
+}
+
+/* the region referenced by the heap item hi */
+#define HEAP_REGION(h, hi) ((h)->regs[(hi).i])
+
+static void heap_sift_up(heap *h, size_t insert)
+{
+     heap_item hi = h->items[insert];
+     while (insert) {
+	  size_t parent = (insert - 1) / HEAP_D;
+	  if (KEY(hi) <= KEY(h->items[parent]))
+	       break;
 	  h->items[insert] = h->items[parent];
 	  insert = parent;
      }
      h->items[insert] = hi;
-     return SUCCESS;
 }
 
-static int heap_push_many(heap *h, size_t ni, heap_item *hi)
+static void heap_sift_down(heap *h, size_t i)
+{
+     heap_item hi = h->items[i];
+     size_t n = h->n;
+     while (1) {
+	  size_t child = i * HEAP_D + 1, last, c, largest = i;
+	  double key = KEY(hi);
+	  if (child >= n)
+	       break;
+	  last = child + HEAP_D < n ? child + HEAP_D : n;
+	  for (c = child; c < last; ++c)
+	       if (KEY(h->items[c]) > key) {
+		    key = KEY(h->items[c]);
+		    largest = c;
+	       }
+	  if (largest == i)
+	       break;
+	  h->items[i] = h->items[largest];
+	  i = largest;
+     }
+     h->items[i] = hi;
+}
+
+/* store the region in the pool, and its values in the slab, and append
+   it (unordered) to the heap */
+static int heap_append(heap *h, const region *R)
 {
      size_t i;
+     unsigned j, fdim = h->fdim;
+
+     if (h->n + 1 > h->nalloc) {
+	  heap_resize(h, (h->n + 1) * 2);
+	  if (!h->nalloc) return FAILURE;
+     }
+     i = h->nfree ? h->free_regs[--(h->nfree)] : h->nregs++;
+     if (h->compact) {
+	  float *s = (float *) h->slab + 2 * fdim * i;
+	  for (j = 0; j < fdim; ++j) {
+	       /* the rounding of the value goes into the error, which is
+		  rounded up, so that the error stays an upper bound */
+	       float v = (float) R->ee[j].val;
+	       double e = R->ee[j].err + fabs(R->ee[j].val - v);
+	       float ef = (float) e;
+	       if (ef < e) ef = nextafterf(ef, HUGE_VALF);
+	       s[2*j] = v;
+	       s[2*j+1] = ef;
+	       sum_add(&h->ee[j].val, &h->ec[j].val, v);
+	       sum_add(&h->ee[j].err, &h->ec[j].err, ef);
+	  }
+     }
+     else {
+	  double *s = (double *) h->slab + 2 * fdim * i;
+	  for (j = 0; j < fdim; ++j) {
+	       s[2*j] = R->ee[j].val;
+	       s[2*j+1] = R->ee[j].err;
+	       sum_add(&h->ee[j].val, &h->ec[j].val, R->ee[j].val);
+	       sum_add(&h->ee[j].err, &h->ec[j].err, R->ee[j].err);
+	  }
+     }
+     h->regs[i] = *R;
+     h->regs[i].ee = NULL;
+     h->items[h->n].errmax = R->errmax;
+     h->items[h->n].i = i;
+     h->n++;
+     return SUCCESS;
+}
+
+/* push a batch of regions: sift each one up if the batch is small
+   compared to the heap, otherwise rebuild the heap bottom-up in O(n) */
+static int heap_push_many(heap *h, size_t ni, region *hi)
+{
+     size_t i, n0 = h->n;
      for (i = 0; i < ni; ++i)
-	  if (heap_push(h, hi[i])) return FAILURE;
+	  if (heap_append(h, hi + i)) return FAILURE;
+     if (ni < n0) {
+	  for (i = n0; i < h->n; ++i)
+	       heap_sift_up(h, i);
+     }
+     else if (h->n > 1) {
+	  i = (h->n - 2) / HEAP_D + 1;
+	  while (i--)
+	       heap_sift_down(h, i);
+     }
      return SUCCESS;
 }
 
-static heap_item heap_pop(heap *h)
+/* pop the region of largest error into *R, its values into the
+   (preallocated) R->ee */
+static void heap_pop(heap *h, region *R)
 {
-     heap_item ret;
-     int i, n, child;
+     esterr *ee = R->ee;
+     size_t i;
+     unsigned j, fdim = h->fdim;
 
      if (!(h->n)) {
 	  fprintf(stderr, "attempted to pop an empty heap\n");
 	  exit(EXIT_FAILURE);
      }
 
-     ret = h->items[0];
-     h->items[i = 0] = h->items[n = --(h->n)];
-     while ((child = i * 2 + 1) < n) {
-	  int largest;
-	  heap_item swap;
+     i = h->items[0].i;
+     *R = h->regs[i];
+     R->ee = ee;
+     h->free_regs[h->nfree++] = i;
+     h->items[0] = h->items[--(h->n)];
+     if (h->n)
+	  heap_sift_down(h, 0);
 
-	  if (KEY(h->items[child]) <= KEY(h->items[i]))
-	       largest = i;
-	  else
-	       largest = child;
-	  if (++child < n && KEY(h->items[largest]) < KEY(h->items[child]))
-	       largest = child;
-	  if (largest == i)
-	       break;
-	  swap = h->items[i];
-	  h->items[i] = h->items[largest];
-	  h->items[i = largest] = swap;
+     if (h->compact) {
+	  const float *s = (const float *) h->slab + 2 * fdim * i;
+	  for (j = 0; j < fdim; ++j) {
+	       ee[j].val = s[2*j];
+	       ee[j].err = s[2*j+1];
+	  }
      }
-
-     {
-	  unsigned i, fdim = h->fdim;
-	  for (i = 0; i < fdim; ++i) {
-	       h->ee[i].val -= ret.ee[i].val;
-	       h->ee[i].err -= ret.ee[i].err;
+     else {
+	  const double *s = (const double *) h->slab + 2 * fdim * i;
+	  for (j = 0; j < fdim; ++j) {
+	       ee[j].val = s[2*j];
+	       ee[j].err = s[2*j+1];
 	  }
      }
-     return ret;
+     for (j = 0; j < fdim; ++j) {
+	  sum_add(&h->ee[j].val, &h->ec[j].val, -ee[j].val);
+	  sum_add(&h->ee[j].err, &h->ec[j].err, -ee[j].err);
+     }
 }
 
 /***************************************************************************/
@@ -910,45 +1631,569 @@ static int converged(unsigned fdim, const esterr *ee,
 
 /***************************************************************************/
 
+/* the initial regions of the integration over the domain, stored in
+   R[0..*nR-1] by growing the array *R of length *nR_alloc as needed
+   (their ee are attached afterwards) */
+typedef int (*seed_func)(const void *domain, unsigned fdim,
+			 const cubature_opts *opts,
+			 region **R, size_t *nR_alloc, size_t *nR);
+
+/* split the hypercube domain at the breakpoints in opts, if any */
+static int seed_regions(const void *domain, unsigned fdim,
+			const cubature_opts *opts,
+			region **R, size_t *nR_alloc, size_t *nR)
+{
+     const hypercube *h = (const hypercube *) domain;
+     unsigned dim = h->dim, j, *k;
+     const double *b = opts ? opts->breaks : NULL;
+     const unsigned *nb = opts ? opts->nbreaks : NULL;
+     double *lo, *hi;
+     size_t n = 1, i, off;
+
+     if (!nb) { /* a single region */
+	  (*R)[0] = make_region(h, fdim);
+	  *nR = 1;
+	  return (*R)[0].h.data ? SUCCESS : FAILURE;
+     }
+
+     for (j = 0, off = 0; j < dim; off += nb[j++]) {
+	  double a = h->data[j] - h->data[dim + j];
+	  double c = h->data[j] + h->data[dim + j];
+	  for (i = 0; i < nb[j]; ++i)
+	       if (!(b[off + i] > (i ? b[off + i - 1] : a) && b[off + i] < c))
+		    return FAILURE; /* not increasing inside (a, c) */
+	  n *= nb[j] + 1;
+     }
+     if (n > *nR_alloc) {
+	  region *R2 = (region *) realloc(*R, sizeof(region) * n);
+	  if (!R2) return FAILURE;
+	  *R = R2;
+	  *nR_alloc = n;
+     }
+
+     k = (unsigned *) calloc(dim, sizeof(unsigned)); /* index of the cell */
+     lo = (double *) malloc(sizeof(double) * dim * 2);
+     if (!k || !lo) { free(k); free(lo); return FAILURE; }
+     hi = lo + dim;
+     for (i = 0; i < n; ++i) {
+	  hypercube hc;
+	  for (j = 0, off = 0; j < dim; off += nb[j++]) {
+	       lo[j] = k[j] ? b[off + k[j] - 1]
+		    : h->data[j] - h->data[dim + j];
+	       hi[j] = k[j] < nb[j] ? b[off + k[j]]
+		    : h->data[j] + h->data[dim + j];
+	  }
+	  hc = make_hypercube_range(dim, lo, hi);
+	  (*R)[i] = make_region(&hc, fdim);
+	  (*R)[i].cell = i;
+	  destroy_hypercube(&hc);
+	  if (!(*R)[i].h.data) {
+	       while (i-- > 0) destroy_region(*R + i);
+	       free(k); free(lo);
+	       return FAILURE;
+	  }
+	  for (j = 0; j < dim && ++k[j] > nb[j]; ++j) k[j] = 0;
+     }
+     free(k); free(lo);
+     *nR = n;
+     return SUCCESS;
+}
+
+typedef struct {
+     unsigned dim;
+     size_t n; /* number of simplices */
+     const double *v; /* their vertices, n * (dim+1) * dim */
+} simplices;
+
+/* |det(v1-v0, ..., vdim-v0)| / dim!, by Gaussian elimination */
+static double simplex_vol(unsigned dim, const double *v, double *a)
+{
+     unsigned i, j, k;
+     double det = 1;
+     for (i = 0; i < dim; ++i)
+	  for (j = 0; j < dim; ++j)
+	       a[i * dim + j] = v[(i + 1) * dim + j] - v[j];
+     for (k = 0; k < dim; ++k) {
+	  unsigned p = k;
+	  for (i = k + 1; i < dim; ++i)
+	       if (fabs(a[i * dim + k]) > fabs(a[p * dim + k])) p = i;
+	  if (a[p * dim + k] == 0) return 0;
+	  if (p != k)
+	       for (j = 0; j < dim; ++j) {
+		    double t = a[k * dim + j];
+		    a[k * dim + j] = a[p * dim + j];
+		    a[p * dim + j] = t;
+	       }
+	  det *= a[k * dim + k];
+	  for (i = k + 1; i < dim; ++i) {
+	       double c = a[i * dim + k] / a[k * dim + k];
+	       for (j = k; j < dim; ++j)
+		    a[i * dim + j] -= c * a[k * dim + j];
+	  }
+	  det /= k + 1;
+     }
+     return fabs(det);
+}
+
+/* one region per simplex of the domain */
+static int seed_simplices(const void *domain, unsigned fdim,
+			  const cubature_opts *opts,
+			  region **R, size_t *nR_alloc, size_t *nR)
+{
+     const simplices *s = (const simplices *) domain;
+     size_t i, nv = (size_t) s->dim * (s->dim + 1);
+     double *a;
+
+     (void) opts; /* breakpoints do not apply to simplices */
+     if (s->n > *nR_alloc) {
+	  region *R2 = (region *) realloc(*R, sizeof(region) * s->n);
+	  if (!R2) return FAILURE;
+	  *R = R2;
+	  *nR_alloc = s->n;
+     }
+     a = (double *) malloc(sizeof(double) * s->dim * s->dim);
+     if (!a) return FAILURE;
+     for (i = 0; i < s->n; ++i) {
+	  region *Ri = *R + i;
+	  Ri->h.dim = s->dim;
+	  Ri->h.data = (double *) malloc(sizeof(double) * nv);
+	  if (!Ri->h.data) {
+	       while (i-- > 0) destroy_region(*R + i);
+	       free(a);
+	       return FAILURE;
+	  }
+	  memcpy(Ri->h.data, s->v + i * nv, sizeof(double) * nv);
+	  Ri->h.vol = simplex_vol(s->dim, Ri->h.data, a);
+	  Ri->splitDim = 0;
+	  memset(Ri->splitDims, 0, sizeof(Ri->splitDims));
+	  Ri->fdim = fdim;
+	  Ri->ee = NULL;
+	  Ri->errmax = HUGE_VAL;
+	  Ri->cell = i;
+     }
+     free(a);
+     *nR = s->n;
+     return SUCCESS;
+}
+
+/* report the state of the heap to opts->trace, if any */
+static void trace_regions(const cubature_opts *opts, unsigned fdim,
+			  size_t iteration, size_t npts, const heap *regions)
+{
+     double emax = 0;
+     unsigned j;
+     if (!opts || !opts->trace) return;
+     for (j = 0; j < fdim; ++j)
+	  if (regions->ee[j].err > emax) emax = regions->ee[j].err;
+     opts->trace(opts->tdata, iteration, npts, regions->n, emax);
+}
+
+/***************************************************************************/
+/* storage kept between integrations, see cubature.h.  An integration
+   takes the rule and the arrays out of the workspace and gives them back
+   when done, so that a nested integration (from within the integrand)
+   with the same workspace allocates its own.  The arrays are absent if
+   ee == NULL, the rule if r == NULL. */
+
+struct cubature_workspace_s {
+     rule *r; /* the rule of the last integration, or NULL */
+     unsigned rule_kind; /* opts->rule it was made for */
+     heap regions; /* arrays of the heap, with fdim == regions.fdim */
+     region *R; /* regions being evaluated */
+     size_t nR_alloc;
+     esterr *work; /* their values, nR_alloc rows of fdim */
+     esterr *ee;
+};
+
+cubature_workspace *cubature_workspace_new(void)
+{
+     cubature_workspace *ws;
+     ws = (cubature_workspace *) malloc(sizeof(cubature_workspace));
+     if (ws) {
+	  ws->r = NULL;
+	  ws->rule_kind = 0;
+	  ws->R = NULL;
+	  ws->nR_alloc = 0;
+	  ws->work = NULL;
+	  ws->ee = NULL;
+     }
+     return ws;
+}
+
+/* release the heap storage of ws, keeping the rule */
+static void workspace_clear_heap(cubature_workspace *ws)
+{
+     if (ws->ee) {
+	  free(ws->ee);
+	  heap_free(&ws->regions);
+	  free(ws->R);
+	  free(ws->work);
+	  ws->ee = NULL;
+	  ws->R = NULL;
+	  ws->work = NULL;
+	  ws->nR_alloc = 0;
+     }
+}
+
+void cubature_workspace_free(cubature_workspace *ws)
+{
+     if (ws) {
+	  workspace_clear_heap(ws);
+	  destroy_rule(ws->r);
+	  free(ws);
+     }
+}
+
+/***************************************************************************/
+/* Pipelined refinement (opts->pipeline): while the integrand is evaluated
+   at the points of a batch of regions, a worker thread takes the next
+   worst regions out of the heap, as if the batch was already refined,
+   cuts them and computes their points with a second rule.  Once the
+   batch is evaluated and pushed, the regions to evaluate are chosen from
+   the heap and the speculative ones exactly as without the pipeline:
+   the speculative regions chosen in the order they were taken are used
+   as they are (with their points if they all are), and the others are
+   put back into the heap, discarded. */
+
+typedef struct {
+     rule *r; /* rule of the speculative regions, with their points */
+     heap *regions;
+     unsigned fdim;
+     int parallel;
+     size_t npieces; /* pieces per cut region */
+     region *P; /* the regions taken out of the heap, with a copy of
+		   their data and their values in the rows of pwork... */
+     esterr *pwork;
+     region *S; /* ...and their pieces, npieces per region */
+     size_t nP, nP_alloc;
+     esterr *pe; /* totals of the regions P */
+     esterr *est; /* estimated totals of the heap once the batch being
+		     evaluated is pushed, to choose the regions on */
+     double reqAbsError, reqRelError;
+     error_norm norm;
+     size_t numEval, maxEval;
+     int status;
+} speculation;
+
+/* the job of the worker: fill s->P and s->S */
+static void speculate(void *arg)
+{
+     speculation *s = (speculation *) arg;
+     size_t np = s->npieces, q, base;
+     unsigned j, fdim = s->fdim;
+
+     s->nP = 0;
+     for (j = 0; j < fdim; ++j) s->pe[j].val = s->pe[j].err = 0;
+     while (s->regions->n > 0 && (s->numEval < s->maxEval || !s->maxEval)) {
+	  double *data;
+	  if (s->nP + 1 > s->nP_alloc) {
+	       size_t n = (s->nP + 1) * 2;
+	       region *P = (region *) realloc(s->P, sizeof(region) * n);
+	       region *S;
+	       if (P) s->P = P;
+	       S = (region *) realloc(s->S, sizeof(region) * n * np);
+	       if (S) s->S = S;
+	       if (!P || !S || attach_ee(s->P, n, fdim, &s->pwork)) {
+		    s->status = FAILURE;
+		    break;
+	       }
+	       s->nP_alloc = n;
+	  }
+	  data = (double *) malloc(sizeof(double) * s->r->ndata);
+	  if (!data) {
+	       s->status = FAILURE;
+	       break;
+	  }
+	  base = s->nP * np;
+	  heap_pop(s->regions, s->P + s->nP);
+	  memcpy(data, s->P[s->nP].h.data, sizeof(double) * s->r->ndata);
+	  s->S[base] = s->P[s->nP];
+	  s->S[base].ee = NULL;
+	  s->P[s->nP].h.data = data;
+	  for (q = 1; q < np; ++q) {
+	       s->S[base + q].h.data = NULL;
+	       s->S[base + q].ee = NULL;
+	  }
+	  for (j = 0; j < fdim; ++j) {
+	       s->pe[j].val += s->P[s->nP].ee[j].val;
+	       s->pe[j].err += s->P[s->nP].ee[j].err;
+	       s->est[j].err -= s->P[s->nP].ee[j].err;
+	  }
+	  ++s->nP;
+	  if (cut_pieces(s->r, s->S + base)) {
+	       s->status = FAILURE;
+	       break;
+	  }
+	  s->numEval += s->r->num_points * np;
+	  if (!s->parallel
+	      || converged(fdim, s->est, s->reqAbsError, s->reqRelError,
+			   s->norm))
+	       break;
+     }
+     if (s->status == SUCCESS && s->nP)
+	  s->status = s->r->points(s->r, s->nP * np, s->S);
+}
+
+/* put the speculative regions P[k..nP-1] back into the heap, and free
+   their pieces */
+static int discard_speculation(speculation *s, size_t k,
+			       cubature_stats *stats)
+{
+     size_t i, np = s->npieces;
+     unsigned j;
+
+     for (i = k * np; i < s->nP * np; ++i)
+	  destroy_region(s->S + i);
+     if (stats) {
+	  stats->nspeculative += s->nP * np;
+	  stats->ndiscarded += (s->nP - k) * np;
+     }
+     for (j = 0; j < s->fdim; ++j) s->pe[j].val = s->pe[j].err = 0;
+     i = s->nP;
+     s->nP = 0;
+     return heap_push_many(s->regions, i - k, s->P + k);
+}
+
+/* the refinement loop of rulecubature with the pipeline, r2 being a
+   rule of the same kind as r */
+static int refine_pipelined(rule *r, rule *r2, unsigned fdim,
+			    integrand_v f, void *fdata, heap *regions,
+			    region **R_, size_t *nR_alloc, esterr **work,
+			    size_t maxEval, double reqAbsError,
+			    double reqRelError, error_norm norm,
+			    int parallel, const cubature_opts *opts,
+			    double deadline, size_t *numEval_,
+			    size_t *iteration)
+{
+     speculation s;
+     worker w;
+     cubature_stats *stats = opts->stats;
+     size_t npieces = (size_t) 1 << r->split, numEval = *numEval_;
+     size_t nR, k, i, numEval0;
+     region *R = *R_;
+     esterr *ee = NULL, *pb;
+     double rho = 1; /* error of the pieces over that of their region */
+     unsigned j;
+     int status = SUCCESS;
+
+     memset(&s, 0, sizeof(s));
+     s.regions = regions;
+     s.fdim = fdim;
+     s.parallel = parallel;
+     s.npieces = npieces;
+     s.reqAbsError = reqAbsError;
+     s.reqRelError = reqRelError;
+     s.norm = norm;
+     s.maxEval = maxEval;
+     ee = (esterr *) calloc(fdim * 4, sizeof(esterr));
+     if (!ee || worker_start(&w)) {
+	  free(ee);
+	  return FAILURE;
+     }
+     s.pe = ee + fdim;
+     s.est = s.pe + fdim;
+     pb = s.est + fdim; /* totals of the regions of the batch */
+
+     while (numEval < maxEval || !maxEval) {
+	  /* the totals, with the regions taken out by the worker */
+	  for (j = 0; j < fdim; ++j) {
+	       ee[j].val = regions->ee[j].val + s.pe[j].val;
+	       ee[j].err = regions->ee[j].err + s.pe[j].err;
+	  }
+	  if (converged(fdim, ee, reqAbsError, reqRelError, norm))
+	       break;
+	  if (DEADLINE_PASSED(deadline)) {
+	       status = CUBATURE_DEADLINE_REACHED;
+	       break;
+	  }
+	  numEval0 = numEval;
+
+	  /* choose the regions to evaluate, as rulecubature does */
+	  for (j = 0; j < fdim; ++j) pb[j].val = pb[j].err = 0;
+	  nR = k = 0;
+	  do {
+	       region *Ri;
+	       if (nR + npieces > *nR_alloc) {
+		    *nR_alloc = (nR + npieces) * 2;
+		    R = (region *) realloc(R, *nR_alloc * sizeof(region));
+		    *R_ = R;
+		    if (!R || attach_ee(R, *nR_alloc, fdim, work)) goto bad;
+	       }
+	       if (k < s.nP && (regions->n == 0 || s.P[k].errmax
+				>= regions->items[0].errmax)) {
+		    Ri = s.P + k; /* taken ahead by the worker */
+		    for (i = 0; i < npieces; ++i) {
+			 esterr *e = R[nR + i].ee;
+			 R[nR + i] = s.S[k * npieces + i];
+			 R[nR + i].ee = e;
+		    }
+		    free(Ri->h.data); /* the copy */
+		    ++k;
+	       }
+	       else {
+		    Ri = R + nR;
+		    heap_pop(regions, Ri);
+	       }
+	       for (j = 0; j < fdim; ++j) {
+		    ee[j].err -= Ri->ee[j].err;
+		    pb[j].val += Ri->ee[j].val;
+		    pb[j].err += Ri->ee[j].err;
+	       }
+	       if (Ri == R + nR && cut_pieces(r, Ri)) goto bad;
+	       numEval += r->num_points * npieces;
+	       nR += npieces;
+	       if (!parallel
+		   || converged(fdim, ee, reqAbsError, reqRelError, norm))
+		    break;
+	  } while ((regions->n > 0 || k < s.nP)
+		   && (numEval < maxEval || !maxEval));
+
+	  if (k == s.nP && nR == k * npieces && k > 0) {
+	       /* all the speculative regions, whose points are ready */
+	       rule *t = r;
+	       r = r2;
+	       r2 = t;
+	  }
+	  else if (r->points(r, nR, R))
+	       goto bad;
+	  if (discard_speculation(&s, k, stats)) goto bad;
+
+	  /* prepare the next batch while this one is evaluated */
+	  for (j = 0; j < fdim; ++j) {
+	       s.est[j].val = regions->ee[j].val + pb[j].val;
+	       s.est[j].err = regions->ee[j].err + rho * pb[j].err;
+	  }
+	  s.r = r2;
+	  s.numEval = numEval;
+	  worker_submit(&w, speculate, &s);
+	  if (f(r->dim, nR * r->num_points, r->pts, fdata, fdim, r->vals)) {
+	       worker_wait(&w);
+	       goto bad;
+	  }
+	  worker_wait(&w);
+	  if (s.status) goto bad;
+
+	  r->errors(r, fdim, nR, R);
+	  for (i = 0; i < nR; ++i)
+	       R[i].errmax = errMax(fdim, R[i].ee);
+	  if (heap_push_many(regions, nR, R)) goto bad;
+	  {
+	       double pieces = 0, parents = 0, emax = 0;
+	       for (j = 0; j < fdim; ++j) {
+		    double e = regions->ee[j].err + s.pe[j].err;
+		    parents += pb[j].err;
+		    for (i = 0; i < nR; ++i) pieces += R[i].ee[j].err;
+		    if (e > emax) emax = e;
+	       }
+	       if (parents > 0) rho = pieces < parents ? pieces / parents : 1;
+	       ++*iteration;
+	       if (opts->trace)
+		    opts->trace(opts->tdata, *iteration, numEval - numEval0,
+				regions->n + s.nP, emax);
+	  }
+     }
+     if (discard_speculation(&s, 0, stats)) goto bad;
+     worker_stop(&w);
+     *numEval_ = numEval;
+     free(s.P);
+     free(s.S);
+     free(s.pwork);
+     free(ee);
+     return status;
+
+bad:
+     discard_speculation(&s, 0, NULL);
+     worker_stop(&w);
+     free(s.P);
+     free(s.S);
+     free(s.pwork);
+     free(ee);
+     return FAILURE;
+}
+
 /* adaptive integration, analogous to adaptintegrator.cpp in HIntLib */
 
 static int rulecubature(rule *r, unsigned fdim,
 			integrand_v f, void *fdata,
-			const hypercube *h,
+			seed_func seed, const void *domain,
 			size_t maxEval,
 			double reqAbsError, double reqRelError,
 			error_norm norm,
-			double *val, double *err, int parallel)
+			double *val, double *err, int parallel,
+			const cubature_opts *opts, rule *r2)
 {
-     size_t numEval = 0;
+     double deadline = make_deadline(opts);
+     int status = SUCCESS;
+     size_t numEval = 0, iteration = 0, numEval0;
      heap regions;
      unsigned i, j;
      region *R = NULL; /* array of regions to evaluate */
-     size_t nR_alloc = 0;
-     esterr *ee = NULL;
+     size_t nR_alloc = 0, nR0;
+     esterr *ee = NULL, *work = NULL;
+     cubature_workspace *ws = opts ? opts->workspace : NULL;
+     int compact = opts && (opts->storage & CUBATURE_STORAGE_FLOAT);
+     size_t npieces = (size_t) 1 << r->split; /* regions per cut */
 
      if (fdim <= 1) norm = ERROR_INDIVIDUAL; /* norm is irrelevant */
      if (norm < 0 || norm > ERROR_LINF) return FAILURE; /* invalid norm */
 
-     regions = heap_alloc(1, fdim);
-     if (!regions.ee || !regions.items) goto bad;
+     if (ws && ws->ee && ws->regions.fdim == fdim
+	 && ws->regions.compact == compact) {
+	  /* take over the arrays of the workspace, emptied */
+	  regions = ws->regions;
+	  regions.n = regions.nregs = regions.nfree = 0;
+	  for (j = 0; j < 2 * fdim; ++j)
+	       regions.ee[j].val = regions.ee[j].err = 0;
+	  ee = ws->ee;
+	  R = ws->R;
+	  work = ws->work;
+	  nR_alloc = ws->nR_alloc;
+	  ws->ee = NULL;
+	  ws->R = NULL;
+	  ws->work = NULL;
+	  ws->nR_alloc = 0;
+     }
+     else {
+	  if (ws) workspace_clear_heap(ws);
+	  regions = heap_alloc(1, fdim, compact);
+	  if (!regions.ee || !regions.items) goto bad;
 
-     ee = (esterr *) malloc(sizeof(esterr) * fdim);
-     if (!ee) goto bad;
+	  ee = (esterr *) malloc(sizeof(esterr) * fdim);
+	  if (!ee) goto bad;
 
-     nR_alloc = 2;
-     R = (region *) malloc(sizeof(region) * nR_alloc);
-     if (!R) goto bad;
-     R[0] = make_region(h, fdim);
-     if (!R[0].ee
-	 || eval_regions(1, R, f, fdata, r)
-	 || heap_push(&regions, R[0]))
+	  nR_alloc = 2;
+	  R = (region *) malloc(sizeof(region) * nR_alloc);
+	  if (!R) goto bad;
+     }
+     if (nR_alloc < npieces) {
+	  region *R2 = (region *) realloc(R, sizeof(region) * npieces);
+	  if (!R2) goto bad;
+	  R = R2;
+	  nR_alloc = npieces;
+     }
+     if (seed(domain, fdim, opts, &R, &nR_alloc, &nR0)
+	 || attach_ee(R, nR_alloc, fdim, &work)
+	 || eval_regions(nR0, R, f, fdata, r)
+	 || heap_push_many(&regions, nR0, R))
 	       goto bad;
-     numEval += r->num_points;
-
-     while (numEval < maxEval || !maxEval) {
+     numEval += r->num_points * nR0;
+     trace_regions(opts, fdim, iteration, numEval, &regions);
+
+     if (r2) {
+	  status = refine_pipelined(r, r2, fdim, f, fdata, &regions,
+				    &R, &nR_alloc, &work, maxEval,
+				    reqAbsError, reqRelError, norm, parallel,
+				    opts, deadline, &numEval, &iteration);
+	  if (status == FAILURE) goto bad;
+     }
+     else while (numEval < maxEval || !maxEval) {
 	  if (converged(fdim, regions.ee, reqAbsError, reqRelError, norm))
 	       break;
+	  if (DEADLINE_PASSED(deadline)) {
+	       status = CUBATURE_DEADLINE_REACHED;
+	       break;
+	  }
+	  numEval0 = numEval;
 
 	  if (parallel) { /* maximize potential parallelism */
 	       /* adapted from I. Gladwell, "Vectorization of one
@@ -981,16 +2226,17 @@ static int rulecubature(rule *r, unsigned fdim,
 	       size_t nR = 0;
 	       for (j = 0; j < fdim; ++j) ee[j] = regions.ee[j];
 	       do {
-		    if (nR + 2 > nR_alloc) {
-			 nR_alloc = (nR + 2) * 2;
+		    if (nR + npieces > nR_alloc) {
+			 nR_alloc = (nR + npieces) * 2;
 			 R = (region *) realloc(R, nR_alloc * sizeof(region));
-			 if (!R) goto bad;
+			 if (!R || attach_ee(R, nR_alloc, fdim, &work))
+			      goto bad;
 		    }
-		    R[nR] = heap_pop(&regions);
+		    heap_pop(&regions, R + nR);
 		    for (j = 0; j < fdim; ++j) ee[j].err -= R[nR].ee[j].err;
-		    if (cut_region(R+nR, R+nR+1)) goto bad;
-		    numEval += r->num_points * 2;
-		    nR += 2;
+		    if (cut_pieces(r, R + nR)) goto bad;
+		    numEval += r->num_points * npieces;
+		    nR += npieces;
 		    if (converged(fdim, ee, reqAbsError, reqRelError, norm))
 			 break; /* other regions have small errs */
 	       } while (regions.n > 0 && (numEval < maxEval || !maxEval));
@@ -999,48 +2245,106 @@ static int rulecubature(rule *r, unsigned fdim,
 		    goto bad;
 	  }
 	  else { /* minimize number of function evaluations */
-	       R[0] = heap_pop(&regions); /* get worst region */
-	       if (cut_region(R, R+1)
-		   || eval_regions(2, R, f, fdata, r)
-		   || heap_push_many(&regions, 2, R))
+	       heap_pop(&regions, R); /* get worst region */
+	       if (cut_pieces(r, R)
+		   || eval_regions(npieces, R, f, fdata, r)
+		   || heap_push_many(&regions, npieces, R))
 		    goto bad;
-	       numEval += r->num_points * 2;
+	       numEval += r->num_points * npieces;
 	  }
+	  trace_regions(opts, fdim, ++iteration, numEval - numEval0, &regions);
      }
 
-     /* re-sum integral and errors */
-     for (j = 0; j < fdim; ++j) val[j] = err[j] = 0;
-     for (i = 0; i < regions.n; ++i) {
-	  for (j = 0; j < fdim; ++j) {
-	       val[j] += regions.items[i].ee[j].val;
-	       err[j] += regions.items[i].ee[j].err;
-	  }
-	  destroy_region(&regions.items[i]);
-     }
+     /* the running totals are compensated, no need to re-sum them */
+     heap_totals(&regions, val, err);
+     if (opts && opts->cell_val)
+	  heap_cell_totals(&regions, opts->cell_val, opts->cell_err);
+     for (i = 0; i < regions.n; ++i)
+	  destroy_region(&HEAP_REGION(&regions, regions.items[i]));
 
      /* printf("regions.nalloc = %d\n", regions.nalloc); */
+     if (ws) { /* keep the arrays for the next integration */
+	  workspace_clear_heap(ws);
+	  regions.n = regions.nregs = regions.nfree = 0;
+	  ws->regions = regions;
+	  ws->ee = ee;
+	  ws->R = R;
+	  ws->work = work;
+	  ws->nR_alloc = nR_alloc;
+	  return status;
+     }
      free(ee);
      heap_free(&regions);
      free(R);
-     return SUCCESS;
+     free(work);
+     return status;
 
 bad:
      free(ee);
      heap_free(&regions);
      free(R);
+     free(work);
      return FAILURE;
 }
 
+/* rule_kind of the simplex rule, besides the opts->rule values */
+#define RULE_SIMPLEX UINT_MAX
+
+/* the rule of the given kind, taken from the workspace if it has one */
+static rule *take_rule(cubature_workspace *ws, unsigned dim, unsigned fdim,
+		       unsigned kind)
+{
+     rule *r;
+     if (ws && ws->r && ws->r->dim == dim && ws->r->fdim == fdim
+	 && ws->rule_kind == kind) {
+	  r = ws->r; /* reuse the rule and its buffer of points */
+	  ws->r = NULL;
+	  return r;
+     }
+     switch (kind) {
+	 case RULE_SIMPLEX:
+	      return make_rulegm(dim, fdim);
+	 case CUBATURE_RULE_DEGREE5:
+	      return make_rule53(dim, fdim, 5);
+	 case CUBATURE_RULE_DEGREE3:
+	      return make_rule53(dim, fdim, 3);
+	 default:
+	      return dim == 1 ? make_rule15gauss(dim, fdim)
+			      : make_rule75genzmalik(dim, fdim);
+     }
+}
+
+/* the halvings per cut region asked for by opts, at least 1 */
+static unsigned split_of(const cubature_opts *opts)
+{
+     if (!opts || opts->split <= 1) return 1;
+     return opts->split < CUBATURE_MAX_SPLIT ? opts->split
+					     : CUBATURE_MAX_SPLIT;
+}
+
+/* give the rule back to the workspace for the next integration */
+static void give_rule(cubature_workspace *ws, rule *r, unsigned kind)
+{
+     if (ws) {
+	  destroy_rule(ws->r);
+	  ws->r = r;
+	  ws->rule_kind = kind;
+     }
+     else
+	  destroy_rule(r);
+}
+
 static int cubature(unsigned fdim, integrand_v f, void *fdata,
 		    unsigned dim, const double *xmin, const double *xmax,
 		    size_t maxEval, double reqAbsError, double reqRelError,
-		    error_norm norm,
+		    error_norm norm, const cubature_opts *opts,
 		    double *val, double *err, int parallel)
 {
-     rule *r;
+     rule *r, *r2 = NULL;
      hypercube h;
      int status;
-     unsigned i;
+     unsigned i, kind = opts ? opts->rule : 0;
+     cubature_workspace *ws = opts ? opts->workspace : NULL;
 
      if (fdim == 0) /* nothing to do */ return SUCCESS;
      if (dim == 0) { /* trivial integration */
@@ -1048,8 +2352,7 @@ static int cubature(unsigned fdim, integrand_v f, void *fdata,
 	  for (i = 0; i < fdim; ++i) err[i] = 0;
 	  return SUCCESS;
      }
-     r = dim == 1 ? make_rule15gauss(dim, fdim)
- 	          : make_rule75genzmalik(dim, fdim);
+     r = take_rule(ws, dim, fdim, kind);
      if (!r) {
 	  for (i = 0; i < fdim; ++i) {
 	       val[i] = 0;
@@ -1057,42 +2360,187 @@ static int cubature(unsigned fdim, integrand_v f, void *fdata,
 	  }
 	  return FAILURE;
      }
-     h = make_hypercube_range(dim, xmin, xmax);
-     status = !h.data ? FAILURE
-	  : rulecubature(r, fdim, f, fdata, &h,
+     r->layout = opts ? opts->layout : 0;
+     r->split = split_of(opts);
+     if (opts && opts->pipeline && !(r2 = take_rule(NULL, dim, fdim, kind)))
+	  status = FAILURE;
+     else {
+	  if (r2) {
+	       r2->layout = r->layout;
+	       r2->split = r->split;
+	  }
+	  h = make_hypercube_range(dim, xmin, xmax);
+	  status = !h.data ? FAILURE
+	       : rulecubature(r, fdim, f, fdata, seed_regions, &h,
+			      maxEval, reqAbsError, reqRelError, norm,
+			      val, err, parallel, opts, r2);
+	  destroy_hypercube(&h);
+     }
+     destroy_rule(r2);
+     give_rule(ws, r, kind);
+     return status;
+}
+
+static int simplex_cubature(unsigned fdim, integrand_v f, void *fdata,
+			    unsigned dim, size_t nsimplex,
+			    const double *vertices,
+			    size_t maxEval, double reqAbsError,
+			    double reqRelError, error_norm norm,
+			    const cubature_opts *opts,
+			    double *val, double *err, int parallel)
+{
+     rule *r, *r2 = NULL;
+     simplices s;
+     int status;
+     unsigned i;
+     cubature_workspace *ws = opts ? opts->workspace : NULL;
+
+     if (fdim == 0) /* nothing to do */ return SUCCESS;
+     if (dim == 0 || nsimplex == 0) return FAILURE;
+     r = take_rule(ws, dim, fdim, RULE_SIMPLEX);
+     if (!r) {
+	  for (i = 0; i < fdim; ++i) {
+	       val[i] = 0;
+	       err[i] = HUGE_VAL;
+	  }
+	  return FAILURE;
+     }
+     r->layout = opts ? opts->layout : 0;
+     r->split = split_of(opts);
+     s.dim = dim;
+     s.n = nsimplex;
+     s.v = vertices;
+     if (opts && opts->pipeline
+	 && !(r2 = take_rule(NULL, dim, fdim, RULE_SIMPLEX)))
+	  status = FAILURE;
+     else {
+	  if (r2) {
+	       r2->layout = r->layout;
+	       r2->split = r->split;
+	  }
+	  status = rulecubature(r, fdim, f, fdata, seed_simplices, &s,
 				maxEval, reqAbsError, reqRelError, norm,
-				val, err, parallel);
-     destroy_hypercube(&h);
-     destroy_rule(r);
+				val, err, parallel, opts, r2);
+     }
+     destroy_rule(r2);
+     give_rule(ws, r, RULE_SIMPLEX);
      return status;
 }
 
+int hcubature_simplex_v_opts(unsigned fdim, integrand_v f, void *fdata,
+			     unsigned dim, size_t nsimplex,
+			     const double *vertices,
+			     size_t maxEval, double reqAbsError,
+			     double reqRelError, error_norm norm,
+			     const cubature_opts *opts,
+			     double *val, double *err)
+{
+     return simplex_cubature(fdim, f, fdata, dim, nsimplex, vertices,
+			     maxEval, reqAbsError, reqRelError, norm, opts,
+			     val, err, 1);
+}
+
+int hcubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		     unsigned dim, const double *xmin, const double *xmax,
+		     size_t maxEval, double reqAbsError, double reqRelError,
+		     error_norm norm, const cubature_opts *opts,
+		     double *val, double *err)
+{
+     return cubature(fdim, f, fdata, dim, xmin, xmax,
+		     maxEval, reqAbsError, reqRelError, norm, opts,
+		     val, err, 1);
+}
+
 int hcubature_v(unsigned fdim, integrand_v f, void *fdata,
                 unsigned dim, const double *xmin, const double *xmax,
                 size_t maxEval, double reqAbsError, double reqRelError,
                 error_norm norm,
                 double *val, double *err)
 {
-     return cubature(fdim, f, fdata, dim, xmin, xmax,
-		     maxEval, reqAbsError, reqRelError, norm, val, err, 1);
+     return hcubature_v_opts(fdim, f, fdata, dim, xmin, xmax,
+			     maxEval, reqAbsError, reqRelError, norm, NULL,
+			     val, err);
 }
 
+#define VWRAPPER_FV32
 #include "vwrapper.h"
 
+int hcubature_opts(unsigned fdim, integrand f, void *fdata,
+		   unsigned dim, const double *xmin, const double *xmax,
+		   size_t maxEval, double reqAbsError, double reqRelError,
+		   error_norm norm, const cubature_opts *opts,
+		   double *val, double *err)
+{
+     int ret;
+     fv_data d;
+     cubature_opts o;
+
+     if (fdim == 0) return SUCCESS; /* nothing to do */
+
+     /* fv handles one point at a time, for which layouts are moot */
+     if (opts) {
+	  o = *opts;
+	  o.layout = 0;
+	  opts = &o;
+     }
+     d.f = f; d.fdata = fdata;
+     ret = cubature(fdim, fv, &d, dim, xmin, xmax,
+		    maxEval, reqAbsError, reqRelError, norm, opts,
+		    val, err, 0);
+     return ret;
+}
+
 int hcubature(unsigned fdim, integrand f, void *fdata,
 	      unsigned dim, const double *xmin, const double *xmax,
 	      size_t maxEval, double reqAbsError, double reqRelError,
 	      error_norm norm,
 	      double *val, double *err)
 {
-     int ret;
+     return hcubature_opts(fdim, f, fdata, dim, xmin, xmax,
+			   maxEval, reqAbsError, reqRelError, norm, NULL,
+			   val, err);
+}
+
+int hcubature_simplex_opts(unsigned fdim, integrand f, void *fdata,
+			   unsigned dim, size_t nsimplex,
+			   const double *vertices,
+			   size_t maxEval, double reqAbsError,
+			   double reqRelError, error_norm norm,
+			   const cubature_opts *opts,
+			   double *val, double *err)
+{
      fv_data d;
+     cubature_opts o;
 
      if (fdim == 0) return SUCCESS; /* nothing to do */
 
+     /* fv handles one point at a time, for which layouts are moot */
+     if (opts) {
+	  o = *opts;
+	  o.layout = 0;
+	  opts = &o;
+     }
      d.f = f; d.fdata = fdata;
-     ret = cubature(fdim, fv, &d, dim, xmin, xmax,
-		    maxEval, reqAbsError, reqRelError, norm, val, err, 0);
+     return simplex_cubature(fdim, fv, &d, dim, nsimplex, vertices,
+			     maxEval, reqAbsError, reqRelError, norm, opts,
+			     val, err, 0);
+}
+
+int hcubature_v32_opts(unsigned fdim, integrand_v32 f, void *fdata,
+		       unsigned dim, const double *xmin, const double *xmax,
+		       size_t maxEval, double reqAbsError, double reqRelError,
+		       error_norm norm, const cubature_opts *opts,
+		       double *val, double *err)
+{
+     int ret;
+     fv32_data d;
+
+     d.f = f; d.fdata = fdata;
+     d.buf = NULL; d.nbuf = 0;
+     ret = cubature(fdim, fv32, &d, dim, xmin, xmax,
+		    maxEval, reqAbsError, reqRelError, norm, opts,
+		    val, err, 1);
+     free(d.buf);
      return ret;
 }
 
@@ -34,9 +34,20 @@
 #define SUCCESS 0
 #define FAILURE 1
 
+#include "timer.h"
+
 /* pre-generated Clenshaw-Curtis rules and weights */
 #include "clencurt.h"
 
+/* Clenshaw-Curtis points and weights for levels up to M, laid out as
+   clencurt_x and clencurt_w: the built-in tables, or larger ones
+   obtained from opts->clencurt.  Since the tables are nested, the ones
+   for a larger M extend those for a smaller M. */
+typedef struct {
+     unsigned M;
+     const double *x, *w;
+} cctab;
+
 /* no point in supporting very high dimensional integrals here */
 #define MAXDIM (20U)
 
@@ -80,29 +91,62 @@ static void free_cachevals(valcache *v)
 
 /***************************************************************************/
 
+/* evaluate the n points in buf, storing the values point after point
+   in val[0 .. n*fdim-1].  For CUBATURE_VALUES_FDIM_MAJOR, f writes into
+   the scratch array tmp, which is then reordered into val. */
+static int eval_buf(unsigned fdim, integrand_v f, void *fdata,
+		    unsigned dim, size_t n, const double *buf,
+		    double *val, double *tmp, unsigned layout)
+{
+     size_t i;
+     unsigned k;
+     if (!(layout & CUBATURE_VALUES_FDIM_MAJOR))
+	  return f(dim, n, buf, fdata, fdim, val) ? FAILURE : SUCCESS;
+     if (f(dim, n, buf, fdata, fdim, tmp))
+	  return FAILURE;
+     for (i = 0; i < n; ++i)
+	  for (k = 0; k < fdim; ++k)
+	       val[i * fdim + k] = tmp[k * n + i];
+     return SUCCESS;
+}
+
 /* recursive loop over all cubature points for the given (m,mi) cache entry:
    add each point to the buffer buf, evaluating all at once whenever the
-   buffer is full or when we are done */
+   buffer is full or when we are done.  *nleft is the number of points
+   not yet evaluated, so that each batch of min(nbuf, *nleft) points can
+   be stored coordinate after coordinate for CUBATURE_POINTS_DIM_MAJOR. */
 static int compute_cacheval(const unsigned *m, unsigned mi, 
 			    double *val, size_t *vali,
 			    unsigned fdim, integrand_v f, void *fdata,
 			    unsigned dim, unsigned id, double *p,
 			    const double *xmin, const double *xmax,
-			    double *buf, size_t nbuf, size_t *ibuf)
+			    double *buf, size_t nbuf, size_t *ibuf,
+			    size_t *nleft, double *tmp, unsigned layout,
+			    const cctab *cc)
 {
      if (id == dim) { /* add point to buffer of points */
-	  memcpy(buf + (*ibuf)++ * dim, p, sizeof(double) * dim);
-	  if (*ibuf == nbuf) { /* flush buffer */
-	       if (f(dim, nbuf, buf, fdata, fdim, val + *vali))
+	  size_t n = *nleft < nbuf ? *nleft : nbuf; /* size of this batch */
+	  if (layout & CUBATURE_POINTS_DIM_MAJOR) {
+	       unsigned j;
+	       for (j = 0; j < dim; ++j)
+		    buf[j * n + *ibuf] = p[j];
+	       ++(*ibuf);
+	  }
+	  else
+	       memcpy(buf + (*ibuf)++ * dim, p, sizeof(double) * dim);
+	  if (*ibuf == n) { /* flush buffer */
+	       if (eval_buf(fdim, f, fdata, dim, n, buf, val + *vali,
+			    tmp, layout))
 		    return FAILURE;
 	       *vali += *ibuf * fdim;
+	       *nleft -= n;
 	       *ibuf = 0;
 	  }
      }
      else {
 	  double c = (xmin[id] + xmax[id]) * 0.5;
 	  double r = (xmax[id] - xmin[id]) * 0.5;
-	  const double *x = clencurt_x 
+	  const double *x = cc->x
 	       + ((id == mi) ? (m[id] ? (1 << (m[id] - 1)) : 0) : 0);
 	  unsigned i, nx = (id == mi ? (m[id] ? (1 << (m[id] - 1)) : 1)
 			    : (1 << (m[id])));
@@ -110,19 +154,22 @@ static int compute_cacheval(const unsigned *m, unsigned mi,
 	       p[id] = c;
 	       if (compute_cacheval(m, mi, val, vali, fdim, f, fdata,
 				    dim, id + 1, p,
-				    xmin, xmax, buf, nbuf, ibuf))
+				    xmin, xmax, buf, nbuf, ibuf,
+				    nleft, tmp, layout, cc))
 		    return FAILURE;
 	  }
 	  for (i = 0; i < nx; ++i) {
 	       p[id] = c + r * x[i];
 	       if (compute_cacheval(m, mi, val, vali, fdim, f, fdata,
 				    dim, id + 1, p,
-				    xmin, xmax, buf, nbuf, ibuf))
+				    xmin, xmax, buf, nbuf, ibuf,
+				    nleft, tmp, layout, cc))
 		    return FAILURE;
 	       p[id] = c - r * x[i];
 	       if (compute_cacheval(m, mi, val, vali, fdim, f, fdata,
 				    dim, id + 1, p,
-				    xmin, xmax, buf, nbuf, ibuf))
+				    xmin, xmax, buf, nbuf, ibuf,
+				    nleft, tmp, layout, cc))
 		    return FAILURE;
 	  }
      }
@@ -146,31 +193,39 @@ static int add_cacheval(valcache *vc,
 			const unsigned *m, unsigned mi,
 			unsigned fdim, integrand_v f, void *fdata,
 			unsigned dim, const double *xmin, const double *xmax,
-			double *buf, size_t nbuf)
+			double *buf, size_t nbuf, unsigned layout,
+			const cctab *cc)
 {
      size_t ic = vc->ncache;
-     size_t nval, vali = 0, ibuf = 0;
+     size_t nval, npts, vali = 0, ibuf = 0;
      double p[MAXDIM];
+     double *tmp = NULL;
+     int ret;
 
      vc->c = (cacheval *) realloc(vc->c, sizeof(cacheval) * ++(vc->ncache));
      if (!vc->c) return -1;
 
      vc->c[ic].mi = mi;
      memcpy(vc->c[ic].m, m, sizeof(unsigned) * dim);
-     nval = fdim * num_cacheval(m, mi, dim);
+     npts = num_cacheval(m, mi, dim);
+     nval = fdim * npts;
      vc->c[ic].val = (double *) malloc(sizeof(double) * nval);
      if (!vc->c[ic].val) return FAILURE;
 
-     if (compute_cacheval(m, mi, vc->c[ic].val, &vali,
-			  fdim, f, fdata,
-			  dim, 0, p, xmin, xmax,
-			  buf, nbuf, &ibuf))
-	  return FAILURE;
-
-     if (ibuf > 0) /* flush remaining buffer */
-	  return f(dim, ibuf, buf, fdata, fdim, vc->c[ic].val + vali);
+     if (layout & CUBATURE_VALUES_FDIM_MAJOR) {
+	  tmp = (double *) malloc(sizeof(double) * fdim
+				  * (npts < nbuf ? npts : nbuf));
+	  if (!tmp) return FAILURE;
+     }
 
-     return SUCCESS;
+     /* the last (partial) buffer is flushed by compute_cacheval, since
+	it knows the number of points left */
+     ret = compute_cacheval(m, mi, vc->c[ic].val, &vali,
+			    fdim, f, fdata,
+			    dim, 0, p, xmin, xmax,
+			    buf, nbuf, &ibuf, &npts, tmp, layout, cc);
+     free(tmp);
+     return ret;
 }
 
 /***************************************************************************/
@@ -182,7 +237,7 @@ static int add_cacheval(valcache *vc,
 static unsigned eval(const unsigned *cm, unsigned cmi, double *cval,
 		 const unsigned *m, unsigned md,
 		 unsigned fdim, unsigned dim, unsigned id,
-		 double weight, double *val)
+		 double weight, double *val, const cctab *cc)
 {
      size_t voff = 0; /* amount caller should offset cval array afterwards */
      if (id == dim) {
@@ -191,29 +246,30 @@ static unsigned eval(const unsigned *cm, unsigned cmi, double *cval,
 	  voff = fdim;
      }
      else if (m[id] == 0 && id == md) /* using trivial rule for this dim */ {
-	  voff = eval(cm, cmi, cval, m, md, fdim, dim, id+1, weight*2, val);
+	  voff = eval(cm, cmi, cval, m, md, fdim, dim, id+1, weight*2, val,
+		      cc);
 	  voff += fdim * (1 << cm[id]) * 2
 	       * num_cacheval(cm + id+1, cmi - (id+1), dim - (id+1));
      }
      else {
 	  unsigned i;
 	  unsigned mid = m[id] - (id == md); /* order of C-C rule */
-	  const double *w = clencurt_w + mid + (1 << mid) - 1
+	  const double *w = cc->w + mid + (1 << mid) - 1
 	       + (id == cmi ? (cm[id] ? 1 + (1 << (cm[id]-1)) : 1) : 0);
 	  unsigned cnx = (id == cmi ? (cm[id] ? (1 << (cm[id]-1)) : 1)
 			  : (1 << (cm[id])));
-	  unsigned nx = cm[id] <= mid ? cnx : (1 << mid);
+	  unsigned nx = cm[id] <= mid ? cnx : (unsigned) (1 << mid);
 
 	  if (id != cmi) {
 	       voff = eval(cm, cmi, cval, m, md, fdim, dim, id + 1,
-			   weight * w[0], val);
+			   weight * w[0], val, cc);
 	       ++w;
 	  }
 	  for (i = 0; i < nx; ++i) {
 	       voff += eval(cm, cmi, cval + voff, m, md, fdim, dim, id + 1,
-			    weight * w[i], val);
+			    weight * w[i], val, cc);
 	       voff += eval(cm, cmi, cval + voff, m, md, fdim, dim, id + 1,
-			    weight * w[i], val);
+			    weight * w[i], val, cc);
 	  }
 
 	  voff += (cnx - nx) * fdim * 2
@@ -226,7 +282,7 @@ static unsigned eval(const unsigned *cm, unsigned cmi, double *cval,
    (with m[md] decremented by 1) */
 static void evals(valcache vc, const unsigned *m, unsigned md,
 		  unsigned fdim, unsigned dim, 
-		  double V, double *val)
+		  double V, double *val, const cctab *cc)
 {
      size_t i;
 
@@ -235,7 +291,7 @@ static void evals(valcache vc, const unsigned *m, unsigned md,
 	  if (vc.c[i].mi >= dim ||
 	      vc.c[i].m[vc.c[i].mi] + (vc.c[i].mi == md) <= m[vc.c[i].mi])
 	       eval(vc.c[i].m, vc.c[i].mi, vc.c[i].val,
-		    m, md, fdim, dim, 0, V, val);
+		    m, md, fdim, dim, 0, V, val, cc);
      }
 }
 
@@ -244,12 +300,13 @@ static void evals(valcache vc, const unsigned *m, unsigned md,
    dimension to subdivide next (the largest error contribution) in *mi */
 static void eval_integral(valcache vc, const unsigned *m, 
 			  unsigned fdim, unsigned dim, double V,
-			  unsigned *mi, double *val, double *err, double *val1)
+			  unsigned *mi, double *val, double *err, double *val1,
+			  const cctab *cc)
 {
      double maxerr = 0;
      unsigned i, j;
      
-     evals(vc, m, dim, fdim, dim, V, val);
+     evals(vc, m, dim, fdim, dim, V, val, cc);
 
      /* error estimates along each dimension by comparing val with
 	lower-order rule in that dimension; overall (conservative)
@@ -258,7 +315,7 @@ static void eval_integral(valcache vc, const unsigned *m,
      *mi = 0;
      for (i = 0; i < dim; ++i) {
 	  double emax = 0;
-	  evals(vc, m, i, fdim, dim, V, val1);
+	  evals(vc, m, i, fdim, dim, V, val1, cc);
 	  for (j = 0; j < fdim; ++j) {
 	       double e = fabs(val[j] - val1[j]);
 	       if (e > emax) emax = e;
@@ -280,6 +337,20 @@ static int converged(unsigned fdim, const double *vals, const double *errs,
 #define VAL(j) vals[j]
 #include "converged.h"
 
+/* replace the tables in cc by ones for levels up to M from opts->clencurt,
+   if any */
+static int next_clencurt(const cubature_opts *opts, unsigned M, cctab *cc)
+{
+     const double *x, *w;
+     if (!opts || !opts->clencurt
+	 || opts->clencurt(opts->cdata, M, &x, &w))
+	  return FAILURE;
+     cc->M = M;
+     cc->x = x;
+     cc->w = w;
+     return SUCCESS;
+}
+
 /***************************************************************************/
 /* Vectorized version with user-supplied buffer to store points and values.
    The buffer *buf should be of length *nbuf * dim on entry (these parameters
@@ -290,18 +361,21 @@ static int converged(unsigned fdim, const double *vals, const double *errs,
    for the rule, which upon return will hold the final degrees.  The
    number of points in each dimension i is 2^(m[i]+1) + 1. */
    
-int pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
-		    unsigned dim, const double *xmin, const double *xmax,
-		    size_t maxEval,
-		    double reqAbsError, double reqRelError,
-		    error_norm norm,
-		    unsigned *m,
-		    double **buf, size_t *nbuf, size_t max_nbuf,
-		    double *val, double *err)
+int pcubature_v_buf_opts(unsigned fdim, integrand_v f, void *fdata,
+			 unsigned dim, const double *xmin, const double *xmax,
+			 size_t maxEval,
+			 double reqAbsError, double reqRelError,
+			 error_norm norm, const cubature_opts *opts,
+			 unsigned *m,
+			 double **buf, size_t *nbuf, size_t max_nbuf,
+			 double *val, double *err)
 {
      int ret = FAILURE;
+     double deadline = make_deadline(opts);
+     unsigned layout = opts ? opts->layout : 0;
+     cctab cc;
      double V = 1;
-     size_t numEval = 0, new_nbuf;
+     size_t numEval = 0, new_nbuf, npts, iteration = 0;
      unsigned i;
      valcache vc = {0, NULL};
      double *val1 = NULL;
@@ -322,10 +396,17 @@ int pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
 	  err[i] = HUGE_VAL;
      }
 
+     cc.M = clencurt_M;
+     cc.x = clencurt_x;
+     cc.w = clencurt_w;
+     for (i = 0; i < dim; ++i)
+	  if (m[i] > cc.M && next_clencurt(opts, m[i], &cc))
+	       return FAILURE;
+
      for (i = 0; i < dim; ++i)
 	  V *= (xmax[i] - xmin[i]) * 0.5; /* scale factor for C-C volume */
 
-     new_nbuf = num_cacheval(m, dim, dim);
+     new_nbuf = npts = num_cacheval(m, dim, dim);
 
      if (max_nbuf < 1) max_nbuf = 1;
      if (new_nbuf > max_nbuf) new_nbuf = max_nbuf;
@@ -338,7 +419,7 @@ int pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
 
      /* start by evaluating the m=0 cubature rule */
      if (add_cacheval(&vc, m, dim, fdim, f, fdata, dim, xmin, xmax, 
-		       *buf, *nbuf) != SUCCESS)
+		       *buf, *nbuf, layout, &cc) != SUCCESS)
 	  goto done;
 
      val1 = (double *) malloc(sizeof(double) * fdim);
@@ -346,16 +427,26 @@ int pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
      while (1) {
 	  unsigned mi;
 
-	  eval_integral(vc, m, fdim, dim, V, &mi, val, err, val1);
+	  eval_integral(vc, m, fdim, dim, V, &mi, val, err, val1, &cc);
+	  if (opts && opts->trace) {
+	       double emax = 0;
+	       for (i = 0; i < fdim; ++i) if (err[i] > emax) emax = err[i];
+	       opts->trace(opts->tdata, iteration++, npts, vc.ncache, emax);
+	  }
 	  if (converged(fdim, val, err, reqAbsError, reqRelError, norm)
 	      || (numEval > maxEval && maxEval)) {
 	       ret = SUCCESS;
 	       goto done;
 	  }
+	  if (DEADLINE_PASSED(deadline)) {
+	       ret = CUBATURE_DEADLINE_REACHED;
+	       goto done;
+	  }
 	  m[mi] += 1;
-	  if (m[mi] > clencurt_M) goto done; /* FAILURE */
+	  if (m[mi] > cc.M && next_clencurt(opts, m[mi], &cc))
+	       goto done; /* FAILURE */
 
-	  new_nbuf = num_cacheval(m, mi, dim);
+	  new_nbuf = npts = num_cacheval(m, mi, dim);
 	  if (new_nbuf > *nbuf && *nbuf < max_nbuf) {
 	       *nbuf = new_nbuf;
 	       if (*nbuf > max_nbuf) *nbuf = max_nbuf;
@@ -365,7 +456,7 @@ int pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
 	  }
 
 	  if (add_cacheval(&vc, m, mi, fdim, f, fdata, 
-			   dim, xmin, xmax, *buf, *nbuf) != SUCCESS)
+			   dim, xmin, xmax, *buf, *nbuf, layout, &cc) != SUCCESS)
 	       goto done; /* FAILURE */
 	  numEval += new_nbuf;
      }
@@ -376,49 +467,111 @@ done:
      return ret;
 }
 
+int pcubature_v_buf(unsigned fdim, integrand_v f, void *fdata,
+		    unsigned dim, const double *xmin, const double *xmax,
+		    size_t maxEval,
+		    double reqAbsError, double reqRelError,
+		    error_norm norm,
+		    unsigned *m,
+		    double **buf, size_t *nbuf, size_t max_nbuf,
+		    double *val, double *err)
+{
+     return pcubature_v_buf_opts(fdim, f, fdata, dim, xmin, xmax,
+				 maxEval, reqAbsError, reqRelError, norm, NULL,
+				 m, buf, nbuf, max_nbuf, val, err);
+}
+
 /***************************************************************************/
 
 #define DEFAULT_MAX_NBUF (1U << 20)
 
-int pcubature_v(unsigned fdim, integrand_v f, void *fdata,
-		unsigned dim, const double *xmin, const double *xmax,
-		size_t maxEval, double reqAbsError, double reqRelError,
-		error_norm norm,
-		double *val, double *err)
+int pcubature_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		     unsigned dim, const double *xmin, const double *xmax,
+		     size_t maxEval, double reqAbsError, double reqRelError,
+		     error_norm norm, const cubature_opts *opts,
+		     double *val, double *err)
 {
      int ret;
      size_t nbuf = 0;
      unsigned m[MAXDIM];
      double *buf = NULL;
      memset(m, 0, sizeof(unsigned) * dim);
-     ret = pcubature_v_buf(fdim, f, fdata, dim, xmin, xmax,
-				  maxEval, reqAbsError, reqRelError, norm,
+     ret = pcubature_v_buf_opts(fdim, f, fdata, dim, xmin, xmax,
+				  maxEval, reqAbsError, reqRelError, norm, opts,
 				  m, &buf, &nbuf, DEFAULT_MAX_NBUF, val, err);
      free(buf);
      return ret;
 }
 
+int pcubature_v(unsigned fdim, integrand_v f, void *fdata,
+		unsigned dim, const double *xmin, const double *xmax,
+		size_t maxEval, double reqAbsError, double reqRelError,
+		error_norm norm,
+		double *val, double *err)
+{
+     return pcubature_v_opts(fdim, f, fdata, dim, xmin, xmax,
+			     maxEval, reqAbsError, reqRelError, norm, NULL,
+			     val, err);
+}
+
+#define VWRAPPER_FV32
 #include "vwrapper.h"
 
-int pcubature(unsigned fdim, integrand f, void *fdata,
-	      unsigned dim, const double *xmin, const double *xmax,
-	      size_t maxEval, double reqAbsError, double reqRelError,
-	      error_norm norm,
-	      double *val, double *err)
+int pcubature_opts(unsigned fdim, integrand f, void *fdata,
+		   unsigned dim, const double *xmin, const double *xmax,
+		   size_t maxEval, double reqAbsError, double reqRelError,
+		   error_norm norm, const cubature_opts *opts,
+		   double *val, double *err)
 {
      int ret;
      size_t nbuf = 0;
      unsigned m[MAXDIM];
      double *buf = NULL;
      fv_data d;
+     cubature_opts o;
 
+     /* fv handles one point at a time, for which layouts are moot */
+     if (opts) {
+	  o = *opts;
+	  o.layout = 0;
+	  opts = &o;
+     }
      d.f = f; d.fdata = fdata;
      memset(m, 0, sizeof(unsigned) * dim);
-     ret = pcubature_v_buf(
+     ret = pcubature_v_buf_opts(
 	  fdim, fv, &d, dim, xmin, xmax, 
-	  maxEval, reqAbsError, reqRelError, norm,
+	  maxEval, reqAbsError, reqRelError, norm, opts,
 	  m, &buf, &nbuf, 16 /* max_nbuf > 0 to amortize function overhead */,
 	  val, err);
      free(buf);
      return ret;
 }
+
+int pcubature(unsigned fdim, integrand f, void *fdata,
+	      unsigned dim, const double *xmin, const double *xmax,
+	      size_t maxEval, double reqAbsError, double reqRelError,
+	      error_norm norm,
+	      double *val, double *err)
+{
+     return pcubature_opts(fdim, f, fdata, dim, xmin, xmax,
+			   maxEval, reqAbsError, reqRelError, norm, NULL,
+			   val, err);
+}
+
+int pcubature_v32_opts(unsigned fdim, integrand_v32 f, void *fdata,
+		       unsigned dim, const double *xmin, const double *xmax,
+		       size_t maxEval, double reqAbsError, double reqRelError,
+		       error_norm norm, const cubature_opts *opts,
+		       double *val, double *err)
+{
+     int ret;
+     fv32_data d;
+
+     d.f = f; d.fdata = fdata;
+     d.buf = NULL; d.nbuf = 0;
+     ret = pcubature_v_opts(fdim, fv32, &d, dim, xmin, xmax,
+			    maxEval, reqAbsError, reqRelError, norm, opts,
+			    val, err);
+     free(d.buf);
+     return ret;
+}
@@ -0,0 +1,30 @@
+/* Monotonic wall-clock timer, shared between hcubature.c and
+   pcubature.c for the opts->timeout deadline.  Returns the time in
+   seconds since an arbitrary (but fixed) origin. */
+
+#if defined(_WIN32)
+#  include <windows.h>
+static double wall_time(void)
+{
+     LARGE_INTEGER t, freq;
+     QueryPerformanceCounter(&t);
+     QueryPerformanceFrequency(&freq);
+     return (double) t.QuadPart / (double) freq.QuadPart;
+}
+#else
+#  include <time.h>
+static double wall_time(void)
+{
+     struct timespec t;
+     clock_gettime(CLOCK_MONOTONIC, &t);
+     return t.tv_sec + 1e-9 * t.tv_nsec;
+}
+#endif
+
+/* absolute deadline for the given opts, or 0 if there is none */
+static double make_deadline(const cubature_opts *opts)
+{
+     return (opts && opts->timeout > 0) ? wall_time() + opts->timeout : 0;
+}
+
+#define DEADLINE_PASSED(deadline) ((deadline) > 0 && wall_time() >= (deadline))
@@ -0,0 +1,284 @@
+/* Adaptive multidimensional integration of a vector of integrands.
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program; if not, write to the Free Software
+ * Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+ *
+ */
+
+/* Monte Carlo integration with the VEGAS algorithm of G. P. Lepage,
+   "A new algorithm for adaptive multidimensional integration,"
+   J. Comput. Phys. 27, 192-203 (1978): the points are sampled from a
+   separable density, piecewise constant on a grid of bins along each
+   dimension, which is refined after every iteration so that each bin
+   carries about the same share of the integral of f^2.  This suits
+   sharply peaked integrands in many dimensions, as long as the peaks
+   are (roughly) aligned with the axes.
+
+   Each iteration evaluates one batch of points.  The first iteration
+   only trains the grid; the estimates of the following ones are
+   combined, weighted by their inverse variances, until the requested
+   error is reached. */
+
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <float.h>
+#include <stdint.h>
+
+#include "cubature.h"
+
+/* error return codes */
+#define SUCCESS 0
+#define FAILURE 1
+
+#include "timer.h"
+
+#define VEGAS_NBINS 50 /* bins per dimension */
+#define VEGAS_ALPHA 1.5 /* damping of the grid refinement */
+#define VEGAS_NEVAL 10000 /* default number of points per iteration */
+
+/***************************************************************************/
+/* xoshiro256** of D. Blackman and S. Vigna, seeded with splitmix64 */
+
+typedef struct { uint64_t s[4]; } rng;
+
+static uint64_t splitmix64(uint64_t *x)
+{
+     uint64_t z = (*x += 0x9e3779b97f4a7c15ULL);
+     z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ULL;
+     z = (z ^ (z >> 27)) * 0x94d049bb133111ebULL;
+     return z ^ (z >> 31);
+}
+
+static void rng_seed(rng *r, uint64_t seed)
+{
+     unsigned i;
+     for (i = 0; i < 4; ++i) r->s[i] = splitmix64(&seed);
+}
+
+#define ROTL(x, k) (((x) << (k)) | ((x) >> (64 - (k))))
+
+/* uniform in [0, 1) */
+static double rng_uniform(rng *r)
+{
+     uint64_t *s = r->s;
+     uint64_t result = ROTL(s[1] * 5, 7) * 9, t = s[1] << 17;
+     s[2] ^= s[0];
+     s[3] ^= s[1];
+     s[1] ^= s[2];
+     s[0] ^= s[3];
+     s[2] ^= t;
+     s[3] = ROTL(s[3], 45);
+     return (result >> 11) * (1.0 / 9007199254740992.0);
+}
+
+/***************************************************************************/
+
+static int converged(unsigned fdim, const double *vals, const double *errs,
+		     double reqAbsError, double reqRelError, error_norm norm)
+#define ERR(j) errs[j]
+#define VAL(j) vals[j]
+#include "converged.h"
+
+/* move the edges e[0..VEGAS_NBINS] of the bins of one dimension so that
+   each bin gets the same share of the (smoothed, damped) weights d of
+   the bins, as in Lepage's paper; r is scratch of length VEGAS_NBINS */
+static void refine_grid(double *e, const double *d, double *r)
+{
+     double sum = 0, acc, per_bin, enew[VEGAS_NBINS + 1];
+     unsigned i, k;
+
+     for (i = 0; i < VEGAS_NBINS; ++i) {
+	  double s = d[i], n = 1;
+	  if (i > 0) { s += d[i-1]; ++n; }
+	  if (i + 1 < VEGAS_NBINS) { s += d[i+1]; ++n; }
+	  r[i] = s / n;
+	  sum += r[i];
+     }
+     if (!(sum > 0)) return; /* f vanishes, keep the grid */
+     per_bin = 0;
+     for (i = 0; i < VEGAS_NBINS; ++i) {
+	  double ri = r[i] / sum;
+	  r[i] = ri > 0 && ri < 1 ? pow((ri - 1) / log(ri), VEGAS_ALPHA)
+	       : (ri >= 1 ? 1 : 0);
+	  per_bin += r[i];
+     }
+     per_bin /= VEGAS_NBINS;
+     if (!(per_bin > 0)) return;
+
+     enew[0] = e[0];
+     enew[VEGAS_NBINS] = e[VEGAS_NBINS];
+     acc = 0;
+     k = 0;
+     for (i = 1; i < VEGAS_NBINS; ++i) {
+	  while (acc < per_bin && k < VEGAS_NBINS) acc += r[k++];
+	  acc -= per_bin;
+	  /* the new edge falls in old bin k-1, acc of its weight above */
+	  enew[i] = r[k-1] > 0 && acc > 0
+	       ? e[k] - (e[k] - e[k-1]) * acc / r[k-1] : e[k];
+     }
+     memcpy(e, enew, sizeof(double) * (VEGAS_NBINS + 1));
+}
+
+int vegas_v_opts(unsigned fdim, integrand_v f, void *fdata,
+		 unsigned dim, const double *xmin, const double *xmax,
+		 size_t maxEval, double reqAbsError, double reqRelError,
+		 error_norm norm, const cubature_opts *opts,
+		 double *val, double *err)
+{
+     int status = FAILURE;
+     double deadline = make_deadline(opts);
+     unsigned layout = opts ? opts->layout : 0;
+     size_t N = opts && opts->neval ? opts->neval : VEGAS_NEVAL;
+     size_t numEval = 0, iteration, ncombined = 0, i;
+     unsigned j, k, *bin = NULL;
+     double *edges = NULL, *d, *r, *x = NULL, *fx, *jac = NULL;
+     double *s1 = NULL, *s2, *wsum, *winv, *v0;
+     rng g;
+
+     if (fdim == 0) return SUCCESS; /* nothing to do */
+     if (dim == 0) { /* trivial integration */
+	  if (f(0, 1, xmin, fdata, fdim, val)) return FAILURE;
+	  for (k = 0; k < fdim; ++k) err[k] = 0;
+	  return SUCCESS;
+     }
+     if (fdim <= 1) norm = ERROR_INDIVIDUAL; /* norm is irrelevant */
+     if (norm < 0 || norm > ERROR_LINF) return FAILURE; /* invalid norm */
+     if (maxEval && N > maxEval / 4) /* at least a few iterations */
+	  N = maxEval / 4 > 2 ? maxEval / 4 : 2;
+
+     edges = (double *) malloc(sizeof(double) * dim * (3*VEGAS_NBINS + 1));
+     x = (double *) malloc(sizeof(double) * N * (dim + fdim));
+     jac = (double *) malloc(sizeof(double) * N);
+     bin = (unsigned *) malloc(sizeof(unsigned) * N * dim);
+     s1 = (double *) malloc(sizeof(double) * fdim * 5);
+     if (!edges || !x || !jac || !bin || !s1) goto done;
+     d = edges + dim * (VEGAS_NBINS + 1);
+     r = d + dim * VEGAS_NBINS;
+     fx = x + N * dim;
+     s2 = s1 + fdim; wsum = s2 + fdim; winv = wsum + fdim; v0 = winv + fdim;
+
+     for (j = 0; j < dim; ++j)
+	  for (i = 0; i <= VEGAS_NBINS; ++i)
+	       edges[j * (VEGAS_NBINS + 1) + i] = (double) i / VEGAS_NBINS;
+     for (k = 0; k < fdim; ++k) wsum[k] = winv[k] = 0;
+     rng_seed(&g, opts ? (uint64_t) opts->seed : 0);
+
+     for (iteration = 0; ; ++iteration) {
+	  size_t xs = (layout & CUBATURE_POINTS_DIM_MAJOR) ? 1 : dim;
+	  size_t xd = (layout & CUBATURE_POINTS_DIM_MAJOR) ? N : 1;
+	  size_t fs = (layout & CUBATURE_VALUES_FDIM_MAJOR) ? 1 : fdim;
+	  size_t fd = (layout & CUBATURE_VALUES_FDIM_MAJOR) ? N : 1;
+	  double emax = 0;
+
+	  /* sample the points from the grid */
+	  for (i = 0; i < N; ++i) {
+	       double w = 1;
+	       for (j = 0; j < dim; ++j) {
+		    const double *e = edges + j * (VEGAS_NBINS + 1);
+		    double y = rng_uniform(&g) * VEGAS_NBINS, h;
+		    unsigned b = (unsigned) y;
+		    if (b >= VEGAS_NBINS) b = VEGAS_NBINS - 1;
+		    h = e[b+1] - e[b];
+		    x[i * xs + j * xd] = xmin[j] + (xmax[j] - xmin[j])
+			 * (e[b] + (y - b) * h);
+		    w *= VEGAS_NBINS * h * (xmax[j] - xmin[j]);
+		    bin[i * dim + j] = b;
+	       }
+	       jac[i] = w;
+	  }
+	  if (f(dim, N, x, fdata, fdim, fx)) goto done;
+	  numEval += N;
+
+	  /* estimates of this iteration, and weights of the bins */
+	  memset(d, 0, sizeof(double) * dim * VEGAS_NBINS);
+	  for (k = 0; k < fdim; ++k) s1[k] = s2[k] = 0;
+	  for (i = 0; i < N; ++i) {
+	       double f2 = 0;
+	       for (k = 0; k < fdim; ++k) {
+		    double fk = fx[i * fs + k * fd] * jac[i];
+		    s1[k] += fk;
+		    s2[k] += fk * fk;
+		    f2 += fk * fk;
+	       }
+	       for (j = 0; j < dim; ++j)
+		    d[j * VEGAS_NBINS + bin[i * dim + j]] += f2;
+	  }
+	  for (k = 0; k < fdim; ++k) {
+	       double m = s1[k] / N, v = (s2[k] / N - m * m) / (N - 1);
+	       /* floor the variance of (nearly) constant integrands */
+	       double vmin = DBL_EPSILON * m * DBL_EPSILON * m;
+	       if (!(v > vmin)) v = vmin > 0 ? vmin : DBL_MIN;
+	       if (iteration == 0) { /* only trains the grid, unless alone */
+		    val[k] = m;
+		    v0[k] = v;
+	       }
+	       else {
+		    wsum[k] += m / v;
+		    winv[k] += 1 / v;
+		    val[k] = wsum[k] / winv[k];
+	       }
+	       err[k] = sqrt(iteration == 0 ? v0[k] : 1 / winv[k]);
+	       if (err[k] > emax) emax = err[k];
+	  }
+	  if (iteration > 0) ++ncombined;
+	  if (opts && opts->trace)
+	       opts->trace(opts->tdata, iteration, N, ncombined, emax);
+
+	  if (ncombined
+	      && converged(fdim, val, err, reqAbsError, reqRelError, norm))
+	       break;
+	  if (maxEval && numEval + N > maxEval)
+	       break;
+	  if (DEADLINE_PASSED(deadline)) {
+	       status = CUBATURE_DEADLINE_REACHED;
+	       goto done;
+	  }
+	  for (j = 0; j < dim; ++j)
+	       refine_grid(edges + j * (VEGAS_NBINS + 1),
+			   d + j * VEGAS_NBINS, r);
+     }
+     status = SUCCESS;
+
+done:
+     free(s1);
+     free(bin);
+     free(jac);
+     free(x);
+     free(edges);
+     return status;
+}
+
+#include "vwrapper.h"
+
+int vegas_opts(unsigned fdim, integrand f, void *fdata,
+	       unsigned dim, const double *xmin, const double *xmax,
+	       size_t maxEval, double reqAbsError, double reqRelError,
+	       error_norm norm, const cubature_opts *opts,
+	       double *val, double *err)
+{
+     fv_data d;
+     cubature_opts o;
+
+     /* fv handles one point at a time, for which layouts are moot */
+     if (opts) {
+	  o = *opts;
+	  o.layout = 0;
+	  opts = &o;
+     }
+     d.f = f; d.fdata = fdata;
+     return vegas_v_opts(fdim, fv, &d, dim, xmin, xmax,
+			 maxEval, reqAbsError, reqRelError, norm, opts,
+			 val, err);
+}
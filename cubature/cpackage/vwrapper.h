@@ -14,3 +14,35 @@ static int fv(unsigned ndim, size_t npt,
 	       return FAILURE;
      return SUCCESS;
 }
+
+/* vectorized wrapper around single-precision vectorized integrands: the
+   points are rounded to float and the values widened back to double, in
+   whatever layout, through a buffer kept between calls (free d->buf);
+   only for the files that #define VWRAPPER_FV32, the others do not use it */
+#ifdef VWRAPPER_FV32
+typedef struct fv32_data_s {
+     integrand_v32 f; void *fdata;
+     float *buf; size_t nbuf;
+} fv32_data;
+static int fv32(unsigned ndim, size_t npt,
+		const double *x, void *d_,
+		unsigned fdim, double *fval)
+{
+     fv32_data *d = (fv32_data *) d_;
+     size_t i, nx = npt * ndim, nf = npt * fdim;
+     float *buf = d->buf;
+     if (nx + nf > d->nbuf) {
+	  /* the old contents are not needed: no realloc copy */
+	  float *nbuf_ptr = (float *) calloc(nx + nf, sizeof(float));
+	  if (!nbuf_ptr) return FAILURE;
+	  free(buf);
+	  d->buf = buf = nbuf_ptr;
+	  d->nbuf = nx + nf;
+     }
+     for (i = 0; i < nx; ++i) buf[i] = (float) x[i];
+     if (d->f(ndim, npt, buf, d->fdata, fdim, buf + nx))
+	  return FAILURE;
+     for (i = 0; i < nf; ++i) fval[i] = buf[nx + i];
+     return SUCCESS;
+}
+#endif /* VWRAPPER_FV32 */
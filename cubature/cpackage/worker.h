@@ -0,0 +1,132 @@
+/* A background thread running one job at a time, for the pipelined
+   mode of hcubature.c: worker_start creates the thread, worker_submit
+   hands it fn(arg), worker_wait waits for the job to be done, and
+   worker_stop ends the thread.  The jobs run pure C code, without ever
+   calling the integrand, which stays in the calling thread. */
+
+#if defined(_WIN32)
+#  include <windows.h>
+typedef struct {
+     HANDLE thread;
+     CRITICAL_SECTION lock;
+     CONDITION_VARIABLE cond;
+     void (*fn)(void *);
+     void *arg;
+     int pending, quit;
+} worker;
+
+#  define WORKER_LOCK(w) EnterCriticalSection(&(w)->lock)
+#  define WORKER_UNLOCK(w) LeaveCriticalSection(&(w)->lock)
+#  define WORKER_WAIT(w) SleepConditionVariableCS(&(w)->cond, &(w)->lock, \
+						  INFINITE)
+#  define WORKER_SIGNAL(w) WakeAllConditionVariable(&(w)->cond)
+#else
+#  include <pthread.h>
+typedef struct {
+     pthread_t thread;
+     pthread_mutex_t lock;
+     pthread_cond_t cond;
+     void (*fn)(void *);
+     void *arg;
+     int pending, quit;
+} worker;
+
+#  define WORKER_LOCK(w) pthread_mutex_lock(&(w)->lock)
+#  define WORKER_UNLOCK(w) pthread_mutex_unlock(&(w)->lock)
+#  define WORKER_WAIT(w) pthread_cond_wait(&(w)->cond, &(w)->lock)
+#  define WORKER_SIGNAL(w) pthread_cond_broadcast(&(w)->cond)
+#endif
+
+static void worker_loop(worker *w)
+{
+     WORKER_LOCK(w);
+     while (1) {
+	  while (!w->pending && !w->quit) WORKER_WAIT(w);
+	  if (w->quit) break;
+	  WORKER_UNLOCK(w);
+	  w->fn(w->arg);
+	  WORKER_LOCK(w);
+	  w->pending = 0;
+	  WORKER_SIGNAL(w);
+     }
+     WORKER_UNLOCK(w);
+}
+
+#if defined(_WIN32)
+static DWORD WINAPI worker_main(LPVOID w)
+{
+     worker_loop((worker *) w);
+     return 0;
+}
+
+static int worker_start(worker *w)
+{
+     w->pending = w->quit = 0;
+     InitializeCriticalSection(&w->lock);
+     InitializeConditionVariable(&w->cond);
+     w->thread = CreateThread(NULL, 0, worker_main, w, 0, NULL);
+     if (!w->thread) {
+	  DeleteCriticalSection(&w->lock);
+	  return FAILURE;
+     }
+     return SUCCESS;
+}
+#else
+static void *worker_main(void *w)
+{
+     worker_loop((worker *) w);
+     return NULL;
+}
+
+static int worker_start(worker *w)
+{
+     w->pending = w->quit = 0;
+     if (pthread_mutex_init(&w->lock, NULL)) return FAILURE;
+     if (pthread_cond_init(&w->cond, NULL)) {
+	  pthread_mutex_destroy(&w->lock);
+	  return FAILURE;
+     }
+     if (pthread_create(&w->thread, NULL, worker_main, w)) {
+	  pthread_cond_destroy(&w->cond);
+	  pthread_mutex_destroy(&w->lock);
+	  return FAILURE;
+     }
+     return SUCCESS;
+}
+#endif
+
+static void worker_submit(worker *w, void (*fn)(void *), void *arg)
+{
+     WORKER_LOCK(w);
+     w->fn = fn;
+     w->arg = arg;
+     w->pending = 1;
+     WORKER_SIGNAL(w);
+     WORKER_UNLOCK(w);
+}
+
+static void worker_wait(worker *w)
+{
+     WORKER_LOCK(w);
+     while (w->pending) WORKER_WAIT(w);
+     WORKER_UNLOCK(w);
+}
+
+/* waits for the pending job, if any, and ends the thread */
+static void worker_stop(worker *w)
+{
+     worker_wait(w);
+     WORKER_LOCK(w);
+     w->quit = 1;
+     WORKER_SIGNAL(w);
+     WORKER_UNLOCK(w);
+#if defined(_WIN32)
+     WaitForSingleObject(w->thread, INFINITE);
+     CloseHandle(w->thread);
+     DeleteCriticalSection(&w->lock);
+#else
+     pthread_join(w->thread, NULL);
+     pthread_cond_destroy(&w->cond);
+     pthread_mutex_destroy(&w->lock);
+#endif
+}
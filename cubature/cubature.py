@@ -1,10 +1,20 @@
+import os
+import sys
+import math
+import importlib
+import time
+import functools
+import threading
+import concurrent.futures
+
 import numpy as np
 import ctypes
-from ._cubature import cubature as _cython_cubature
-from ._cubature import cubature_raw_callback as _cython_cubature_raw_callback
+from .pool import SharedMemoryPool
+from .tracing import Tracer
 
 __all__ = ['ERROR_INDIVIDUAL', 'ERROR_PAIRED', 'ERROR_L2', 'ERROR_L1',
-        'ERROR_LINF', 'cubature']
+        'ERROR_LINF', 'cubature', 'GridIntegrand', 'SharedMemoryPool',
+        'Tracer', 'Integrator', 'get_include', 'use_profiling_build']
 
 ERROR_INDIVIDUAL = 0
 ERROR_PAIRED = 1
@@ -18,11 +28,513 @@ _call_map = {
     ('h', False): 'hcubature',
     ('p', True): 'pcubature_v',
     ('p', False): 'pcubature',
+    ('vegas', True): 'vegas_v',
+    ('vegas', False): 'vegas',
+    ('de', True): 'decubature_v',
+    ('de', False): 'decubature',
     }
 
+# ratio between the sizes of successive cells graded towards singular points
+_GRADING_RATIO = 0.25
+
+def _bind_extension(profiling):
+    # binds the entry points of the optimized extension _cubature, or of
+    # its instrumented build _cubature_prof, here and in the package
+    global _cython_cubature, _cython_cubature_raw_callback
+    global _cython_cubature_grid, GridIntegrand, _CythonIntegrator
+    ext = importlib.import_module('._cubature_prof' if profiling
+                                  else '._cubature', __package__)
+    _cython_cubature = ext.cubature
+    _cython_cubature_raw_callback = ext.cubature_raw_callback
+    _cython_cubature_grid = ext.cubature_grid
+    GridIntegrand = ext.GridIntegrand
+    _CythonIntegrator = ext.Integrator
+    package = sys.modules.get(__package__)
+    if package is not None and hasattr(package, 'GridIntegrand'):
+        package.GridIntegrand = GridIntegrand
+
+
+_bind_extension(os.environ.get('CUBATURE_PROFILING', '') not in ('', '0'))
+
+
+def use_profiling_build(enable=True):
+    r"""Switch to the instrumented build of the compiled extension
+
+    The extension is built twice: optimized, the default, and with the
+    line tracing hooks of Cython (``linetrace``), which let profilers and
+    coverage tools such as ``line_profiler`` or ``coverage`` with the Cython
+    plugin see the lines of ``_cubature.pyx``, at the price of some overhead
+    for each call of the integrand (see ``benchmarks/call_overhead.py``).
+    The instrumented build is also selected at import by setting the
+    environment variable ``CUBATURE_PROFILING=1``.
+
+    Parameters
+    ----------
+    enable : boolean, optional
+        ``False`` switches back to the optimized build.
+
+    Notes
+    -----
+    The integrations started afterwards use the selected build, including
+    those of an :class:`Integrator` created afterwards. A
+    :class:`GridIntegrand` belongs to the build it was created with: create
+    it after the switch.
+
+    """
+    _bind_extension(enable)
+
+
+def get_include():
+    r"""Directory to add to ``include_dirs`` of extensions using the C-level
+    API
+
+    Compiled Cython code can call the integration routines with C integrands
+    and no Python objects involved by cimporting ``c_hcubature``,
+    ``c_hcubature_v``, ``c_pcubature``, ``c_pcubature_v``,
+    ``c_pcubature_v_buf``, ``c_hcubature_simplex``,
+    ``c_hcubature_simplex_v``, ``c_vegas``, ``c_vegas_v``,
+    ``c_decubature`` and ``c_decubature_v`` from ``cubature._cubature``
+    (see the declarations in ``_cubature.pxd``). The headers they rely on are found in this
+    directory.
+
+    """
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def _reduce_symmetry(symmetry, ndim, xmin, xmax):
+    # returns the bounds of the fundamental domain, the factor between the
+    # integrals over the full and the fundamental domains, and the groups of
+    # permutation-symmetric dimensions
+    unknown = set(symmetry) - {'even', 'permutation', 'periodic'}
+    if unknown:
+        raise ValueError('unknown symmetry `{!r}`'.format(unknown.pop()))
+    if xmin.shape[0] != ndim or xmax.shape[0] != ndim:
+        raise ValueError('symmetry requires xmin and xmax of length ndim')
+    xmin = xmin.astype(np.float64)
+    xmax = xmax.astype(np.float64)
+    even = [int(i) for i in symmetry.get('even', ())]
+    groups = [[int(i) for i in g] for g in symmetry.get('permutation', ())]
+    periodic = {int(i): float(p)
+                for i, p in dict(symmetry.get('periodic', {})).items()}
+    perm = [i for g in groups for i in g]
+    for dims in (even, perm, list(periodic)):
+        if any(i < 0 or i >= ndim for i in dims):
+            raise ValueError('symmetry dimension out of range')
+        if len(set(dims)) != len(dims):
+            raise ValueError('repeated dimension in symmetry')
+    if set(periodic) & set(even + perm):
+        raise ValueError('periodic dimensions cannot have other symmetries')
+
+    factor = 1.
+    for i in even:
+        # f is even about the midpoint of the interval
+        xmin[i] = 0.5*(xmin[i] + xmax[i])
+        factor *= 2
+    for i, period in periodic.items():
+        n = (xmax[i] - xmin[i])/period
+        if period <= 0 or n < 0.5 or abs(n - round(n)) > 1e-9*n:
+            raise ValueError('the interval of periodic dimension {} is not a '
+                             'multiple of its period'.format(i))
+        xmax[i] = xmin[i] + period
+        factor *= round(n)
+    for g in groups:
+        if (np.any(xmin[g] != xmin[g[0]]) or np.any(xmax[g] != xmax[g[0]])):
+            raise ValueError('permutation-symmetric dimensions must share '
+                             'the same interval')
+        # the ordered simplex xmin <= x[g[0]] <= ... <= x[g[-1]] <= xmax
+        # is mapped from the unit cube, see _from_ordered
+        factor *= math.factorial(len(g))
+    return xmin, xmax, factor, [g for g in groups if len(g) > 1]
+
+
+def _from_ordered(u, groups, xmin, xmax):
+    # maps the points u (npts, ndim), unit cube in the dimensions of each
+    # group, to the ordered simplices, and returns them with the Jacobian
+    x = np.array(u, dtype=np.float64)
+    jac = np.ones(x.shape[0])
+    for g in groups:
+        a, b = xmin[g[0]], xmax[g[0]]
+        s = x[:, g[-1]].copy()
+        x[:, g[-1]] = a + (b - a)*s
+        for i in reversed(g[:-1]):
+            jac *= s
+            s = s*x[:, i]
+            x[:, i] = a + (b - a)*s
+        jac *= (b - a)**len(g)
+    return x, jac
+
+
+def _to_clustered(u, cells):
+    # maps the points u (npts, ndim) to cluster quadratically towards the
+    # singular point s of each cell (j, s, e), the other end e being fixed,
+    # and returns them with the Jacobian
+    x = np.array(u, dtype=np.float64)
+    jac = np.ones(x.shape[0])
+    for j, s, e in cells:
+        t = (u[:, j] - s)/(e - s)
+        m = (t > 0) & (t < 1)
+        xj = s + (e - s)*t[m]**2
+        # never evaluate at s itself, where the rounding can lead
+        x[m, j] = np.where(xj == s, np.nextafter(s, e), xj)
+        jac[m] *= 2*t[m]
+    return x, jac
+
+
+def _mapped_integrand(func, args, kwargs, transform, vectorized, dim_major):
+    # func integrated over the domain of u, with x, jac = transform(u)
+    # for the points u of shape (npts, ndim)
+    if not vectorized:
+        def integrand(u):
+            x, jac = transform(u[None, :])
+            return np.asarray(func(x[0], *args, **kwargs))*jac[0]
+    elif dim_major:
+        def integrand(u):
+            x, jac = transform(u.T)
+            x = np.ascontiguousarray(x.T, dtype=u.dtype)
+            return np.asarray(func(x, *args, **kwargs))*jac
+    else:
+        def integrand(u):
+            x, jac = transform(u)
+            out = np.asarray(func(x.astype(u.dtype, copy=False), *args,
+                                  **kwargs))
+            return out*(jac if out.ndim == 1 else jac[:, None])
+    return integrand
+
+
+def _limit(lim, x, j):
+    # the limit lim of dimension j at the points x (npts, ndim): a number, or
+    # a callable of the coordinates x[:, :j] of the dimensions before
+    if callable(lim):
+        out = np.asarray(lim(x[:, :j]), dtype=np.float64)
+        return np.broadcast_to(out, x.shape[:1])
+    return np.full(x.shape[0], lim, dtype=np.float64)
+
+
+def _iterated_integrand(func, args, kwargs, fdim, xmin, xmax, nouter,
+                        dim_major, inner, state):
+    # the vectorized integrand of the outer dimensions 0..nouter-1 of an
+    # iterated integral, whose inner dimensions have limits that depend on
+    # the dimensions before. The inner integrals of the n outer points of a
+    # batch are solved together, as one integral of n*fdim components over
+    # the unit cube, mapped to the limits one dimension after the other, so
+    # that each inner batch of points makes a single call of func. inner
+    # holds the options of these integrations, and state (see
+    # _iterated_state) their deadline, and collects the largest inner error
+    # of each component and the status of the inner integrations that did
+    # not converge
+    ndim = len(xmin)
+    ninner = ndim - nouter
+    tol = inner['abserr'], inner['relerr']
+
+    def integrand(xo):
+        n = xo.shape[0]
+
+        def f(u):  # dim-major, u of shape (ninner, m)
+            m = u.shape[1]
+            x = np.empty((n, m, ndim))
+            x[:, :, :nouter] = xo[:, None, :]
+            x = x.reshape(n*m, ndim)
+            u = np.tile(u, n)
+            jac = np.ones(n*m)
+            for j in range(nouter, ndim):
+                a = _limit(xmin[j], x, j)
+                b = _limit(xmax[j], x, j)
+                x[:, j] = a + (b - a)*u[j - nouter]
+                jac *= b - a
+            if dim_major:
+                out = np.asarray(func(np.ascontiguousarray(x.T), *args,
+                                      **kwargs), dtype=np.float64)
+                out = out.reshape(fdim, n, m).transpose(1, 0, 2)
+            else:
+                out = np.asarray(func(x, *args, **kwargs), dtype=np.float64)
+                out = out.reshape(n, m, fdim).transpose(0, 2, 1)
+            return (out*jac.reshape(n, 1, m)).reshape(n*fdim, m)
+
+        timeout = 0.
+        if state['deadline'] is not None:
+            # only what is left of the timeout; once it is over, the inner
+            # integrals stop after their first iteration
+            timeout = max(state['deadline'] - time.monotonic(), 1e-9)
+        opts = inner
+        if state['check']:
+            # the check of the output of func only needs its shape
+            opts = dict(inner, maxEval=1)
+        val, err, info = _cython_cubature(f, ninner, n*fdim, np.zeros(ninner),
+                np.ones(ninner), layout='dim-major', timeout=timeout, **opts)
+        val = np.asarray(val).reshape(n, fdim)
+        err = np.asarray(err).reshape(n, fdim)
+        status = info['status']
+        if status == 'success' and np.any(err > np.maximum(
+                tol[0], tol[1]*np.abs(val))):
+            status = 'inner not converged'
+        with state['lock']:
+            state['err'] = np.maximum(state['err'], err.max(axis=0))
+            if status != 'success' and state['status'] == 'success':
+                state['status'] = status
+        return val[:, 0] if fdim == 1 else val
+
+    return integrand
+
+
+def _iterated_state(fdim, timeout):
+    # the state shared by the inner integrations of an iterated integral
+    deadline = None
+    if timeout is not None and timeout > 0:
+        deadline = time.monotonic() + timeout
+    return {'deadline': deadline, 'lock': threading.Lock(),
+            'err': np.zeros(fdim), 'status': 'success', 'check': True}
+
+
+def _breakpoints(points, singular, grading, ndim, xmin, xmax):
+    # returns the sorted breakpoints of each dimension, strictly inside
+    # (xmin[j], xmax[j]), with `grading` levels of geometrically graded
+    # breakpoints on both sides of each singular point, and the cells
+    # (j, s, e) between each singular point s and its neighbouring edges e
+    if xmin.shape[0] != ndim or xmax.shape[0] != ndim:
+        raise ValueError('points require xmin and xmax of length ndim')
+    grading = int(grading)
+    if grading < 0:
+        raise ValueError('grading must be non-negative')
+
+    def per_dim(p, name):
+        if p is None:
+            return [np.empty(0)]*ndim
+        if len(p) != ndim:
+            raise ValueError('{} must have one entry per dimension'.format(
+                             name))
+        return [np.empty(0) if pj is None
+                else np.atleast_1d(np.asarray(pj, dtype=np.float64)).ravel()
+                for pj in p]
+
+    points = per_dim(points, 'points')
+    singular = per_dim(singular, 'singular')
+    breaks = []
+    cells = []
+    for j in range(ndim):
+        a, b = float(xmin[j]), float(xmax[j])
+        edges = np.unique(np.concatenate(([a, b], points[j], singular[j])))
+        edges = edges[(edges >= a) & (edges <= b)]
+        graded = []
+        for s in singular[j]:
+            if not a <= s <= b:
+                continue
+            i = np.searchsorted(edges, s)
+            for e in (edges[i - 1] if i > 0 else None,
+                      edges[i + 1] if i + 1 < len(edges) else None):
+                if e is not None:
+                    graded.extend(s + (e - s)*_GRADING_RATIO**np.arange(
+                                  1, grading + 1))
+        edges = np.unique(np.concatenate((edges, graded)))
+        for s in singular[j]:
+            if not a <= s <= b:
+                continue
+            i = np.searchsorted(edges, s)
+            if i > 0:
+                cells.append((j, s, edges[i - 1]))
+            if i + 1 < len(edges):
+                cells.append((j, s, edges[i + 1]))
+        breaks.append(edges[(edges > a) & (edges < b)])
+    return breaks, cells
+
+
+def _check_cumulative(cumulative, ndim, xmin, xmax, adaptive, symmetry,
+                      chunks):
+    # returns the upper limits of each dimension, [xmax[j]] for None,
+    # checked to be increasing in (xmin[j], xmax[j]]
+    if adaptive != 'h':
+        raise ValueError('cumulative only applies to adaptive="h"')
+    if symmetry or chunks > 1:
+        raise ValueError('cumulative cannot be combined with symmetry or '
+                         'chunks')
+    if len(cumulative) != ndim or xmin.shape[0] != ndim \
+            or xmax.shape[0] != ndim:
+        raise ValueError('cumulative must have one entry per dimension, '
+                         'with xmin and xmax of length ndim')
+    upper = []
+    for j, u in enumerate(cumulative):
+        a, b = float(xmin[j]), float(xmax[j])
+        u = (np.array([b]) if u is None
+             else np.atleast_1d(np.asarray(u, dtype=np.float64)).ravel())
+        if (len(u) == 0 or not np.all(np.diff(u) > 0) or not u[0] > a
+                or not u[-1] <= b):
+            raise ValueError('the upper limits of cumulative[{}] must be '
+                             'increasing in (xmin, xmax]'.format(j))
+        upper.append(u)
+    return upper
+
+
+def _cumulative_sums(cell_val, cell_err, breaks, upper, fdim):
+    # the integrals and errors from xmin up to each combination of upper
+    # limits, prefix sums of those of the cells between the breakpoints,
+    # which include the upper limits (the first dimension varying fastest
+    # in cell_val and cell_err)
+    ndim = len(breaks)
+    shape = [len(b) + 1 for b in breaks][::-1] + [fdim]
+    axes = list(range(ndim))[::-1] + [ndim]
+    # the cell ending at upper limit u, or the last one for xmax
+    idx = np.ix_(*[np.searchsorted(b, u) for b, u in zip(breaks, upper)])
+    out = []
+    for c in (cell_val, cell_err):
+        c = c.reshape(shape).transpose(axes)
+        for j in range(ndim):
+            c = np.cumsum(c, axis=j)
+        out.append(c[idx])
+    return out
+
+
+def _simplex_vertices(simplex, ndim):
+    # returns the vertices of the simplices as an array of shape
+    # (nsimplex, ndim + 1, ndim), the corners of their bounding box and the
+    # centroid of the first one
+    v = np.asarray(simplex, dtype=np.float64)
+    if v.ndim == 2:
+        v = v[None]
+    if ndim < 1 or v.ndim != 3 or v.shape[1:] != (ndim + 1, ndim) \
+            or v.shape[0] == 0:
+        raise ValueError('simplex must have shape=(ndim + 1, ndim) or '
+                         '(nsimplex, ndim + 1, ndim)')
+    if not np.all(np.isfinite(v)):
+        raise ValueError('simplex vertices must be finite')
+    return v, v.min(axis=(0, 1)), v.max(axis=(0, 1)), v[0].mean(axis=0)
+
+
+def _check_options(adaptive, vectorized, layout, rule, dtype, use_grid):
+    # validates the options shared by cubature() and Integrator, returns
+    # the dtype
+    if layout not in ('point-major', 'dim-major'):
+        raise ValueError('unknown layout `{!r}`'.format(layout))
+    if layout != 'point-major' and not vectorized:
+        raise ValueError('layout only applies to vectorized integrands')
+    if layout != 'point-major' and use_grid:
+        raise ValueError('layout does not apply to GridIntegrand')
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float64, np.float32):
+        raise ValueError('dtype must be float64 or float32')
+    if dtype == np.float32 and (not vectorized or use_grid):
+        raise ValueError('dtype float32 requires a vectorized integrand '
+                         'other than a GridIntegrand')
+    if dtype == np.float32 and adaptive in ('vegas', 'de'):
+        raise ValueError('dtype float32 does not apply to adaptive="{}"'
+                         .format(adaptive))
+    if rule not in ('default', 'degree5', 'degree3'):
+        raise ValueError('unknown rule `{!r}`'.format(rule))
+    if rule != 'default' and adaptive != 'h':
+        raise ValueError('rule only applies to adaptive="h"')
+    return dtype
+
+
+def _check_seed(seed, adaptive):
+    # returns the seed of adaptive='vegas' as an unsigned 64-bit integer,
+    # a random one for seed=None
+    if adaptive != 'vegas':
+        if seed is not None:
+            raise ValueError('seed only applies to adaptive="vegas"')
+        return 0
+    if seed is None:
+        return int.from_bytes(os.urandom(8), 'little')
+    seed = int(seed)
+    if not 0 <= seed < 2**64:
+        raise ValueError('seed must be in [0, 2**64)')
+    return seed
+
+
+def _check_split(split, adaptive):
+    # returns the number of halvings of the regions cut by adaptive='h'
+    split = int(split)
+    if not 1 <= split <= 6:  # CUBATURE_MAX_SPLIT
+        raise ValueError('split must be in [1, 6]')
+    if split > 1 and adaptive != 'h':
+        raise ValueError('split only applies to adaptive="h"')
+    return split
+
+
+def _check_chunks(chunks, workers, fdim, norm, float32, pool):
+    # returns the number of chunks of components, 1 for None
+    if chunks is None:
+        if workers is not None:
+            raise ValueError('workers only applies with chunks')
+        return 1
+    chunks = int(chunks)
+    if not 1 <= chunks <= fdim:
+        raise ValueError('chunks must be in [1, fdim]')
+    if workers is not None and int(workers) < 1:
+        raise ValueError('workers must be positive')
+    if chunks > 1 and (norm != ERROR_INDIVIDUAL or float32
+                       or pool is not None):
+        raise ValueError('chunks require norm=ERROR_INDIVIDUAL, and cannot '
+                         'be combined with dtype=float32 or pool')
+    return chunks
+
+
+def _run_chunks(run, fdim, chunks, workers):
+    # integrates the fdim components in `chunks` contiguous ranges, each
+    # with its own adaptation, by run(components=range) in a pool of
+    # `workers` threads, and concatenates the results
+    bounds = [fdim*i//chunks for i in range(chunks + 1)]
+    ranges = [range(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+    if workers is None:
+        workers = min(chunks, os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(int(workers)) as executor:
+        results = list(executor.map(lambda r: run(components=r), ranges))
+    val = np.concatenate([r[0] for r in results])
+    err = np.concatenate([r[1] for r in results])
+    status = [r[2]['status'] for r in results if r[2]['status'] != 'success']
+    info = {'status': status[0] if status else 'success'}
+    for key in ('speculative', 'discarded'):
+        if key in results[0][2]:
+            info[key] = sum(r[2][key] for r in results)
+    return val, err, info
+
+
+def _check_output(func, ndim, fdim, xmin, xmax, args, kwargs, vectorized,
+                  layout, dtype):
+    # calls func at the middle of the domain to check the shape of its output
+    if not vectorized:
+        out = func(np.ones(ndim)*(xmin+xmax)/2, *args, **kwargs)
+        try:
+            if isinstance(out, float) or isinstance(out, int):
+                out = np.array([out])
+            assert out.shape[0] == fdim
+        except:
+            raise ValueError('Length of func ouptut vector is different than fdim')
+    elif layout == 'dim-major':
+        out = func((np.ones((ndim, 7))*((xmin+xmax)/2)[:, None]).astype(dtype), *args, **kwargs)
+        if fdim > 1:
+            try:
+                assert out.shape[0] == fdim
+                assert out.shape[1] == 7
+            except:
+                raise ValueError('Output vector does not have shape=(fdim, :)')
+        else:
+            try:
+                assert out.shape[-1] == 7
+                assert out.size == 7
+            except:
+                raise ValueError('Output vector does not return a valid array')
+    else:
+        out = func((np.ones((7, ndim))*(xmin+xmax)/2).astype(dtype), *args, **kwargs)
+        if fdim > 1:
+            try:
+                assert out.shape[0] == 7
+                assert out.shape[1] == fdim
+            except:
+                raise ValueError('Output vector does not have shape=(:, fdim)')
+        else:
+            try:
+                assert out.ndim == 1
+                assert out.shape[0] == 7
+            except:
+                raise ValueError('Output vector does not return a valid array')
+
+
 def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
              abserr=1.e-8, relerr=1.e-8, norm=ERROR_INDIVIDUAL, maxEval=0,
-             adaptive='h', vectorized=False):
+             adaptive='h', vectorized=False, timeout=None, full_output=False,
+             layout='point-major', pool=None, tracer=None, rule='default',
+             symmetry=None, points=None, singular=None, grading=0,
+             clustering=False, dtype=np.float64, seed=None, simplex=None,
+             compact=False, split=1, pipeline=False, chunks=None,
+             workers=None, cumulative=None):
     r"""Numerical-integration using the cubature method.
 
     Parameters
@@ -91,10 +603,25 @@ def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
                       z = x_array[:, 2]
                       return x**2 + y**2 + z**2
 
+        If ``vectorized=True`` and ``layout='dim-major'``, `x_array` has
+        ``shape=(ndim, npt)`` and the function must return an array with
+        ``shape=(fdim, npt)``, or ``shape=(npt,)`` for ``fdim=1``:
+
+            - example 3, vector valued function::
+
+                  fdim = 3
+                  def func(x_array, *args, **kwargs):
+                      # note that here ndim=2 (2 variables)
+                      x, y = x_array
+                      return np.array([x**2 - y**2, x*y, x*y**2])
+
         The results from both vectorized and non-vectorized examples
         above should be the same, but the vectorized implementation
         is much faster since it will take advantage of NumPy's vectorization
         capabilities.
+
+        A :class:`GridIntegrand` can also be given, in which case tabulated
+        data is interpolated in C without calling back into Python.
     ndim : integer
         Number dimensions or number of variables being integrated.
     fdim : integer
@@ -121,6 +648,24 @@ def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
           the limits are read in the order ``xmin[i*ndim + j]``, meaning the
           j-th dimension of the i-th element of the vector-valued function.
 
+        Both are ``None`` when the domain is given by `simplex`.
+
+        With ``vectorized=True``, the limits of a dimension ``j > 0`` can
+        also be callables ``g(x)`` of the coordinates ``x`` of the dimensions
+        before, ``shape=(npt, j)``, returning the limits at these points,
+        ``shape=(npt,)``, for non-rectangular domains such as ``0 <= y <=
+        sqrt(1 - x**2)``. The integral is then iterated: the dimensions
+        before the first callable limit are integrated as usual, and for
+        each batch of their points the inner integrals are solved together,
+        as one vector integral over the unit cube of the other dimensions
+        mapped to their limits, with one call of `func` per batch of inner
+        points. The inner integrals use the same `adaptive`, `relerr` and
+        `maxEval` (and `abserr` divided by the outer volume), and what is
+        left of `timeout`. `err` is that of the outer integral plus the
+        largest error of the inner integrals times the outer volume, and if
+        an inner integral stopped at `maxEval` without converging, the
+        status in ``info`` is ``'inner not converged'``.
+
     args : tuple or list, optional
         Contains the extra arguments required by `func`.
     kwargs : dict-like, optional
@@ -132,8 +677,37 @@ def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
         - 'p' means 'p-adaptive', where the order of the integration rule is
           increased
 
+        - 'vegas' means Monte Carlo integration with adaptive importance
+          sampling (the VEGAS algorithm): batches of random points are drawn
+          from a separable density that is refined after each batch to
+          follow the peaks of `func`
+
+        - 'de' means double-exponential (tanh-sinh) quadrature: the
+          substitution ``x = tanh(pi/2*sinh(t))`` is integrated with a
+          trapezoidal rule whose step is halved at each level, reusing the
+          earlier points
+
         The 'p-adaptive' scheme is often better for smoth functions in
-        low dimensions.
+        low dimensions. Rules with more than 4097 points per dimension are
+        generated on demand by :mod:`cubature.clencurt`. The 'vegas' scheme
+        converges slowly (the error decreases as one over the square root of
+        the number of points) but independently of ``ndim``, which makes it
+        the choice for peaked integrands in many dimensions at moderate
+        accuracies. Its `err` is a statistical estimate (one standard
+        deviation) from the batches after the first, which only trains the
+        density, and the batches have 10000 points, or ``maxEval/4`` if
+        smaller. The 'de' scheme is made for integrable singularities at the
+        ends of the interval (``x**-0.5``, ``log(x)``), which are never
+        evaluated and converge about as fast as smooth integrands: tens of
+        points for ``relerr=1e-12`` in 1-D, where 'h' takes thousands. In
+        several dimensions it uses the tensor product of the 1-D rule, and
+        the number of points grows as the power ``ndim`` of that of 1-D, so
+        it is meant for 2 or 3 dimensions; it is a poor choice for
+        singularities inside the domain or peaks. Its `err` is
+        extrapolated from the differences between successive levels. The
+        points come within about ``1e-270`` of the ends (relative to the
+        width), so that a product of singular factors such as
+        ``(x*y)**-0.5`` may overflow where ``x**-0.5*y**-0.5`` does not.
     abserr : double, optional
         Integration stops when estimated absolute error is below this threshold
     relerr : double, optional
@@ -173,15 +747,203 @@ def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
         If ``vectorized=True`` the integration points are passed to the
         integrand function as an array of points, allowing parallel
         evaluation of different points.
+    layout : string, optional
+        Memory layout of the arrays exchanged with a vectorized `func`:
+
+        - 'point-major' (default): `x_array` has ``shape=(npt, ndim)`` and
+          the output ``shape=(npt, fdim)``
+        - 'dim-major': `x_array` has ``shape=(ndim, npt)`` and the output
+          ``shape=(fdim, npt)``. The points are generated directly in this
+          order, so each coordinate ``x_array[j]`` is contiguous, and the
+          output is copied back without transposing
+
+        It also applies to vectorized ``ctypes`` callbacks, for which the
+        buffers are ``x[j*npt + i]`` and ``fval[k*npt + i]``.
+    dtype : numpy.dtype, optional
+        Precision of the arrays exchanged with a vectorized `func` (or
+        ``ctypes`` callback): ``np.float64`` (default) or ``np.float32``. In
+        single precision `x_array` is a ``float32`` array and the output is
+        stored as ``float32``, so that `func` computes and stores its values
+        in single precision, which pays off for large batches or large
+        `fdim`. Only `func` sees ``float32``: the rules generate the points
+        in double precision, which are rounded into a single-precision
+        buffer kept for the whole integration, and the values are widened
+        back to double for the error estimates and the sums, at the cost of
+        these two copies per batch. The rounding of the values limits the
+        attainable relative error to about ``1e-6``.
+    rule : string, optional
+        Cubature rule applied to each region with ``adaptive='h'``:
+
+        - 'default': 15-point Gauss-Kronrod for ``ndim=1`` and the degree 7
+          Genz-Malik rule otherwise, with ``2**ndim + 2*ndim**2 + 2*ndim + 1``
+          points per region
+        - 'degree5': degree 5 rule with ``2*ndim**2 + 2*ndim + 1`` points
+          per region and a degree 3 error estimate
+        - 'degree3': degree 3 rule with ``2*ndim + 1`` points per region
+          and a midpoint error estimate
+
+        Above about 8 dimensions the ``2**ndim`` term dominates, and the
+        lower degree rules make much cheaper refinements.
+    simplex : array-like, optional
+        Integrate over a simplex (a triangle for ``ndim=2``, a tetrahedron
+        for ``ndim=3``) instead of the box ``[xmin, xmax]``, given by its
+        vertices with ``shape=(ndim + 1, ndim)``, or over the union of
+        several simplices with ``shape=(nsimplex, ndim + 1, ndim)``. With
+        ``adaptive='h'`` a degree 7 rule for simplices is used, with
+        ``sum(comb(ndim + k, k) for k in range(4))`` points per simplex (20
+        for a triangle, 35 for a tetrahedron) and a degree 5 error
+        estimate, and the simplices are bisected at the midpoint of their
+        longest edge; no transformation to the cube is involved. It cannot
+        be combined with `rule`, `symmetry`, `points` or ``dtype=float32``.
+    seed : int or None, optional
+        Seed of the random numbers of ``adaptive='vegas'``, an integer in
+        ``[0, 2**64)``: the same seed gives the same results. ``None``
+        (default) draws a new seed at each call.
+    compact : boolean, optional
+        With ``adaptive='h'``, keep the values and errors of the regions in
+        single precision, which halves the memory of the regions when
+        `fdim` is large (it dominates for thousands of components). The
+        rounding of each value is added to its error, so that the estimated
+        error stays an upper bound, and the totals are summed in double
+        precision; the accuracy is however limited to about ``1e-7``
+        relative.
+    split : int, optional
+        With ``adaptive='h'``, cut each region to refine into ``2**split``
+        pieces instead of two, by halving it along the `split` dimensions
+        where the integrand varies most (the largest fourth differences of
+        the rule; a dimension is halved again if there are fewer than
+        `split`, and simplices are bisected `split` times), at most 6. Each
+        call of a vectorized `func` then gets ``2**(split - 1)`` times more
+        points, so that there are fewer calls for the same accuracy, at the
+        price of some more evaluations: this pays off when the overhead of
+        each call dominates, as for Python integrands.
+    pipeline : boolean, optional
+        With ``adaptive='h'``, prepare the next regions to evaluate (taken
+        out of the heap, cut and with their points computed) in a
+        background thread while `func` is evaluated, assuming that the
+        regions being evaluated will not be refined first. The regions are
+        chosen exactly as without `pipeline`, those prepared in vain being
+        put back (counted in ``info``, see `full_output`), so the results
+        are the same up to rounding. This only pays off with a spare CPU
+        core and when the refinement itself, rather than `func`, takes a
+        good share of the time, as for cheap compiled integrands in low
+        dimensions.
+    chunks : int, optional
+        Split the `fdim` components into this many contiguous chunks (of
+        nearly equal sizes), integrated separately and concatenated: each
+        chunk adapts to its own components only, instead of all of them
+        sharing the partition refined for the hardest one, and the heap of
+        each chunk is smaller. `func` is still evaluated for all the
+        components, of which each chunk keeps its own, so this pays off when
+        the components differ much in difficulty (or for the memory), and
+        requires ``norm=ERROR_INDIVIDUAL``. The chunks run in a pool of
+        threads, in parallel for ``ctypes`` callbacks and
+        :class:`GridIntegrand` (or any `func` on a free-threaded Python);
+        `maxEval` and `timeout` apply to each chunk.
+    workers : int, optional
+        Number of threads for `chunks`, by default the smaller of `chunks`
+        and the number of CPUs.
+    symmetry : dict, optional
+        Symmetries of `func` used to integrate only over a fundamental
+        domain, the result being scaled accordingly:
+
+        - ``'even'``: list of dimensions ``i`` in which `func` is even about
+          the midpoint of ``[xmin[i], xmax[i]]``; only the upper half of the
+          interval is integrated
+        - ``'permutation'``: list of groups of dimensions, sharing the same
+          interval, in which `func` is invariant under any permutation of the
+          coordinates; a group of ``k`` dimensions is integrated over the
+          ordered simplex only (``k!`` times smaller), mapped from the unit
+          cube so that `func` receives points of the original domain
+        - ``'periodic'``: dict ``{i: period}``, where ``xmax[i] - xmin[i]``
+          is a multiple of ``period``; one period is integrated
+
+        A dimension can be both even and in a permutation group, e.g. for
+        ``symmetry={'even': range(ndim), 'permutation': [range(ndim)]}``
+        with a fully symmetric `func` on ``[-a, a]**ndim``. Permutation
+        groups require a Python `func`, and since the mapping from the cube
+        makes the integrand less regular, they do not always save
+        evaluations (compare with a :class:`Tracer`), while the even and
+        periodic reductions always do. The `abserr` applies to the integral
+        over the full domain.
+    points : sequence, optional
+        Known breakpoints of `func` (discontinuities, kinks), one entry per
+        dimension: ``None`` or a sequence of coordinates. With
+        ``adaptive='h'`` the domain is first split into the cells of the
+        tensor grid of breakpoints, which seed the adaptive refinement, so
+        that no region straddles a breakpoint. Coordinates outside of the
+        open interval ``(xmin[j], xmax[j])`` are ignored.
+    singular : sequence, optional
+        Locations of integrable singularities of `func`, in the same form
+        as `points`. They are breakpoints too, so that `func` is never
+        evaluated exactly there, and with `grading` or `clustering` the
+        refinement starts better adapted to them.
+    grading : int, optional
+        Number of geometrically graded breakpoints added on each side of
+        each singular point, the cells shrinking by a factor of 4 towards
+        it; the refinement then starts from cells already clustered at the
+        singularity. Note that the number of seed cells is the product over
+        the dimensions of the number of cells per dimension.
+    clustering : boolean, optional
+        If ``True``, in the cells next to each singular point ``s`` (along
+        its dimension) the integration variable is changed to ``t`` with
+        ``x - s`` proportional to ``t**2``, which clusters the points
+        towards ``s`` and cancels singularities like ``1/sqrt(|x - s|)``,
+        usually the cheapest way to reach a tight tolerance. It requires a
+        Python `func`.
+    cumulative : sequence, optional
+        With ``adaptive='h'``, compute in one integration the integrals from
+        `xmin` up to a grid of upper limits, such as the values of a
+        cumulative distribution function, instead of one integral per
+        limit. One entry per dimension: ``None`` for the single upper limit
+        ``xmax[j]``, or the increasing upper limits ``b_k`` along dimension
+        ``j``, in ``(xmin[j], xmax[j]]``. The upper limits are breakpoints
+        (as for `points`), whose cells are refined together until the
+        integral over the whole domain reaches `abserr` or `relerr`, and the
+        integrals and errors of the cells are then summed up to each upper
+        limit. `val` and `err` then have the shape ``(n_0, ..., n_{ndim-1},
+        fdim)``, ``n_j`` being the number of upper limits along dimension
+        ``j``. The error of each integral is at most that of the whole
+        domain, so small integrals are less accurate in relative terms than
+        with a separate integration each. It cannot be combined with
+        `symmetry`, `simplex`, `chunks` or callable limits.
+    pool : :class:`SharedMemoryPool`, optional
+        With ``vectorized=True``, each batch of points is split across the
+        worker processes of the pool, exchanging points and values through
+        shared memory. The adaptive refinement itself stays serial, so the
+        results are identical to a serial run. `func`, `args` and `kwargs`
+        must be picklable.
+    timeout : float or None, optional
+        Wall-clock limit in seconds. It is checked between refinement
+        iterations, and when it expires the integration stops and returns the
+        current estimates instead of raising. The status in ``info`` (see
+        `full_output`) is then ``'deadline reached'``. Note that a single
+        refinement iteration is never interrupted, so the limit may be exceeded
+        by the duration of one batch of integrand evaluations.
+    tracer : :class:`Tracer`, optional
+        Records one event per refinement iteration (number of points, number
+        of regions and current error) and one per call of a Python `func`,
+        which can be saved as a Chrome trace with :meth:`Tracer.save`.
+    full_output : boolean, optional
+        If ``True`` a third value ``info`` is returned.
 
     Returns
     -------
     val : numpy.ndarray
         The 1-D array of length ``fdim`` with the computed integral values
+        (see `cumulative` for its shape then)
     err : numpy.ndarray
         The 1-D array of length ``fdim`` with the estimated errors. For
         smooth functions this estimate is usually conservative (see the
         results from the ``test_cubature.py`` script.
+    info : dict
+        Only returned if ``full_output=True``. Contains:
+
+        - ``'status'``: ``'success'``, or ``'deadline reached'`` if `timeout`
+          expired before convergence, or ``'inner not converged'`` (see
+          `xmin`)
+        - ``'speculative'``, ``'discarded'``: with `pipeline`, the number of
+          regions prepared in the background, and of those put back
 
     Notes
     -----
@@ -213,6 +975,49 @@ def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
 
     """
     # checking xmin and xmax
+    iterated = None
+    if (simplex is None and xmin is not None and xmax is not None
+            and any(callable(a) for a in list(xmin) + list(xmax))):
+        xmin, xmax = list(xmin), list(xmax)
+        if len(xmin) != ndim or len(xmax) != ndim:
+            raise ValueError('xmin and xmax must have length ndim')
+        nouter = min(j for j in range(ndim)
+                     if callable(xmin[j]) or callable(xmax[j]))
+        if nouter == 0:
+            raise ValueError('the limits of the first dimension must be '
+                             'numbers')
+        if (not vectorized or isinstance(func, (ctypes._CFuncPtr,
+                                                GridIntegrand))
+                or adaptive not in ('h', 'p', 'de') or pool is not None
+                or symmetry or points is not None or singular is not None
+                or cumulative is not None or np.dtype(dtype) != np.float64):
+            raise ValueError('callable limits require a vectorized Python '
+                             'func, with adaptive "h", "p" or "de", and '
+                             'cannot be combined with pool, symmetry, '
+                             'points, singular, cumulative or dtype')
+        outer = xmin[:nouter] + xmax[:nouter]
+        vol = abs(np.prod(np.subtract(xmax[:nouter], xmin[:nouter])))
+        inner = dict(method=_call_map[(adaptive, True)],
+                     abserr=abserr/vol if vol > 0 else abserr,
+                     relerr=relerr, norm=ERROR_INDIVIDUAL, maxEval=maxEval)
+        iterated = _iterated_state(fdim, timeout)
+        func = _iterated_integrand(func, args, kwargs, fdim, xmin, xmax,
+                                   nouter, layout == 'dim-major', inner,
+                                   iterated)
+        args, kwargs, layout = (), {}, 'point-major'
+        ndim, xmin, xmax = nouter, outer[:nouter], outer[nouter:]
+    if simplex is not None:
+        if xmin is not None or xmax is not None:
+            raise ValueError('xmin and xmax must be None with simplex')
+        if adaptive != 'h':
+            raise ValueError('simplex only applies to adaptive="h"')
+        if (rule != 'default' or symmetry or points is not None
+                or singular is not None or cumulative is not None
+                or np.dtype(dtype) != np.float64):
+            raise ValueError('simplex cannot be combined with rule, '
+                             'symmetry, points, singular, cumulative or '
+                             'dtype')
+        simplex, xmin, xmax, centroid = _simplex_vertices(simplex, ndim)
     xmin = np.asarray(xmin)
     xmax = np.asarray(xmax)
     if not vectorized:
@@ -223,31 +1028,95 @@ def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
         assert (xmax.shape[0] == ndim) | (xmax.shape[0] == ndim*fdim), 'xmax.shape[0] is not equal to ndim nor ndim*fdim'
 
     use_raw_callback = isinstance(func, ctypes._CFuncPtr)
+    use_grid = isinstance(func, GridIntegrand)
+
+    dtype = _check_options(adaptive, vectorized, layout, rule, dtype,
+                           use_grid)
+    float32 = dtype == np.float32
+    seed = _check_seed(seed, adaptive)
+    if compact and adaptive != 'h':
+        raise ValueError('compact only applies to adaptive="h"')
+    split = _check_split(split, adaptive)
+    if pipeline and adaptive != 'h':
+        raise ValueError('pipeline only applies to adaptive="h"')
+    chunks = _check_chunks(chunks, workers, fdim, norm, float32, pool)
+    if (points is not None or singular is not None) and adaptive != 'h':
+        raise ValueError('points and singular only apply to adaptive="h"')
 
     # checking fdim
-    if not use_raw_callback:
-        if not vectorized:
-            out = func(np.ones(ndim)*(xmin+xmax)/2, *args, **kwargs)
-            try:
-                if isinstance(out, float) or isinstance(out, int):
-                    out = np.array([out])
-                assert out.shape[0] == fdim
-            except:
-                raise ValueError('Length of func ouptut vector is different than fdim')
-        else:
-            out = func(np.ones((7, ndim))*(xmin+xmax)/2, *args, **kwargs)
-            if fdim > 1:
-                try:
-                    assert out.shape[0] == 7
-                    assert out.shape[1] == fdim
-                except:
-                    raise ValueError('Output vector does not have shape=(:, fdim)')
-            else:
-                try:
-                    assert out.ndim == 1
-                    assert out.shape[0] == 7
-                except:
-                    raise ValueError('Output vector does not return a valid array')
+    if use_grid:
+        if func.ndim != ndim:
+            raise ValueError('GridIntegrand has {} axes but ndim is {}'.format(func.ndim, ndim))
+        if func.fdim != fdim:
+            raise ValueError('GridIntegrand values have fdim {} but fdim is {}'.format(func.fdim, fdim))
+    elif not use_raw_callback and simplex is not None:
+        _check_output(func, ndim, fdim, centroid, centroid, args, kwargs,
+                      vectorized, layout, dtype)
+    elif not use_raw_callback:
+        _check_output(func, ndim, fdim, xmin, xmax, args, kwargs, vectorized,
+                      layout, dtype)
+
+    if pool is not None:
+        if not vectorized or use_raw_callback or use_grid:
+            raise ValueError('pool requires a vectorized Python integrand')
+        func = pool.bind(func, fdim, args, kwargs,
+                         dim_major=(layout == 'dim-major'))
+        args, kwargs = (), {}
+
+    if symmetry:
+        xmin, xmax, sym_factor, groups = _reduce_symmetry(symmetry, ndim,
+                                                          xmin, xmax)
+        if groups:
+            if use_raw_callback or use_grid:
+                raise ValueError('permutation symmetry requires a Python '
+                                 'integrand')
+            func = _mapped_integrand(func, args, kwargs,
+                    functools.partial(_from_ordered, groups=groups,
+                                      xmin=xmin.copy(), xmax=xmax.copy()),
+                    vectorized, layout == 'dim-major')
+            args, kwargs = (), {}
+            for g in groups:
+                xmin[g] = 0.
+                xmax[g] = 1.
+        abserr = abserr/sym_factor
+
+    upper = None
+    if cumulative is not None:
+        # the upper limits are breakpoints, ending cells
+        upper = _check_cumulative(cumulative, ndim, xmin, xmax, adaptive,
+                                  symmetry, chunks)
+        given = [None]*ndim if points is None else list(points)
+        if len(given) == ndim:
+            points = [u if p is None else np.concatenate((np.ravel(p), u))
+                      for p, u in zip(given, upper)]
+
+    breaks = None
+    if points is not None or singular is not None:
+        if symmetry and groups:
+            raise ValueError('points and singular cannot be combined with '
+                             'permutation symmetry')
+        breaks, cells = _breakpoints(points, singular, grading, ndim, xmin,
+                                     xmax)
+        if clustering and cells:
+            if use_raw_callback or use_grid:
+                raise ValueError('clustering requires a Python integrand')
+            func = _mapped_integrand(func, args, kwargs,
+                    functools.partial(_to_clustered, cells=cells),
+                    vectorized, layout == 'dim-major')
+            args, kwargs = (), {}
+
+    cell_sums = None
+    if upper is not None:
+        ncells = int(np.prod([len(b) + 1 for b in breaks]))
+        cell_sums = (np.zeros(ncells*fdim), np.zeros(ncells*fdim))
+
+    if timeout is None:
+        timeout = 0.
+    elif timeout <= 0:
+        raise ValueError('timeout must be positive')
+    elif iterated is not None:
+        # what is left after the check of the output of func
+        timeout = max(iterated['deadline'] - time.monotonic(), 1e-9)
 
     method = _call_map.get((adaptive, vectorized), None)
     if method is None:
@@ -255,15 +1124,151 @@ def cubature(func, ndim, fdim, xmin, xmax, args=tuple(), kwargs=dict(),
         s = s.format(adaptive, vectorized)
         raise ValueError(s)
     else:
-        if use_raw_callback:
-            val, err = _cython_cubature_raw_callback(func, ndim, fdim, xmin, xmax,
-                    method, abserr, relerr, norm, maxEval, args=args, kwargs=kwargs)
+        if use_grid:
+            run = functools.partial(_cython_cubature_grid, func, ndim, fdim, xmin, xmax,
+                    method, abserr, relerr, norm, maxEval, timeout=timeout,
+                    tracer=tracer, rule=rule, breaks=breaks, seed=seed,
+                    simplices=simplex, compact=compact, split=split,
+                    pipeline=pipeline, cells=cell_sums)
+        elif use_raw_callback:
+            run = functools.partial(_cython_cubature_raw_callback, func, ndim, fdim, xmin, xmax,
+                    method, abserr, relerr, norm, maxEval, args=args, kwargs=kwargs,
+                    timeout=timeout, layout=layout, tracer=tracer, rule=rule,
+                    breaks=breaks, float32=float32, seed=seed,
+                    simplices=simplex, compact=compact, split=split,
+                    pipeline=pipeline, cells=cell_sums)
+        else:
+            run = functools.partial(_cython_cubature, func, ndim, fdim, xmin, xmax, method, abserr,
+                    relerr, norm, maxEval, args=args, kwargs=kwargs,
+                    timeout=timeout, layout=layout, tracer=tracer, rule=rule,
+                    breaks=breaks, float32=float32, seed=seed,
+                    simplices=simplex, compact=compact, split=split,
+                    pipeline=pipeline, cells=cell_sums)
+        if iterated is not None:
+            # forget the inner integrals of the check of the output of func
+            iterated.update(err=np.zeros(fdim), status='success', check=False)
+        if chunks > 1:
+            val, err, info = _run_chunks(run, fdim, chunks, workers)
         else:
-            val, err = _cython_cubature(func, ndim, fdim, xmin, xmax, method, abserr,
-                    relerr, norm, maxEval, args=args, kwargs=kwargs)
+            val, err, info = run()
+        if iterated is not None:
+            # the inner errors, at most the largest one over the outer volume
+            err = err + vol*iterated['err']
+            if info['status'] == 'success':
+                info['status'] = iterated['status']
+        if upper is not None:
+            val, err = _cumulative_sums(cell_sums[0], cell_sums[1], breaks,
+                                        upper, fdim)
 
+    if symmetry:
+        val = val*sym_factor
+        err = err*sym_factor
+
+    if full_output:
+        return val, err, info
     return val, err
 
+
+class Integrator(object):
+    r"""Integrate the same function over many domains or with many `args`
+
+    Compared to calling :func:`cubature` repeatedly, the options are
+    validated once, the output of `func` is checked only at the first
+    integration, and with ``adaptive='h'`` the cubature rule, its buffer of
+    points and the arrays of the heap of regions are kept from one
+    integration to the next. This pays off for many small integrals, where
+    this setup dominates.
+
+    Parameters
+    ----------
+    func, ndim, fdim, args, kwargs :
+        As for :func:`cubature`: a Python callable or a ``ctypes`` callback.
+        `args` and `kwargs` are the defaults of :meth:`integrate`.
+    abserr, relerr, norm, maxEval, adaptive, vectorized, timeout, layout, tracer, rule, dtype, compact, split, pipeline :
+        As for :func:`cubature`, for all the integrations.
+    seed : int or None, optional
+        As for :func:`cubature`; every integration starts from this seed,
+        drawn once at construction for ``None``.
+    full_output : boolean, optional
+        If ``True``, :meth:`integrate` also returns ``info``.
+
+    Notes
+    -----
+    The options of :func:`cubature` that transform the integrand or the
+    domain (`pool`, `symmetry`, `points`, `simplex`) are not available. An Integrator
+    integrates one integral at a time; it can be used from within its own
+    `func`, for nested integrals, in which case the inner integration
+    allocates its own storage. Calls of :meth:`integrate` from several
+    threads are serialized; to integrate in parallel threads (which scale
+    on a free-threaded Python, or with ``ctypes`` callbacks), use one
+    Integrator per thread, or :func:`cubature`.
+
+    Examples
+    --------
+
+    >>> import numpy as np
+    >>> from cubature import Integrator
+    >>> integ = Integrator(lambda x, a: np.exp(-a*x[:, 0]**2), 1, 1,
+    ...                    args=(1.,), vectorized=True)
+    >>> vals = [integ.integrate([0], [1], args=(a,))[0] for a in (1., 2.)]
+
+    """
+    def __init__(self, func, ndim, fdim, args=tuple(), kwargs=dict(),
+                 abserr=1.e-8, relerr=1.e-8, norm=ERROR_INDIVIDUAL,
+                 maxEval=0, adaptive='h', vectorized=False, timeout=None,
+                 full_output=False, layout='point-major', tracer=None,
+                 rule='default', dtype=np.float64, seed=None, compact=False,
+                 split=1, pipeline=False):
+        use_raw_callback = isinstance(func, ctypes._CFuncPtr)
+        if isinstance(func, GridIntegrand):
+            raise ValueError('use cubature() to integrate a GridIntegrand')
+        dtype = _check_options(adaptive, vectorized, layout, rule, dtype,
+                               False)
+        seed = _check_seed(seed, adaptive)
+        if compact and adaptive != 'h':
+            raise ValueError('compact only applies to adaptive="h"')
+        split = _check_split(split, adaptive)
+        if pipeline and adaptive != 'h':
+            raise ValueError('pipeline only applies to adaptive="h"')
+        if timeout is None:
+            timeout = 0.
+        elif timeout <= 0:
+            raise ValueError('timeout must be positive')
+        method = _call_map.get((adaptive, vectorized), None)
+        if method is None:
+            s = 'unknown combination of adaptive (`{!r}`) and vectorized (`{!r}`).'
+            raise ValueError(s.format(adaptive, vectorized))
+
+        def check(xmin, xmax, args, kwargs):
+            xmin = np.asarray(xmin, dtype=np.float64)
+            xmax = np.asarray(xmax, dtype=np.float64)
+            if xmin.shape != (ndim,) or xmax.shape != (ndim,):
+                raise ValueError('xmin and xmax must have shape=(ndim,)')
+            if not use_raw_callback:
+                _check_output(func, ndim, fdim, xmin, xmax, args, kwargs,
+                              vectorized, layout, dtype)
+
+        self.full_output = full_output
+        self._c = _CythonIntegrator(func, ndim, fdim, method, abserr, relerr,
+                norm, maxEval, args=args, kwargs=kwargs, timeout=timeout,
+                layout=layout, tracer=tracer, rule=rule,
+                float32=(dtype == np.float32), seed=seed, compact=compact,
+                split=split, pipeline=pipeline, raw_callback=use_raw_callback,
+                check=check)
+
+    def integrate(self, xmin, xmax, args=None, kwargs=None):
+        """Integrate from `xmin` to `xmax`, two sequences of length ``ndim``
+
+        `args` and `kwargs`, if not ``None``, replace those given to the
+        constructor for this integration. Returns ``val, err`` (and
+        ``info`` with ``full_output=True``) as :func:`cubature`.
+
+        """
+        val, err, info = self._c.integrate(xmin, xmax, args, kwargs)
+        if self.full_output:
+            return val, err, info
+        return val, err
+
 #TODO
 # - implement multiprocessing dividing the integration interval and spawning
 # - a thread for each sub-interval...
@@ -0,0 +1,222 @@
+"""
+Process pool evaluating vectorized integrands (:mod:`cubature.pool`)
+=====================================================================
+
+.. currentmodule:: cubature.pool
+
+The adaptive loop of :func:`cubature.cubature` always runs serially, but with
+``vectorized=True`` each batch of points can be split across a persistent
+pool of worker processes. The points and the integrand values are exchanged
+through :mod:`multiprocessing.shared_memory` blocks, so only the integrand
+itself (once per integration) and a few indices per batch are pickled.
+Because only the evaluation is distributed, the result and the sequence of
+refinements are identical to a serial run.
+
+.. autoclass:: SharedMemoryPool
+
+"""
+import sys
+import weakref
+import threading
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+__all__ = ['SharedMemoryPool']
+
+
+def _attach(name):
+    # the workers only borrow the blocks owned by the parent process, which
+    # takes care of unlinking them
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _worker(conn):
+    # the integrands (func, args, kwargs) of the integrations bound to the
+    # pool, by key, so that concurrent integrations do not replace each
+    # other's
+    funcs = {}
+    blocks = {}
+    while True:
+        msg = conn.recv()
+        if msg[0] == 'close':
+            break
+        if msg[0] == 'set':
+            key, func, args, kwargs, unbound = msg[1:]
+            for k in unbound:
+                funcs.pop(k, None)
+            funcs[key] = func, args, kwargs
+            continue
+        (_, key, x_name, x_shape, f_name, f_shape, dtype, dim_major, start,
+         stop) = msg
+        x = fval = None
+        try:
+            func, args, kwargs = funcs[key]
+            for name in list(blocks):
+                if name not in (x_name, f_name):
+                    blocks.pop(name).close()
+            for name in (x_name, f_name):
+                if name not in blocks:
+                    blocks[name] = _attach(name)
+            x = np.ndarray(x_shape, dtype=dtype, buffer=blocks[x_name].buf)
+            fval = np.ndarray(f_shape, dtype=dtype, buffer=blocks[f_name].buf)
+            if dim_major:
+                fval[:, start:stop] = func(x[:, start:stop], *args, **kwargs)
+            else:
+                out = func(x[start:stop], *args, **kwargs)
+                fval[start:stop] = np.reshape(out, (stop - start, f_shape[1]))
+            conn.send(None)
+        except Exception:
+            conn.send(traceback.format_exc())
+    for shm in blocks.values():
+        shm.close()
+    conn.close()
+
+
+class SharedMemoryPool(object):
+    r"""Persistent pool of processes evaluating batches of integration points
+
+    Parameters
+    ----------
+    processes : int, optional
+        Number of worker processes, by default ``os.cpu_count()``.
+    context : str, optional
+        The :mod:`multiprocessing` start method (``'fork'``, ``'spawn'``,
+        ``'forkserver'``), by default the platform default.
+
+    Notes
+    -----
+    Pass the pool to :func:`cubature.cubature` with ``vectorized=True`` and
+    ``pool=``. The integrand, `args` and `kwargs` must be picklable (e.g. a
+    module-level function) since they are sent once to each worker at the
+    start of every integration. A pool can be reused for any number of
+    integrations, also by concurrent ones from several threads: each keeps
+    its own integrand, and their batches are evaluated one at a time.
+
+    The pool should be closed when no longer needed, preferably by using it
+    as a context manager::
+
+        with SharedMemoryPool(4) as pool:
+            val, err = cubature(func, ndim, fdim, xmin, xmax,
+                                vectorized=True, pool=pool)
+
+    """
+    def __init__(self, processes=None, context=None):
+        ctx = multiprocessing.get_context(context)
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        if processes < 1:
+            raise ValueError('processes must be at least 1')
+        self._lock = threading.Lock()
+        self._conns = []
+        self._procs = []
+        self._x = None
+        self._f = None
+        self._keys = 0
+        self._bound = {}
+        for _ in range(processes):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, args=(child,), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    @property
+    def processes(self):
+        return len(self._procs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Stop the workers and release the shared memory"""
+        for conn in self._conns:
+            try:
+                conn.send(('close',))
+                conn.close()
+            except OSError:
+                pass
+        for proc in self._procs:
+            proc.join()
+        self._conns = []
+        self._procs = []
+        for shm in (self._x, self._f):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._x = self._f = None
+
+    def _block(self, shm, nbytes):
+        if shm is not None and shm.size >= nbytes:
+            return shm
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        # grow geometrically to amortize reallocations
+        return shared_memory.SharedMemory(create=True, size=max(2*nbytes, 4096))
+
+    def bind(self, func, fdim, args=(), kwargs={}, dim_major=False):
+        """Return a vectorized callable evaluating `func` in the pool"""
+        if not self._procs:
+            raise ValueError('the pool is closed')
+
+        def evaluate(x):
+            return self._evaluate(key, x, fdim, dim_major)
+
+        with self._lock:
+            # the workers keep the integrand under a new key, and forget
+            # those of the callables that no longer exist
+            key = self._keys
+            self._keys += 1
+            unbound = [k for k, ref in self._bound.items() if ref() is None]
+            for k in unbound:
+                del self._bound[k]
+            self._bound[key] = weakref.ref(evaluate)
+            for conn in self._conns:
+                conn.send(('set', key, func, tuple(args), dict(kwargs),
+                           unbound))
+        return evaluate
+
+    def _evaluate(self, key, x, fdim, dim_major):
+        with self._lock:
+            npts = x.shape[1] if dim_major else x.shape[0]
+            f_shape = (fdim, npts) if dim_major else (npts, fdim)
+            # the points and values are exchanged in the precision of the
+            # points, float32 with dtype=np.float32
+            dtype = x.dtype
+            self._x = self._block(self._x, x.nbytes)
+            self._f = self._block(self._f, dtype.itemsize*npts*fdim)
+            np.ndarray(x.shape, dtype=dtype, buffer=self._x.buf)[...] = x
+
+            nchunks = min(len(self._conns), npts)
+            bounds = np.linspace(0, npts, nchunks + 1).astype(int)
+            for conn, start, stop in zip(self._conns, bounds[:-1], bounds[1:]):
+                conn.send(('eval', key, self._x.name, x.shape, self._f.name,
+                           f_shape, dtype.str, dim_major, int(start),
+                           int(stop)))
+            errors = [conn.recv() for conn in self._conns[:nchunks]]
+            for error in errors:
+                if error is not None:
+                    raise RuntimeError('integrand failed in a pool worker:\n'
+                                       + error)
+            fval = np.ndarray(f_shape, dtype=dtype, buffer=self._f.buf)
+            if fdim == 1:
+                return fval.reshape(npts).copy()
+            return fval.copy()
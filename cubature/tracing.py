@@ -0,0 +1,115 @@
+"""
+Tracing of the adaptive integration (:mod:`cubature.tracing`)
+=============================================================
+
+.. currentmodule:: cubature.tracing
+
+A :class:`Tracer` passed to :func:`cubature.cubature` with ``tracer=`` records
+one event per refinement iteration of the C loop and one event per call of a
+Python integrand. The events can be exported in the Chrome trace event format
+and opened in ``chrome://tracing`` or https://ui.perfetto.dev, which shows how
+the wall time splits between the integrand and the adaptive loop itself.
+
+Without a tracer the C loop only tests a NULL pointer per iteration.
+
+.. autoclass:: Tracer
+
+"""
+import os
+import json
+import threading
+from time import perf_counter_ns
+
+__all__ = ['Tracer']
+
+
+class Tracer(object):
+    r"""Recorder of integration events
+
+    Notes
+    -----
+    The same tracer can be passed to several integrations, their events are
+    appended. Each event of the Chrome trace is a complete (``'ph': 'X'``)
+    event with timestamps in microseconds:
+
+    - ``'cubature'``: a whole integration, with the method, dimensions and
+      final status in ``'args'``
+    - ``'iteration'``: the interval since the previous iteration (or the
+      start), which includes the evaluations of that iteration. ``'args'``
+      holds the iteration number (0 for the initial evaluation), the number
+      of points evaluated, the number of regions in the heap (the number of
+      cached grids for ``adaptive='p'``, of combined batches for
+      ``adaptive='vegas'``, of nodes in the first dimension for
+      ``adaptive='de'``) and the largest component of the current error
+      estimate
+    - ``'integrand'``: one call of a Python integrand, with the number of
+      points in ``'args'``. ``ctypes`` callbacks and :class:`GridIntegrand`
+      are not traced at this level
+
+    The error estimate and the heap size are also emitted as counters, which
+    are displayed as tracks over time.
+
+    Tracing a non-vectorized integrand records one event per point, so it is
+    best restricted to small runs.
+
+    Examples
+    --------
+    >>> tracer = Tracer()
+    >>> val, err = cubature(func, ndim, fdim, xmin, xmax, vectorized=True,
+    ...                     tracer=tracer)
+    >>> tracer.save('cubature_trace.json')
+
+    """
+    def __init__(self):
+        self.events = []
+        self._local = threading.local()  # end of the last event, per thread
+
+    def clear(self):
+        """Discard all recorded events"""
+        self.events = []
+
+    @property
+    def iterations(self):
+        """List of dicts describing the recorded refinement iterations"""
+        return [dict(ev[4], duration=(ev[2] - ev[1])*1e-9)
+                for ev in self.events if ev[0] == 'iteration']
+
+    def _begin(self):
+        self._local.last = perf_counter_ns()
+        return self._local.last
+
+    def _end(self, t0, args):
+        self.events.append(('cubature', t0, perf_counter_ns(),
+                            threading.get_ident(), args))
+
+    def _iteration(self, iteration, npts, nregions, err):
+        t = perf_counter_ns()
+        self.events.append(('iteration', self._local.last, t,
+                            threading.get_ident(),
+                            {'iteration': iteration, 'npts': npts,
+                             'nregions': nregions, 'err': err}))
+        self._local.last = t
+
+    def _integrand(self, t0, npts):
+        self.events.append(('integrand', t0, perf_counter_ns(),
+                            threading.get_ident(), {'npts': npts}))
+
+    def to_chrome_trace(self):
+        """Return the events as a dict in the Chrome trace event format"""
+        pid = os.getpid()
+        trace = []
+        for name, t0, t1, tid, args in self.events:
+            trace.append({'name': name, 'cat': 'cubature', 'ph': 'X',
+                          'ts': t0*1e-3, 'dur': (t1 - t0)*1e-3,
+                          'pid': pid, 'tid': tid, 'args': args})
+            if name == 'iteration':
+                for counter in ('err', 'nregions'):
+                    trace.append({'name': counter, 'ph': 'C', 'ts': t1*1e-3,
+                                  'pid': pid, 'tid': tid,
+                                  'args': {counter: args[counter]}})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def save(self, filename):
+        """Write the Chrome trace JSON to `filename`"""
+        with open(filename, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
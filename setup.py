@@ -22,6 +22,7 @@ Programming Language :: Python :: 3.10
 Programming Language :: Python :: 3.11
 Programming Language :: Python :: 3.12
 Programming Language :: Python :: 3.13
+Programming Language :: Python :: Free Threading :: 2 - Beta
 Operating System :: Microsoft :: Windows
 Operating System :: Unix
 Operating System :: POSIX :: BSD
@@ -37,15 +38,33 @@ with open('cubature/__init__.py', 'rb') as f:
     version = str(ast.literal_eval(_version_re.search(
         f.read().decode('utf-8')).group(1)))
 
+_cubature_sources = [
+    'cubature/cpackage/hcubature.c',
+    'cubature/cpackage/pcubature.c',
+    'cubature/cpackage/vegas.c',
+    'cubature/cpackage/decubature.c',
+    'cubature/get_ptr.c',
+    ]
+
+# the background thread of the pipelined hcubature
+_libraries = [] if os.name == 'nt' else ['pthread']
+
+# the default modules are compiled without any tracing hooks; the
+# instrumented copy of _cubature (_cubature_prof.pyx, with the linetrace
+# directive) is enabled by CYTHON_TRACE, and selected at run time by
+# cubature.use_profiling_build or CUBATURE_PROFILING=1
 extensions = [
     Extension('cubature._cubature',
-        sources = [
-            'cubature/cpackage/hcubature.c',
-            'cubature/cpackage/pcubature.c',
-            'cubature/get_ptr.c',
-            'cubature/_cubature.pyx',
-            ],
+        sources = _cubature_sources + ['cubature/_cubature.pyx'],
+        include_dirs = [],
+        libraries = _libraries,
+        language='c',
+        ),
+    Extension('cubature._cubature_prof',
+        sources = _cubature_sources + ['cubature/_cubature_prof.pyx'],
         include_dirs = [],
+        libraries = _libraries,
+        define_macros = [('CYTHON_TRACE', '1')],
         language='c',
         ),
     Extension('cubature._test_integrands',
@@ -56,16 +75,21 @@ extensions = [
 ]
 
 ext_modules = cythonize(extensions,
-        compiler_directives={'linetrace': True},
         language_level='3',
         )
 
-#NOTE package_data included using the MANIFEST.in file
+#NOTE package_data included using the MANIFEST.in file, except for the
+#      files installed with the package: the declarations and headers of the
+#      C-level API (cubature.get_include), and the sources of _cubature that
+#      _cubature_prof.pyx/.pxd include
+package_data = {'cubature': ['*.pxd', 'cpackage/*.h', '_cubature.pyx',
+                             '_cubature_prof.pyx']}
 
 setup(
     name = 'cubature',
     version = version,
     packages = find_packages(),
+    package_data = package_data,
     ext_modules = ext_modules,
     author = 'Saullo G. P. Castro and Anton Loukianov',
     author_email = 'saullogiovani@gmail.com',
@@ -0,0 +1,61 @@
+import os
+import sys
+import subprocess
+from math import erf
+
+import numpy as np
+import pytest
+
+import cubature
+import cubature._test_integrands as ti
+
+
+@pytest.mark.parametrize('method', ['h', 'h_v', 'p', 'p_v', 'p_v_buf'])
+def test_gauss_integrals(method):
+    a = np.linspace(0.1, 5, 50)
+    val, err = ti.capi_gauss_integrals(a, method)
+    exact = [0.5*np.sqrt(np.pi/ai)*erf(np.sqrt(ai)) for ai in a]
+    assert np.allclose(val, exact, rtol=1e-10, atol=0)
+    assert np.all(err <= 1e-10*np.abs(val))
+
+
+def test_matches_python_api():
+    a = np.array([0.5, 2.])
+    val, err = ti.capi_gauss_integrals(a, 'h_v')
+    for i in range(len(a)):
+        v, e = cubature.cubature(lambda x: np.exp(-a[i]*x[:, 0]**2), 1, 1,
+                                 [0.], [1.], abserr=0, relerr=1e-10,
+                                 vectorized=True)
+        assert v[0] == val[i] and e[0] == err[i]
+
+
+def test_get_include():
+    inc = cubature.get_include()
+    assert os.path.isfile(os.path.join(inc, '_cubature.pxd'))
+    assert os.path.isfile(os.path.join(inc, 'cpackage', 'cubature.h'))
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.skipif(not os.path.isfile(os.path.join(_ROOT, 'setup.py')),
+                    reason='needs the source tree')
+def test_installed_files(tmp_path):
+    # the files of the package as installed, not those of the source tree
+    lib = tmp_path / 'lib'
+    subprocess.check_call([sys.executable, 'setup.py', '-q', 'build_py',
+                           '--build-lib', str(lib)], cwd=_ROOT,
+                          stdout=subprocess.DEVNULL)
+    inc = lib / 'cubature'
+    for name in ('_cubature.pxd', '_cubature.pyx', '_cubature_prof.pxd',
+                 '_cubature_prof.pyx'):
+        assert (inc / name).is_file()
+    for h in ('cubature.h', 'converged.h', 'vwrapper.h', 'worker.h'):
+        assert (inc / 'cpackage' / h).is_file()
+
+    # an extension cimporting the C-level API translates with them alone
+    pyx = tmp_path / 'user.pyx'
+    pyx.write_text('from cubature._cubature cimport c_hcubature\n'
+                   'from cubature._cubature_prof cimport c_pcubature\n')
+    subprocess.check_call([sys.executable, '-m', 'cython', '-3', '-I',
+                           str(lib), str(pyx)], cwd=str(tmp_path))
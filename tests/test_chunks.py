@@ -0,0 +1,79 @@
+import ctypes
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, GridIntegrand
+
+
+_a = np.array([1., 2., 3., 4., 1e3, 2e3, 3e3, 4e3])
+# int over [0, 1]^2 of exp(-a*(x^2 + y^2))
+_exact = (np.sqrt(np.pi/_a)/2*np.array([math.erf(np.sqrt(a))
+                                        for a in _a]))**2
+
+
+def _f(x):
+    return np.exp(-np.outer(x[:, 0]**2 + x[:, 1]**2, _a))
+
+
+@pytest.mark.parametrize('chunks', [1, 2, 3, 8])
+def test_chunks(chunks):
+    val, err = cubature(_f, 2, 8, [0, 0], [1, 1], vectorized=True,
+                        relerr=1e-8, abserr=0, chunks=chunks)
+    assert val == pytest.approx(_exact, rel=1e-8)
+    assert np.all(err <= 1e-8*val)
+
+
+def test_own_adaptation():
+    # the easy components are no longer refined for the hard ones
+    kw = dict(vectorized=True, relerr=1e-8, abserr=0)
+    val, err = cubature(_f, 2, 8, [0, 0], [1, 1], **kw)
+    val2, err2 = cubature(_f, 2, 8, [0, 0], [1, 1], chunks=2, **kw)
+    assert np.all(err2[:4] > 10*err[:4])
+    assert val2 == pytest.approx(_exact, rel=1e-8)
+
+
+@pytest.mark.parametrize('layout', ['point-major', 'dim-major'])
+def test_chunks_ctypes(layout):
+    CBTYPE = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_uint, ctypes.c_size_t,
+                              ctypes.POINTER(ctypes.c_double), ctypes.c_void_p,
+                              ctypes.c_uint, ctypes.POINTER(ctypes.c_double))
+
+    def f(ndim, npt, x, fdata, fdim, fval):
+        if layout == 'dim-major':
+            x = np.ctypeslib.as_array(x, shape=(ndim, npt)).T
+            fval = np.ctypeslib.as_array(fval, shape=(fdim, npt)).T
+        else:
+            x = np.ctypeslib.as_array(x, shape=(npt, ndim))
+            fval = np.ctypeslib.as_array(fval, shape=(npt, fdim))
+        fval[...] = _f(x)
+        return 0
+
+    val, err = cubature(CBTYPE(f), 2, 8, [0, 0], [1, 1], vectorized=True,
+                        layout=layout, relerr=1e-8, abserr=0, chunks=3,
+                        workers=2)
+    assert val == pytest.approx(_exact, rel=1e-8)
+
+
+def test_chunks_grid():
+    ax = [np.linspace(0, 1, 5)]*2
+    X, Y = np.meshgrid(*ax, indexing='ij')
+    g = GridIntegrand(np.stack([X, Y, X*Y], axis=-1), ax)
+    for vectorized in (True, False):
+        val, err = cubature(g, 2, 3, [0, 0], [1, 1], vectorized=vectorized,
+                            chunks=2)
+        assert val == pytest.approx([0.5, 0.5, 0.25])
+
+
+def test_invalid():
+    kw = dict(vectorized=True)
+    for chunks in (0, 9):
+        with pytest.raises(ValueError):
+            cubature(_f, 2, 8, [0, 0], [1, 1], chunks=chunks, **kw)
+    with pytest.raises(ValueError):
+        cubature(_f, 2, 8, [0, 0], [1, 1], chunks=2, norm=2, **kw)
+    with pytest.raises(ValueError):
+        cubature(_f, 2, 8, [0, 0], [1, 1], chunks=2, workers=0, **kw)
+    with pytest.raises(ValueError):
+        cubature(_f, 2, 8, [0, 0], [1, 1], workers=2, **kw)
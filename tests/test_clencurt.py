@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from cubature import cubature, clencurt
+
+
+def _rule(x, w, m):
+    # points and weights on [-1, 1] of the rule with 2**(m+1) + 1 points
+    wm = w[m + (1 << m) - 1:][:(1 << m) + 1]
+    xm = x[:1 << m]
+    return (np.concatenate(([0.], xm, -xm)),
+            np.concatenate((wm[:1], wm[1:], wm[1:])))
+
+
+@pytest.mark.parametrize('m', [0, 3, 11, 13])
+def test_tables(m):
+    x, w = clencurt.tables(13)
+    assert x.shape == (1 << 13,) and w.shape == (13 + (1 << 14),)
+    xm, wm = _rule(x, w, m)
+    assert np.allclose(np.sort(xm), -np.cos(np.pi*np.arange(2**(m+1) + 1)
+                                             / 2**(m+1)), atol=1e-15)
+    # exact for polynomials up to the number of points
+    for k in range(0, min(2**(m+1) + 1, 40), 2):
+        assert np.dot(wm, xm**k) == pytest.approx(2./(k + 1), rel=1e-13)
+
+
+def test_nested():
+    x12, w12 = clencurt.tables(12)
+    x14, w14 = clencurt.tables(14)
+    assert np.array_equal(x12, x14[:x12.shape[0]])
+    assert np.array_equal(w12, w14[:w12.shape[0]])
+
+
+def test_file_cache(tmpdir, monkeypatch):
+    fname = str(tmpdir.join('cc.npz'))
+    monkeypatch.setattr(clencurt, '_tables', {})
+    clencurt.set_cache_file(fname)
+    try:
+        x, w = clencurt.tables(13)
+        monkeypatch.setattr(clencurt, '_tables', {})
+        monkeypatch.setattr(clencurt, '_compute', None)  # must not be called
+        x2, w2 = clencurt.tables(12)
+    finally:
+        clencurt.set_cache_file(None)
+    assert np.array_equal(x2, x[:1 << 12])
+    assert np.array_equal(w2, w[:12 + (1 << 13)])
+
+
+def test_refine_beyond_builtin_levels():
+    # needs far more than the 4097 built-in points to converge
+    eps = 2e-3
+    val, err = cubature(lambda x: 1/(eps**2 + x[:, 0]**2), 1, 1, [-1], [1],
+                        adaptive='p', vectorized=True, relerr=1e-10)
+    exact = 2/eps*np.arctan(1/eps)
+    assert val[0] == pytest.approx(exact, rel=1e-10)
+    assert err[0] < 1e-10*exact
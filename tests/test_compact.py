@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from cubature import cubature, Integrator
+
+
+_a = np.linspace(0.5, 5., 2000)
+# int_0^1 int_0^1 exp(-a*(x + y)) dx dy
+_exact = ((1 - np.exp(-_a))/_a)**2
+
+
+def _f(x):
+    return np.exp(-np.outer(x[:, 0] + x[:, 1], _a))
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_large_fdim(compact):
+    val, err = cubature(_f, 2, _a.size, [0, 0], [1, 1], vectorized=True,
+                        relerr=1e-6, abserr=0, compact=compact)
+    assert np.all(err <= 1e-6*np.abs(val))
+    assert np.all(np.abs(val - _exact) <= err)
+
+
+def test_compact_error_bound():
+    # the rounding to single precision is accounted for in the errors
+    val, err = cubature(_f, 2, _a.size, [0, 0], [1, 1], vectorized=True,
+                        relerr=1e-9, abserr=0, maxEval=17*200, compact=True)
+    val2, err2 = cubature(_f, 2, _a.size, [0, 0], [1, 1], vectorized=True,
+                          relerr=1e-9, abserr=0, maxEval=17*200)
+    assert np.all(err >= err2)
+    assert np.all(np.abs(val - _exact) <= err)
+
+
+def test_running_totals():
+    # many regions of a tiny integrand on a large one, without re-summing
+    def f(x):
+        return np.column_stack((1e8 + 0*x[:, 0], np.sqrt(np.abs(x[:, 0]))))
+
+    val, err = cubature(f, 1, 2, [-1], [1], vectorized=True, relerr=1e-13,
+                        abserr=0, maxEval=200000)
+    assert val[0] == 2e8
+    assert val[1] == pytest.approx(4/3, rel=1e-12)
+
+
+def test_integrator():
+    integ = Integrator(_f, 2, _a.size, vectorized=True, relerr=1e-6,
+                       compact=True)
+    for b in (1., 0.5):
+        val, err = integ.integrate([0, 0], [b, b])
+        exact = ((1 - np.exp(-_a*b))/_a)**2
+        assert np.all(np.abs(val - exact) <= err)
+    with pytest.raises(ValueError):
+        cubature(_f, 2, _a.size, [0, 0], [1, 1], vectorized=True,
+                 adaptive='p', compact=True)
+    with pytest.raises(ValueError):
+        Integrator(_f, 2, _a.size, vectorized=True, adaptive='p',
+                   compact=True)
@@ -1,3 +1,5 @@
+import time
+import math
 import ctypes
 import numpy as np
 import pytest
@@ -40,13 +42,13 @@ def test_invalid_adaptive_option():
 def test_raw_callback(monkeypatch):
     called = {}
 
-    def fake_raw(func, ndim, fdim, xmin, xmax, method, abserr, relerr, norm, maxEval, args=(), kwargs=None):
+    def fake_raw(func, ndim, fdim, xmin, xmax, method, abserr, relerr, norm, maxEval, args=(), kwargs=None, **options):
         called['raw'] = True
-        return np.array([1.0]), np.array([0.0])
+        return np.array([1.0]), np.array([0.0]), {'status': 'success'}
 
     def fake_standard(*a, **k):
         called['standard'] = True
-        return np.array([1.0]), np.array([0.0])
+        return np.array([1.0]), np.array([0.0]), {'status': 'success'}
 
     monkeypatch.setattr(cubature_module, '_cython_cubature_raw_callback', fake_raw)
     monkeypatch.setattr(cubature_module, '_cython_cubature', fake_standard)
@@ -61,3 +63,132 @@ def test_raw_callback(monkeypatch):
     cub(c_cb, ndim=1, fdim=1, xmin=[0], xmax=[1])
 
     assert 'raw' in called and 'standard' not in called
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+def test_timeout_returns_best_estimate(adaptive):
+    def f(x):
+        time.sleep(0.02)
+        # discontinuous integrand that never converges to relerr=1e-15
+        return (x[:, 0] + x[:, 1] < 1.).astype(float)
+    t0 = time.perf_counter()
+    val, err, info = cub(f, ndim=2, fdim=1, xmin=[0, 0], xmax=[1, 1],
+            abserr=0, relerr=1e-15, vectorized=True, adaptive=adaptive,
+            timeout=0.2, full_output=True)
+    assert time.perf_counter() - t0 < 5.
+    assert info['status'] == 'deadline reached'
+    assert abs(val[0] - 0.5) < 0.1
+    assert err[0] > 0
+
+
+def test_timeout_not_reached():
+    val, err, info = cub(lambda x: x[0]*x[1], ndim=2, fdim=1, xmin=[0, 0],
+            xmax=[1, 1], timeout=60., full_output=True)
+    assert info['status'] == 'success'
+    assert np.allclose(val, 0.25)
+
+
+def test_invalid_timeout():
+    with pytest.raises(ValueError, match='timeout'):
+        cub(lambda x: x[0], ndim=1, fdim=1, xmin=[0], xmax=[1], timeout=0)
+
+
+def _f_point_major(x):
+    return np.stack([np.exp(-np.sum(x**2, axis=1)), x[:, 0]*np.cos(x[:, -1]),
+                     np.abs(x[:, 0] - 0.3)], axis=1)
+
+
+def _f_dim_major(x):
+    assert x.shape[0] == 3 and x[0].flags.c_contiguous
+    return np.stack([np.exp(-np.sum(x**2, axis=0)), x[0]*np.cos(x[-1]),
+                     np.abs(x[0] - 0.3)])
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+def test_dim_major_layout(adaptive):
+    xmin, xmax = [0, -1, 0.5], [1, 1, 2]
+    kw = dict(vectorized=True, adaptive=adaptive, relerr=1e-6, maxEval=20000)
+    val, err = cub(_f_point_major, 3, 3, xmin, xmax, **kw)
+    val2, err2 = cub(_f_dim_major, 3, 3, xmin, xmax, layout='dim-major', **kw)
+    assert np.allclose(val, val2, rtol=1e-14)
+    assert np.allclose(err, err2, rtol=1e-10)
+
+
+def test_dim_major_layout_1d_scalar():
+    def f(x):
+        assert x.shape[0] == 1
+        return np.sqrt(x[0])
+    val, err = cub(f, 1, 1, [0], [1], vectorized=True, layout='dim-major')
+    assert np.allclose(val, 2./3)
+
+
+def test_dim_major_layout_ctypes():
+    CBTYPE = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_uint, ctypes.c_size_t,
+                              ctypes.POINTER(ctypes.c_double), ctypes.c_void_p,
+                              ctypes.c_uint, ctypes.POINTER(ctypes.c_double))
+
+    def f(ndim, npt, x, fdata, fdim, fval):
+        x = np.ctypeslib.as_array(x, shape=(ndim, npt))
+        fval = np.ctypeslib.as_array(fval, shape=(fdim, npt))
+        fval[0] = x[0]*x[1]
+        fval[1] = x[1]**2
+        return 0
+
+    val, err = cub(CBTYPE(f), 2, 2, [0, 0], [1, 2], vectorized=True,
+                   layout='dim-major')
+    assert np.allclose(val, [1., 8./3])
+
+
+def test_invalid_layout():
+    with pytest.raises(ValueError, match='layout'):
+        cub(lambda x: x[:, 0], 1, 1, [0], [1], vectorized=True, layout='F')
+    with pytest.raises(ValueError, match='vectorized'):
+        cub(lambda x: x[0], 1, 1, [0], [1], layout='dim-major')
+
+
+def test_integrand_exception_propagates():
+    def f(x):
+        if x[0] < 0.4:
+            raise ZeroDivisionError('boom')
+        return x[0]
+    with pytest.raises(ZeroDivisionError, match='boom'):
+        cub(f, ndim=1, fdim=1, xmin=[0], xmax=[1])
+
+
+@pytest.mark.parametrize('rule, degree', [('degree5', 5), ('degree3', 3)])
+@pytest.mark.parametrize('ndim', [1, 2, 4])
+def test_low_cost_rules_exact(rule, degree, ndim):
+    # a single region integrates every monomial up to the rule degree
+    rng = np.random.default_rng(ndim)
+    for _ in range(10):
+        p = rng.multinomial(degree, np.ones(ndim + 1)/(ndim + 1))[:ndim]
+        exact = np.prod([(0.7**(k + 1) - (-0.3)**(k + 1))/(k + 1) for k in p])
+        val, err = cub(lambda x: np.prod((x - 0.3)**p, axis=1), ndim, 1,
+                       np.zeros(ndim), np.ones(ndim), vectorized=True,
+                       rule=rule, maxEval=1)
+        assert val[0] == pytest.approx(exact, abs=1e-13)
+
+
+@pytest.mark.parametrize('rule, npts', [('degree5', 2*10**2 + 2*10 + 1),
+                                        ('degree3', 2*10 + 1)])
+def test_low_cost_rules_high_dim(rule, npts):
+    ndim = 10
+    sizes = []
+    def f(x):
+        sizes.append(x.shape[0])
+        return np.exp(-20*((x[:, 0] - 0.3)**2 + (x[:, 1] - 0.6)**2))
+    val, err = cub(f, ndim, 1, np.zeros(ndim), np.ones(ndim), relerr=1e-6,
+                   vectorized=True, rule=rule)
+    sizes = sizes[1:]  # skip the probe of the output shape
+    assert all(n % npts == 0 for n in sizes)
+    assert sizes[0] == npts
+    g = lambda c: math.erf(np.sqrt(20)*c) + math.erf(np.sqrt(20)*(1 - c))
+    exact = np.pi/20/4 * g(0.3) * g(0.6)
+    assert val[0] == pytest.approx(exact, rel=1e-5)
+
+
+def test_invalid_rule():
+    with pytest.raises(ValueError, match='rule'):
+        cub(lambda x: x[0], 1, 1, [0], [1], rule='degree7')
+    with pytest.raises(ValueError, match='adaptive'):
+        cub(lambda x: x[0], 1, 1, [0], [1], rule='degree5', adaptive='p')
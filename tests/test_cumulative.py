@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Tracer
+
+
+def _gauss(x):
+    return np.exp(-x[:, 0]**2/2)/math.sqrt(2*math.pi)
+
+
+def _cdf(b):
+    return np.array([0.5*(1 + math.erf(bk/math.sqrt(2))) for bk in b])
+
+
+def test_cdf():
+    b = np.linspace(-4, 4, 101)[1:]
+    tracer = Tracer()
+    val, err = cubature(_gauss, 1, 1, [-8], [4], vectorized=True,
+                        abserr=1e-12, relerr=0, cumulative=[b],
+                        tracer=tracer)
+    assert val.shape == err.shape == (100, 1)
+    assert val[:, 0] == pytest.approx(_cdf(b), abs=1e-12)
+    assert np.all(np.diff(err[:, 0]) >= 0)
+    assert err[-1, 0] <= 1e-12
+    # a single integration, from the cells of the upper limits below xmax
+    assert tracer.iterations[0]['nregions'] == 100
+
+    val1, err1 = cubature(_gauss, 1, 1, [-8], [4], vectorized=True,
+                          abserr=1e-12, relerr=0)
+    assert val[-1, 0] == pytest.approx(val1[0], abs=2e-12)
+
+
+def test_grid_2d():
+    f = lambda x: np.column_stack((x[:, 0]*x[:, 1]**2, np.ones(len(x))))
+    bx, by = [0.25, 0.5, 1], [1, 1.5, 2]
+    val, err = cubature(f, 2, 2, [0, 0], [1, 2], vectorized=True,
+                        cumulative=[bx, by])
+    assert val.shape == (3, 3, 2)
+    X, Y = np.meshgrid(bx, by, indexing='ij')
+    assert val[..., 0] == pytest.approx(X**2/2*Y**3/3)
+    assert val[..., 1] == pytest.approx(X*Y)
+
+    # a single upper limit along the first dimension, with other points
+    val, err = cubature(f, 2, 2, [0, 0], [1, 2], vectorized=True,
+                        cumulative=[None, [1, 2]],
+                        points=[[0.3], [0.5, 1.5]])
+    assert val.shape == (1, 2, 2)
+    assert val[0, :, 0] == pytest.approx([1/6., 4/3.])
+
+
+def test_options():
+    b = [0, 1, 2]
+    f = lambda x: math.exp(x[0])
+    expected = np.exp(b) - math.exp(-1)
+    for kw in (dict(), dict(compact=True), dict(pipeline=True),
+               dict(split=2), dict(full_output=True)):
+        out = cubature(f, 1, 1, [-1], [2], relerr=1e-6, cumulative=[b],
+                       **kw)
+        assert out[0][:, 0] == pytest.approx(expected, rel=1e-6)
+
+
+def test_invalid():
+    kw = dict(vectorized=True)
+    for cumulative in ([[0.5]], [[0.5], None, None], [[]], [[0.5, 0.4]],
+                       [[0]], [[1.5]]):
+        with pytest.raises(ValueError):
+            cubature(lambda x: x[:, 0], 2, 1, [0, 0], [1, 1],
+                     cumulative=cumulative, **kw)
+    with pytest.raises(ValueError):
+        cubature(lambda x: x[:, 0], 1, 1, [0], [1], adaptive='p',
+                 cumulative=[[0.5]], **kw)
+    with pytest.raises(ValueError):
+        cubature(lambda x: x[:, 0], 2, 1, [0, 0], [1, 1], chunks=1,
+                 symmetry={'even': [0]}, cumulative=[[0.5], None], **kw)
+    with pytest.raises(ValueError):
+        cubature(lambda x: x[:, 0], 2, 1, None, None,
+                 simplex=[[0, 0], [1, 0], [0, 1]], cumulative=[None, None],
+                 **kw)
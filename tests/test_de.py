@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from cubature import cubature, Integrator, Tracer
+
+
+def _npts(tracer):
+    return sum(it['npts'] for it in tracer.iterations)
+
+
+@pytest.mark.parametrize('func, exact', [
+    (lambda x: x**-0.5, 2.),
+    (np.log, -1.),
+    (lambda x: np.log1p(-x), -1.),
+    (np.exp, np.e - 1)])
+def test_endpoint_singularities(func, exact):
+    seen = []
+
+    def f(x):
+        seen.append(x[:, 0].copy())
+        return func(x[:, 0])
+
+    tracer = Tracer()
+    val, err = cubature(f, 1, 1, [0], [1], vectorized=True, adaptive='de',
+                        relerr=1e-12, abserr=0, tracer=tracer)
+    assert err[0] <= 1e-12*abs(exact)
+    assert val[0] == pytest.approx(exact, rel=1e-13)
+    assert _npts(tracer) < 100
+    # the levels reuse the earlier points, and never reach the endpoints
+    x = np.concatenate(seen[1:])
+    assert len(np.unique(x)) == len(x) == _npts(tracer)
+    assert np.all((x > 0) & (x < 1))
+
+    tracer = Tracer()
+    cubature(f, 1, 1, [0], [1], vectorized=True, relerr=1e-12, abserr=0,
+             maxEval=10**6, tracer=tracer)
+    if func is not np.exp:
+        assert _npts(tracer) > 10*100
+
+
+def test_strong_singularity_and_reversed():
+    val, err = cubature(lambda x: x[0]**-0.9, 1, 1, [0], [1], adaptive='de',
+                        relerr=1e-10, abserr=0)
+    assert val[0] == pytest.approx(10., rel=1e-10)
+    val, err = cubature(lambda x: x[:, 0]**-0.5, 1, 1, [1], [0],
+                        vectorized=True, adaptive='de', relerr=1e-12)
+    assert val[0] == pytest.approx(-2., rel=1e-13)
+
+
+@pytest.mark.parametrize('layout', ['point-major', 'dim-major'])
+def test_tensor_product(layout):
+    if layout == 'point-major':
+        def f(x):
+            g = x[:, 0]**-0.5*np.log(x[:, 1])
+            return np.column_stack((g, x[:, 0]*x[:, 1]))
+    else:
+        def f(x):
+            return np.array([x[0]**-0.5*np.log(x[1]), x[0]*x[1]])
+
+    val, err = cubature(f, 2, 2, [0, 0], [1, 2], vectorized=True,
+                        adaptive='de', layout=layout, relerr=1e-10, abserr=0)
+    # int_0^2 log(y) dy = 2 log 2 - 2
+    assert val == pytest.approx([2*(2*np.log(2) - 2), 1.], rel=1e-10)
+    assert np.all(err <= 1e-10*np.abs(val))
+
+
+def test_max_eval_and_integrator():
+    tracer = Tracer()
+    val, err = cubature(lambda x: x[:, 0]**-0.5, 1, 1, [0], [1],
+                        vectorized=True, adaptive='de', relerr=1e-15,
+                        abserr=0, maxEval=40, tracer=tracer)
+    assert _npts(tracer) <= 40
+    assert val[0] == pytest.approx(2., abs=err[0])
+
+    integ = Integrator(lambda x, a: x[:, 0]**a, 1, 1, args=(-0.5,),
+                       vectorized=True, adaptive='de', relerr=1e-12,
+                       abserr=0)
+    for a in (-0.5, -0.25, 0.5):
+        val, err = integ.integrate([0], [1], args=(a,))
+        assert val[0] == pytest.approx(1/(1 + a), rel=1e-12)
+    with pytest.raises(ValueError):
+        cubature(lambda x: x[:, 0], 1, 1, [0], [1], vectorized=True,
+                 adaptive='de', dtype=np.float32)
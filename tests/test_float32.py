@@ -0,0 +1,63 @@
+import ctypes
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, GridIntegrand
+
+
+_exact = (np.sqrt(np.pi)*math.erf(1.)/2)**2
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+@pytest.mark.parametrize('layout', ['point-major', 'dim-major'])
+@pytest.mark.parametrize('fdim', [1, 3])
+def test_float32(adaptive, layout, fdim):
+    seen = []
+    axis = 1 if layout == 'point-major' else 0
+    scale = np.arange(1, fdim + 1, dtype=np.float32)
+
+    def f(x):
+        seen.append(x.dtype)
+        g = np.exp(-np.sum(x**2, axis=axis))
+        if fdim == 1:
+            return g
+        return np.outer(g, scale) if axis == 1 else np.outer(scale, g)
+
+    val, err = cubature(f, 2, fdim, [0, 0], [1, 1], vectorized=True,
+                        adaptive=adaptive, layout=layout, relerr=1e-5,
+                        dtype=np.float32)
+    assert set(seen) == {np.dtype(np.float32)}
+    assert val.dtype == np.float64
+    assert val == pytest.approx(_exact*np.arange(1, fdim + 1), rel=1e-5)
+
+
+def test_float32_ctypes():
+    CBTYPE = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_uint, ctypes.c_size_t,
+                              ctypes.POINTER(ctypes.c_float), ctypes.c_void_p,
+                              ctypes.c_uint, ctypes.POINTER(ctypes.c_float))
+
+    def f(ndim, npt, x, fdata, fdim, fval):
+        x = np.ctypeslib.as_array(x, shape=(npt, ndim))
+        fval = np.ctypeslib.as_array(fval, shape=(npt, fdim))
+        fval[:, 0] = x[:, 0]*x[:, 1]
+        return 0
+
+    val, err = cubature(CBTYPE(f), 2, 1, [0, 0], [1, 2], vectorized=True,
+                        dtype=np.float32)
+    assert val[0] == pytest.approx(1., rel=1e-6)
+
+
+def test_float32_invalid():
+    def f(x):
+        return np.sum(x, axis=-1)
+
+    with pytest.raises(ValueError):
+        cubature(f, 2, 1, [0, 0], [1, 1], dtype=np.float32)
+    with pytest.raises(ValueError):
+        cubature(f, 2, 1, [0, 0], [1, 1], vectorized=True, dtype=np.int32)
+    grid = GridIntegrand(np.ones((5, 5)), [np.linspace(0, 1, 5)]*2)
+    with pytest.raises(ValueError):
+        cubature(grid, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 dtype=np.float32)
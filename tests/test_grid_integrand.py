@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from cubature import cubature, GridIntegrand
+
+
+def _multilinear(x, y, z):
+    return 1. + 2*x - y + 0.5*z + x*y - 3*y*z + x*y*z
+
+
+def _grid():
+    ax = [np.linspace(0, 1, 5), np.array([0., 0.1, 0.5, 0.6, 1.]),
+          np.linspace(-1, 1, 4)]
+    X, Y, Z = np.meshgrid(*ax, indexing='ij')
+    return ax, X, Y, Z
+
+
+def _exact_multilinear(xmin, xmax):
+    # midpoint rule is exact for multilinear functions
+    vol = np.prod(np.subtract(xmax, xmin))
+    return _multilinear(*(0.5*(np.add(xmin, xmax)))) * vol
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_linear_exact(adaptive, vectorized):
+    ax, X, Y, Z = _grid()
+    g = GridIntegrand(_multilinear(X, Y, Z), ax)
+    xmin = np.array([0.1, 0.05, -0.7])
+    xmax = np.array([0.9, 0.8, 0.3])
+    val, err = cubature(g, 3, 1, xmin, xmax, adaptive=adaptive,
+                        vectorized=vectorized, relerr=1e-10)
+    # piecewise multilinear: exact up to the adaptive tolerance
+    assert np.allclose(val, _exact_multilinear(xmin, xmax), rtol=1e-6)
+
+
+def test_cubic_polynomial_exact():
+    ax = [np.linspace(0, 2, 6), np.array([-1., -0.3, 0., 0.2, 0.9, 1.])]
+    X, Y = np.meshgrid(*ax, indexing='ij')
+    values = np.stack([X**3 - 2*X*Y**2, Y**3 + X**2], axis=-1)
+    g = GridIntegrand(values, ax, method='cubic')
+    assert g.ndim == 2 and g.fdim == 2
+    x = np.array([[0.3, 0.1], [1.7, -0.8]])
+    expected = np.stack([x[:, 0]**3 - 2*x[:, 0]*x[:, 1]**2,
+                         x[:, 1]**3 + x[:, 0]**2], axis=-1)
+    assert np.allclose(g(x), expected)
+    val, err = cubature(g, 2, 2, [0, -1], [2, 1], vectorized=True)
+    assert np.allclose(val, [8. - 8./3, 16./3])
+
+
+def test_memmap_zero_copy(tmp_path):
+    ax, X, Y, Z = _grid()
+    data = np.lib.format.open_memmap(tmp_path / 'grid.npy', mode='w+',
+                                     dtype=np.float64, shape=X.shape)
+    data[...] = _multilinear(X, Y, Z)
+    data.flush()
+    del data
+    mm = np.load(tmp_path / 'grid.npy', mmap_mode='r')
+    g = GridIntegrand(mm, ax)
+    assert np.shares_memory(g.values, mm)
+    val, err = cubature(g, 3, 1, [0, 0, -1], [1, 1, 1])
+    assert np.allclose(val, _exact_multilinear([0, 0, -1], [1, 1, 1]))
+
+
+def test_outside_grid_fails():
+    ax, X, Y, Z = _grid()
+    g = GridIntegrand(X, ax)
+    with pytest.raises(ValueError, match='outside'):
+        g([[2., 0., 0.]])
+    with pytest.raises(RuntimeError):
+        cubature(g, 3, 1, [0, 0, 0], [2, 1, 1])
+
+
+def test_invalid_grid():
+    ax, X, Y, Z = _grid()
+    with pytest.raises(ValueError, match='does not match'):
+        GridIntegrand(X, ax[:2] + [np.linspace(0, 1, 3)])
+    with pytest.raises(ValueError, match='increasing'):
+        GridIntegrand(X, ax[:2] + [np.array([0., 2., 1., 3.])])
+    with pytest.raises(ValueError, match='fdim'):
+        cubature(GridIntegrand(X, ax), 3, 2, [0, 0, 0], [1, 1, 1])
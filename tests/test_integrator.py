@@ -0,0 +1,123 @@
+import ctypes
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Integrator, GridIntegrand
+
+
+def _gauss(x, a):
+    return np.exp(-a*np.sum(x**2, axis=-1))
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+@pytest.mark.parametrize('vectorized', [True, False])
+@pytest.mark.parametrize('ndim', [1, 2])
+def test_same_as_cubature(adaptive, vectorized, ndim):
+    integ = Integrator(_gauss, ndim, 1, args=(1.,), adaptive=adaptive,
+                       vectorized=vectorized, relerr=1e-8)
+    for a, b, c in [(0., 1., 1.), (-1., 2., 3.), (0.5, 0.7, 1.), (0., 1., 1.)]:
+        xmin, xmax = [a]*ndim, [b]*ndim
+        val, err = integ.integrate(xmin, xmax, args=(c,))
+        val2, err2 = cubature(_gauss, ndim, 1, xmin, xmax, args=(c,),
+                              adaptive=adaptive, vectorized=vectorized,
+                              relerr=1e-8)
+        assert val == pytest.approx(val2, rel=1e-15)
+        assert err == pytest.approx(err2, rel=1e-15)
+        exact = (np.sqrt(np.pi/(4*c))*(math.erf(np.sqrt(c)*b)
+                                       - math.erf(np.sqrt(c)*a)))**ndim
+        assert val[0] == pytest.approx(exact, rel=1e-7)
+
+
+def test_default_args_and_kwargs():
+    def f(x, a, scale=1.):
+        return scale*np.exp(-a*x[:, 0]**2)
+
+    integ = Integrator(f, 1, 1, args=(1.,), kwargs={'scale': 2.},
+                       vectorized=True, full_output=True)
+    v1, _, info = integ.integrate([0], [1])
+    assert info['status'] == 'success'
+    v2, _, _ = integ.integrate([0], [1], args=(2.,), kwargs={})
+    v3, _, _ = integ.integrate([0], [1])
+    assert v3[0] == v1[0]
+    assert v2[0] == pytest.approx(
+        np.sqrt(np.pi/8)*math.erf(np.sqrt(2)), rel=1e-10)
+
+
+def test_check_at_first_integration_only():
+    calls = []
+
+    def f(x):
+        calls.append(x.shape)
+        return np.ones((x.shape[0], 2))
+
+    integ = Integrator(f, 2, 2, vectorized=True, rule='degree3')
+    integ.integrate([0, 0], [1, 1])
+    integ.integrate([0, 0], [2, 1])
+    assert calls.count((7, 2)) == 1
+
+    bad = Integrator(f, 2, 3, vectorized=True)
+    with pytest.raises(ValueError):
+        bad.integrate([0, 0], [1, 1])
+    with pytest.raises(ValueError):
+        integ.integrate([0, 0, 0], [1, 1, 1])
+
+
+def test_nested():
+    inner = Integrator(lambda y, x: np.exp(-x*y[:, 0]), 1, 1,
+                       vectorized=True, relerr=1e-10)
+
+    def f(x):
+        return inner.integrate([0], [1], args=(x[0],))[0][0]
+
+    outer_val, err = cubature(f, 1, 1, [1], [2], relerr=1e-9)
+    inner_val = [inner.integrate([0], [1], args=(x,))[0][0]
+                 for x in (1., 2.)]
+    # int_1^2 (1 - exp(-x))/x dx
+    exact = 0.5226637568724861
+    assert outer_val[0] == pytest.approx(exact, rel=1e-8)
+    assert inner_val == pytest.approx([1 - np.exp(-1), (1 - np.exp(-2))/2])
+
+    # an Integrator used from within its own integrand
+    def g(x):
+        if x[0] < 0.25:
+            return 1. + nested.integrate([0.5], [1])[0][0]
+        return 1. + x[0]
+
+    nested = Integrator(g, 1, 1)
+    val, err = nested.integrate([0.5], [1])
+    assert val[0] == pytest.approx(0.875)
+    val, err = nested.integrate([0], [1])
+    assert val[0] == pytest.approx(0.25*1.875 + 0.75 + 0.46875, rel=1e-8)
+
+
+def test_ctypes_and_float32():
+    CBTYPE = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_uint, ctypes.c_size_t,
+                              ctypes.POINTER(ctypes.c_float), ctypes.c_void_p,
+                              ctypes.c_uint, ctypes.POINTER(ctypes.c_float))
+
+    def f(ndim, npt, x, fdata, fdim, fval):
+        x = np.ctypeslib.as_array(x, shape=(npt, ndim))
+        fval = np.ctypeslib.as_array(fval, shape=(npt, fdim))
+        fval[:, 0] = x[:, 0]*x[:, 1]
+        return 0
+
+    integ = Integrator(CBTYPE(f), 2, 1, vectorized=True, dtype=np.float32)
+    for b in (1., 2.):
+        val, err = integ.integrate([0, 0], [b, 2])
+        assert val[0] == pytest.approx(b**2, rel=1e-6)
+    with pytest.raises(ValueError):
+        integ.integrate([0, 0], [1, 1], args=(1.,))
+
+
+def test_invalid_options():
+    grid = GridIntegrand(np.ones((5, 5)), [np.linspace(0, 1, 5)]*2)
+    with pytest.raises(ValueError):
+        Integrator(grid, 2, 1)
+    with pytest.raises(ValueError):
+        Integrator(_gauss, 2, 1, adaptive='x')
+    with pytest.raises(ValueError):
+        Integrator(_gauss, 2, 1, rule='degree5', adaptive='p')
+    with pytest.raises(ValueError):
+        Integrator(_gauss, 2, 1, timeout=-1)
@@ -38,3 +38,13 @@ def test_vcall_narg():
 
     a = Integrand(func, ndim, fdim, args=(2, 3, 'a'), kwargs={'kw1': 1, 'kw2': 2})
     a.vcall(np.zeros((1000, 1,), dtype=float))
+
+def test_vcall_dim_major():
+    ndim = 2
+    fdim = 3
+    def func(x):
+        return np.stack([x[0], x[1], x[0]*x[1]])
+
+    a = Integrand(func, ndim, fdim, args=(), kwargs={}, dim_major=True)
+    x = np.arange(10.).reshape(ndim, 5)
+    assert np.allclose(a.vcall(x), func(x))
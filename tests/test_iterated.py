@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+import pytest
+
+from cubature import cubature
+
+
+def _half_disk(x):
+    return np.sqrt(1 - x[:, 0]**2)
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p', 'de'])
+def test_quarter_disk(adaptive):
+    calls = []
+
+    def f(x):
+        calls.append(x.shape[0])
+        return np.column_stack((np.ones(x.shape[0]), x[:, 1]))
+
+    val, err = cubature(f, 2, 2, [0, 0], [1, _half_disk], vectorized=True,
+                        adaptive=adaptive, relerr=1e-8)
+    # area and first moment in y of the quarter disk
+    assert val == pytest.approx([np.pi/4, 1/3], rel=1e-8)
+    # one call per batch of inner points, for a whole outer batch
+    assert len(calls) < 100
+
+
+def test_limits_of_inner_dimensions():
+    # tetrahedron x + y + z <= 1, with the limits of z depending on x and y
+    def f(x):
+        return np.array([np.ones(x.shape[1]), x[0], x[2]**-0.5])
+
+    val, err = cubature(f, 3, 3, [0, 0, 0],
+                        [1, lambda x: 1 - x[:, 0],
+                         lambda x: 1 - x[:, 0] - x[:, 1]],
+                        vectorized=True, layout='dim-major', adaptive='de',
+                        relerr=1e-10)
+    # int z^-0.5 over the tetrahedron = int_0^1 z^-0.5 (1-z)^2/2 dz
+    assert val == pytest.approx([1/6, 1/24, 8/15], rel=1e-9)
+
+    # callable lower limits, and a constant inner dimension
+    val, err = cubature(lambda x: x[:, 2], 3, 1, [0, lambda x: x[:, 0], 0],
+                        [1, 1, 2], vectorized=True, relerr=1e-10)
+    assert val[0] == pytest.approx(1.)
+
+
+def test_same_as_nested():
+    def f(x, a):
+        return np.exp(-a*x[:, 0]*x[:, 1])
+
+    def outer(x):
+        return np.array([cubature(lambda y: f(np.column_stack(
+                             (xi + 0*y[:, 0], y[:, 0])), 2.), 1, 1, [0],
+                             [1 + xi], vectorized=True, relerr=1e-12)[0][0]
+                         for xi in x[:, 0]])
+
+    val, err = cubature(f, 2, 1, [0, 0], [1, lambda x: 1 + x[:, 0]],
+                        args=(2.,), vectorized=True, relerr=1e-10)
+    nested, _ = cubature(outer, 1, 1, [0], [1], vectorized=True,
+                         relerr=1e-10)
+    assert val[0] == pytest.approx(nested[0], rel=1e-10)
+
+
+def test_inner_status_and_error():
+    # an inner singularity that maxEval stops before convergence
+    def f(x):
+        return np.abs(x[:, 1] - 0.3*x[:, 0] - 0.1)**-0.5
+
+    lims = ([0, 0], [1, lambda x: 1 + x[:, 0]])
+    val, err, info = cubature(f, 2, 1, *lims, vectorized=True, relerr=1e-10,
+                              maxEval=200, full_output=True)
+    assert info['status'] == 'inner not converged'
+    val1, err1, info1 = cubature(f, 2, 1, *lims, vectorized=True,
+                                 relerr=1e-6, full_output=True)
+    assert info1['status'] == 'success'
+    assert abs(val[0] - val1[0]) <= err[0]
+
+
+def test_timeout():
+    def f(x):
+        time.sleep(0.005)
+        return np.sqrt(np.abs(x[:, 1] - 0.5*x[:, 0]))
+
+    t0 = time.perf_counter()
+    val, err, info = cubature(f, 2, 1, [0, 0], [1, lambda x: 1 + x[:, 0]],
+                              vectorized=True, relerr=1e-14, abserr=0,
+                              timeout=0.2, full_output=True)
+    # the inner integrals only get what is left of the timeout
+    assert time.perf_counter() - t0 < 0.35
+    assert info['status'] == 'deadline reached'
+
+
+def test_invalid():
+    lims = ([0, 0], [1, _half_disk])
+    with pytest.raises(ValueError):
+        cubature(lambda x: x[0], 2, 1, *lims)
+    with pytest.raises(ValueError):
+        cubature(lambda x: x[:, 0], 2, 1, *lims, vectorized=True,
+                 adaptive='vegas')
+    with pytest.raises(ValueError):
+        cubature(lambda x: x[:, 0], 2, 1, [0, 0], [_half_disk, 1],
+                 vectorized=True)
@@ -0,0 +1,97 @@
+import ctypes
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Integrator, Tracer
+
+
+def _gauss(x):
+    return np.exp(-20*np.sum((x - 0.3)**2, axis=1))
+
+
+def _gauss_dim_major(x):
+    return np.exp(-20*np.sum((x - 0.3)**2, axis=0))
+
+
+def _compare(ndim, **kw):
+    # the pipeline refines the same regions as without it
+    tracers = [Tracer(), Tracer()]
+    out = [cubature(_gauss, ndim, 1, [0]*ndim, [1]*ndim, vectorized=True,
+                    full_output=True, pipeline=pipeline, tracer=tracer, **kw)
+           for pipeline, tracer in zip((False, True), tracers)]
+    (val1, err1, info1), (val2, err2, info2) = out
+    assert val2[0] == pytest.approx(val1[0], rel=1e-13)
+    assert err2[0] == pytest.approx(err1[0], rel=1e-10)
+    assert ([it['npts'] for it in tracers[1].iterations]
+            == [it['npts'] for it in tracers[0].iterations])
+    assert 'speculative' not in info1
+    assert 0 <= info2['discarded'] <= info2['speculative']
+    return info2
+
+
+@pytest.mark.parametrize('ndim', [1, 2, 3])
+def test_same_refinement(ndim):
+    info = _compare(ndim, relerr=1e-9 if ndim < 3 else 1e-6)
+    if ndim > 1:
+        assert info['speculative'] > info['discarded']
+
+
+def test_options():
+    _compare(2, relerr=1e-8, split=2)
+    _compare(2, relerr=1e-8, rule='degree5', compact=True)
+    _compare(2, relerr=1e-8, maxEval=5000)
+    _compare(2, relerr=1e-8, points=[[0.5], None])
+
+
+def test_sequential_and_dim_major():
+    f = lambda x: np.exp(-20*np.sum((x - 0.3)**2))
+    val1, err1 = cubature(f, 2, 1, [0, 0], [1, 1], relerr=1e-7)
+    val2, err2 = cubature(f, 2, 1, [0, 0], [1, 1], relerr=1e-7,
+                          pipeline=True)
+    assert val2[0] == pytest.approx(val1[0], rel=1e-13)
+
+    val3, err3 = cubature(_gauss_dim_major, 2, 1, [0, 0], [1, 1],
+                          vectorized=True, layout='dim-major', relerr=1e-7,
+                          pipeline=True)
+    assert val3[0] == pytest.approx(val1[0], rel=1e-7)
+
+
+def test_simplex_and_integrator():
+    f = lambda x: x[:, 0]*x[:, 1]
+    val, err = cubature(f, 2, 1, None, None, vectorized=True,
+                        simplex=[[0, 0], [1, 0], [0, 1]], pipeline=True)
+    assert val[0] == pytest.approx(1/24.)
+
+    integ = Integrator(_gauss, 2, 1, vectorized=True, relerr=1e-8,
+                       pipeline=True, full_output=True)
+    for _ in range(2):
+        val, err, info = integ.integrate([0, 0], [1, 1])
+        assert val[0] == pytest.approx(0.14813328, rel=1e-7)
+        assert info['speculative'] > 0
+
+
+def test_raw_callback():
+    # without the GIL, the integrand runs alongside the worker
+    cfunc = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_uint,
+                             ctypes.POINTER(ctypes.c_double), ctypes.c_void_p,
+                             ctypes.c_uint, ctypes.POINTER(ctypes.c_double))
+
+    @cfunc
+    def f(ndim, x, fdata, fdim, fval):
+        fval[0] = x[0]*x[0]*x[1]
+        return 0
+
+    val, err, info = cubature(f, 2, 1, [0, 0], [1, 2], full_output=True,
+                              pipeline=True)
+    assert val[0] == pytest.approx(2/3.)
+    assert info['status'] == 'success'
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        cubature(_gauss, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 adaptive='p', pipeline=True)
+    with pytest.raises(ValueError):
+        Integrator(_gauss, 2, 1, vectorized=True, adaptive='p',
+                   pipeline=True)
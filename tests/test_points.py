@@ -0,0 +1,128 @@
+import ctypes
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Tracer
+from cubature.cubature import _breakpoints
+
+
+def _npts(tracer):
+    return sum(it['npts'] for it in tracer.iterations)
+
+
+def _step(x):
+    # discontinuous along x[0] = 0.37 and x[1] = 0.61
+    return ((x[:, 0] > 0.37) & (x[:, 1] < 0.61)).astype(np.float64)
+
+
+def _inv_sqrt(x):
+    return 1/np.sqrt(np.abs(x[:, 0] - 0.3))
+
+
+_inv_sqrt_exact = 2*np.sqrt(0.3) + 2*np.sqrt(0.7)
+
+
+def test_breakpoints_seed_cells():
+    tracer = Tracer()
+    val, err = cubature(_step, 2, 1, [0, 0], [1, 1], vectorized=True,
+                        points=[[0.37], [0.61]], tracer=tracer)
+    assert val[0] == pytest.approx(0.63*0.61, rel=1e-12)
+    first = tracer.iterations[0]
+    assert first['nregions'] == 4
+    # the four cells are exact at once
+    assert len(tracer.iterations) == 1
+
+    # without the breakpoints the discontinuities take many refinements
+    plain = Tracer()
+    cubature(_step, 2, 1, [0, 0], [1, 1], vectorized=True, maxEval=20000,
+             tracer=plain)
+    assert _npts(plain) > 50*_npts(tracer)
+
+
+def test_kink_1d():
+    def f(x):
+        return abs(x[0] - 1/3.)
+
+    plain = Tracer()
+    cubature(f, 1, 1, [0], [1], relerr=1e-12, tracer=plain)
+    tracer = Tracer()
+    val, err = cubature(f, 1, 1, [0], [1], relerr=1e-12, points=[1/3.],
+                        tracer=tracer)
+    assert val[0] == pytest.approx(5/18., rel=1e-13)
+    assert _npts(tracer) < _npts(plain)/10
+
+
+def test_points_outside_and_on_bounds_are_ignored():
+    breaks, cells = _breakpoints([[-1, 0, 0.5, 0.5, 2], None], None, 0, 2,
+                                 np.array([0., 0.]), np.array([1., 1.]))
+    assert breaks[0].tolist() == [0.5]
+    assert breaks[1].size == 0
+    assert cells == []
+
+    val, err = cubature(_step, 2, 1, [0, 0], [1, 1], vectorized=True,
+                        points=[[-1, 0, 0.37, 1], None],
+                        singular=[None, [0.61, 3]])
+    assert val[0] == pytest.approx(0.63*0.61, rel=1e-12)
+
+
+def test_grading():
+    breaks, cells = _breakpoints(None, [[0.5]], 2, 1, np.array([0.]),
+                                 np.array([1.]))
+    assert breaks[0] == pytest.approx([0.5 - 0.5/4, 0.5 - 0.5/16, 0.5,
+                                       0.5 + 0.5/16, 0.5 + 0.5/4])
+    assert cells == [(0, 0.5, 0.5 - 0.5/16), (0, 0.5, 0.5 + 0.5/16)]
+
+    tracer = Tracer()
+    cubature(_inv_sqrt, 1, 1, [0], [1], vectorized=True, relerr=1e-6,
+             singular=[[0.3]], grading=3, tracer=tracer)
+    assert tracer.iterations[0]['nregions'] == 8
+
+
+@pytest.mark.parametrize('vectorized, layout', [
+    (True, 'point-major'), (True, 'dim-major'), (False, 'point-major')])
+def test_clustering(vectorized, layout):
+    if not vectorized:
+        def f(x):
+            return 1/np.sqrt(abs(x[0] - 0.3))
+    elif layout == 'dim-major':
+        def f(x):
+            return 1/np.sqrt(np.abs(x[0] - 0.3))
+    else:
+        f = _inv_sqrt
+    tracer = Tracer()
+    val, err = cubature(f, 1, 1, [0], [1], vectorized=vectorized,
+                        layout=layout, relerr=1e-12, abserr=0,
+                        singular=[[0.3]], clustering=True, tracer=tracer)
+    assert val[0] == pytest.approx(_inv_sqrt_exact, rel=1e-12)
+    assert _npts(tracer) < 1000
+
+
+def test_clustering_2d_fdim2():
+    def f(x):
+        g = np.log(np.abs(x[:, 0] - 0.2))
+        return np.column_stack((g*np.cos(x[:, 1]), g))
+
+    g_exact = 0.2*np.log(0.2) + 0.8*np.log(0.8) - 1
+    val, err = cubature(f, 2, 2, [0, 0], [1, 1], vectorized=True,
+                        relerr=1e-10, singular=[[0.2], None],
+                        clustering=True)
+    assert val == pytest.approx([g_exact*np.sin(1), g_exact], rel=1e-9)
+
+
+def test_invalid_points():
+    with pytest.raises(ValueError):
+        cubature(_step, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 points=[[0.5]])
+    with pytest.raises(ValueError):
+        cubature(_step, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 points=[[0.5], None], adaptive='p')
+    with pytest.raises(ValueError):
+        cubature(_step, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 singular=[[0.5], None], grading=-1)
+    with pytest.raises(ValueError):
+        cubature(_step, 2, 1, [-1, -1], [1, 1], vectorized=True,
+                 points=[[0.5], None], symmetry={'permutation': [[0, 1]]})
+    cfunc = ctypes.CFUNCTYPE(ctypes.c_int)(lambda: 0)
+    with pytest.raises(ValueError):
+        cubature(cfunc, 1, 1, [0], [1], singular=[[0.5]], clustering=True)
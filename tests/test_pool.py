@@ -0,0 +1,108 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from cubature import cubature, SharedMemoryPool
+
+
+def integrand(x, a, scale=1.):
+    return scale*np.stack([np.cos(a*x[:, 0])*x[:, 1], np.exp(-x[:, 0]*x[:, 1])],
+                          axis=1)
+
+
+def integrand_dim_major(x, a):
+    return np.stack([np.cos(a*x[0])*x[1], np.exp(-x[0]*x[1])])
+
+
+def integrand_scalar(x):
+    return np.sqrt(x[:, 0] + x[:, 1])
+
+
+def integrand_float32(x):
+    assert x.dtype == np.float32
+    return np.exp(-x[:, 0]*x[:, 1]*x[:, 2])
+
+
+def constant_integrand(x, c):
+    return np.full(x.shape[0], c)
+
+
+def pid_integrand(x):
+    return np.full(x.shape[0], float(os.getpid()))
+
+
+_MAIN_PID = os.getpid()
+
+
+def failing_integrand(x):
+    if os.getpid() != _MAIN_PID:
+        raise ZeroDivisionError('boom')
+    return x[:, 0]
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with SharedMemoryPool(3) as p:
+        yield p
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+def test_pool_matches_serial(pool, adaptive):
+    kw = dict(args=(3.,), kwargs={'scale': 2.}, vectorized=True,
+              adaptive=adaptive, relerr=1e-10)
+    val, err = cubature(integrand, 2, 2, [0, 0], [2, 1], **kw)
+    val2, err2 = cubature(integrand, 2, 2, [0, 0], [2, 1], pool=pool, **kw)
+    assert np.array_equal(val, val2)
+    assert np.array_equal(err, err2)
+
+
+def test_pool_dim_major_and_scalar(pool):
+    val, err = cubature(integrand_dim_major, 2, 2, [0, 0], [2, 1], args=(3.,),
+                        vectorized=True, layout='dim-major', pool=pool)
+    val2, err2 = cubature(integrand, 2, 2, [0, 0], [2, 1], args=(3.,),
+                          vectorized=True)
+    assert np.allclose(val, val2, rtol=1e-12)
+    val, err = cubature(integrand_scalar, 2, 1, [0, 0], [1, 1],
+                        vectorized=True, pool=pool)
+    assert np.allclose(val, 4*(2**2.5 - 2)/15)
+
+
+def test_pool_float32(pool):
+    kw = dict(vectorized=True, dtype=np.float32, relerr=1e-5)
+    val, err = cubature(integrand_float32, 3, 1, np.zeros(3), np.ones(3), **kw)
+    val2, err2 = cubature(integrand_float32, 3, 1, np.zeros(3), np.ones(3),
+                          pool=pool, **kw)
+    assert np.array_equal(val, val2)
+    assert np.array_equal(err, err2)
+
+
+def test_pool_concurrent_integrations(pool):
+    # each integration keeps its own integrand while the other one runs
+    results = {}
+
+    def run(c):
+        results[c] = [cubature(constant_integrand, 2, 1, [0, 0], [1, 1],
+                               args=(c,), vectorized=True, pool=pool)[0][0]
+                      for _ in range(20)]
+
+    threads = [threading.Thread(target=run, args=(c,)) for c in (1., 2.)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {1.: [1.]*20, 2.: [2.]*20}
+
+
+def test_pool_uses_workers(pool):
+    val, err = cubature(pid_integrand, 1, 1, [0], [1], vectorized=True,
+                        pool=pool)
+    assert val[0] != os.getpid()
+
+
+def test_pool_errors(pool):
+    with pytest.raises(RuntimeError, match='ZeroDivisionError'):
+        cubature(failing_integrand, 1, 1, [0], [1], vectorized=True, pool=pool)
+    with pytest.raises(ValueError, match='vectorized'):
+        cubature(lambda x: x[0], 1, 1, [0], [1], pool=pool)
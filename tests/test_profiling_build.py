@@ -0,0 +1,58 @@
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+import cubature
+
+
+def _pyx_events(func):
+    # the trace events of the lines of the extension during func()
+    events = []
+
+    def tracer(frame, event, arg):
+        if frame.f_code.co_filename.endswith('.pyx'):
+            events.append(event)
+        return tracer
+
+    sys.settrace(tracer)
+    try:
+        func()
+    finally:
+        sys.settrace(None)
+    return events
+
+
+def _integrate():
+    return cubature.cubature(lambda x: x[:, 0]**2, 1, 1, [0], [1],
+                             vectorized=True)
+
+
+def test_switch():
+    val, err = _integrate()
+    assert not _pyx_events(_integrate)
+    try:
+        cubature.use_profiling_build()
+        assert cubature.GridIntegrand.__module__ == 'cubature._cubature_prof'
+        assert 'line' in _pyx_events(_integrate)
+        val2, err2 = _integrate()
+        assert val2[0] == val[0] and err2[0] == err[0]
+
+        grid = cubature.GridIntegrand([0., 1.], [[0., 1.]])
+        integ = cubature.Integrator(lambda x: x[0]**2, 1, 1)
+        assert cubature.cubature(grid, 1, 1, [0], [1])[0][0] \
+            == pytest.approx(0.5)
+        assert integ.integrate([0], [1])[0][0] == pytest.approx(1/3.)
+    finally:
+        cubature.use_profiling_build(False)
+    assert cubature.GridIntegrand.__module__ == 'cubature._cubature'
+    assert not _pyx_events(_integrate)
+
+
+def test_environment():
+    code = 'import cubature; print(cubature.GridIntegrand.__module__)'
+    env = dict(os.environ, CUBATURE_PROFILING='1')
+    out = subprocess.check_output([sys.executable, '-c', code], env=env)
+    assert out.decode().strip() == 'cubature._cubature_prof'
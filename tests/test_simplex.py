@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Tracer
+
+
+_triangle = [[0, 0], [1, 0], [0, 1]]
+_tetrahedron = [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]]
+
+
+def _monomial_exact(powers):
+    # integral of prod x_i**p_i over the unit simplex
+    n = len(powers)
+    return (np.prod([math.factorial(p) for p in powers])
+            / math.factorial(sum(powers) + n))
+
+
+@pytest.mark.parametrize('vertices, powers', [
+    (_triangle, (3, 4)), (_triangle, (0, 7)), (_tetrahedron, (2, 2, 3))])
+def test_degree7_exact(vertices, powers):
+    def f(x):
+        return np.prod(x**np.array(powers), axis=1)
+
+    # a single evaluation of the rule, without refinement
+    npts = sum(math.comb(len(powers) + k, k) for k in range(4))
+    val, err = cubature(f, len(powers), 1, None, None, vectorized=True,
+                        simplex=vertices, maxEval=npts)
+    assert val[0] == pytest.approx(_monomial_exact(powers), rel=1e-13)
+    assert err[0] > 1e-6*val[0]  # the degree 5 rule is not exact
+
+
+def test_affine_and_union():
+    # the square [0, 2]**2 split into two triangles
+    tris = [[[0, 0], [2, 0], [2, 2]], [[0, 0], [2, 2], [0, 2]]]
+
+    def f(x):
+        return np.exp(x[:, 0] - x[:, 1])
+
+    val, err = cubature(f, 2, 1, None, None, vectorized=True, simplex=tris,
+                        relerr=1e-10)
+    exact = (np.exp(2) - 1)*(1 - np.exp(-2))
+    assert val[0] == pytest.approx(exact, rel=1e-10)
+    val2, err2 = cubature(f, 2, 1, [0, 0], [2, 2], vectorized=True,
+                          relerr=1e-10)
+    assert val[0] == pytest.approx(val2[0], rel=1e-10)
+
+
+def test_fewer_points_than_duffy():
+    def f(x):
+        return np.exp(x[:, 0] + 2*x[:, 1])*np.cos(3*x[:, 0])
+
+    tracer = Tracer()
+    val, err = cubature(f, 2, 1, None, None, vectorized=True,
+                        simplex=_triangle, relerr=1e-10, tracer=tracer)
+    npts = sum(it['npts'] for it in tracer.iterations)
+
+    def duffy(u):
+        # the unit square mapped to _triangle, of Jacobian u[:, 0]
+        x = np.column_stack((u[:, 0]*(1 - u[:, 1]), u[:, 0]*u[:, 1]))
+        return u[:, 0]*f(x)
+
+    tracer = Tracer()
+    val2, err2 = cubature(duffy, 2, 1, [0, 0], [1, 1], vectorized=True,
+                          relerr=1e-10, tracer=tracer)
+    assert val[0] == pytest.approx(val2[0], rel=1e-9)
+    assert 2*npts < sum(it['npts'] for it in tracer.iterations)
+
+    # 1/r at a vertex
+    val, err = cubature(lambda x: 1/np.hypot(x[:, 0], x[:, 1]), 2, 1, None,
+                        None, vectorized=True, simplex=_triangle,
+                        relerr=1e-8)
+    assert val[0] == pytest.approx(np.sqrt(2)*np.log(1 + np.sqrt(2)),
+                                   rel=1e-8)
+
+
+@pytest.mark.parametrize('vectorized, layout', [
+    (True, 'point-major'), (True, 'dim-major'), (False, 'point-major')])
+def test_fdim2_layouts(vectorized, layout):
+    if not vectorized:
+        def f(x):
+            return np.array([np.sin(x[0] + x[1] + x[2]), 1.])
+    elif layout == 'dim-major':
+        def f(x):
+            return np.array([np.sin(x[0] + x[1] + x[2]), np.ones_like(x[0])])
+    else:
+        def f(x):
+            return np.column_stack((np.sin(x.sum(axis=1)),
+                                    np.ones(x.shape[0])))
+
+    val, err = cubature(f, 3, 2, None, None, vectorized=vectorized,
+                        layout=layout, simplex=_tetrahedron, relerr=1e-10)
+    # int_0^1 sin(s) s**2/2 ds, s = x + y + z
+    exact = (np.sin(1)*2 + np.cos(1) - 2)/2
+    assert val == pytest.approx([exact, 1/6.], rel=1e-10)
+
+
+def test_invalid_simplex():
+    def f(x):
+        return np.ones(x.shape[0])
+
+    with pytest.raises(ValueError):
+        cubature(f, 2, 1, [0, 0], [1, 1], vectorized=True, simplex=_triangle)
+    with pytest.raises(ValueError):
+        cubature(f, 2, 1, None, None, vectorized=True, simplex=_tetrahedron)
+    with pytest.raises(ValueError):
+        cubature(f, 2, 1, None, None, vectorized=True, simplex=_triangle,
+                 adaptive='p')
+    with pytest.raises(ValueError):
+        cubature(f, 2, 1, None, None, vectorized=True, simplex=_triangle,
+                 rule='degree3')
+    with pytest.raises(ValueError):
+        cubature(f, 2, 1, None, None, vectorized=True, simplex=_triangle,
+                 dtype=np.float32)
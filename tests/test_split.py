@@ -0,0 +1,78 @@
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Integrator, Tracer
+
+
+def _gauss(x):
+    return np.exp(-20*np.sum((x - 0.3)**2, axis=1))
+
+
+def _exact(ndim):
+    return (math.sqrt(math.pi/20)/2*(math.erf(math.sqrt(20)*0.7)
+                                     + math.erf(math.sqrt(20)*0.3)))**ndim
+
+
+@pytest.mark.parametrize('rule', ['default', 'degree5'])
+@pytest.mark.parametrize('ndim', [1, 2, 3])
+def test_fewer_calls(ndim, rule):
+    if ndim != 2 and rule != 'default':
+        return  # Gauss-Kronrod in 1d, too slow in 3d
+    calls = []
+
+    def f(x):
+        calls.append(x.shape[0])
+        return _gauss(x)
+
+    ncalls = []
+    for split in (1, 2, 3):
+        del calls[:]
+        val, err = cubature(f, ndim, 1, [0]*ndim, [1]*ndim, vectorized=True,
+                            relerr=1e-8, abserr=0, rule=rule, split=split)
+        assert val[0] == pytest.approx(_exact(ndim), rel=1e-8)
+        assert err[0] <= 1e-8*val[0]
+        ncalls.append(len(calls))
+    assert ncalls[1] < ncalls[0] and ncalls[2] <= ncalls[1]
+
+
+def test_pieces():
+    # the batches of the first iteration: 2**split pieces of the domain
+    tracer = Tracer()
+    cubature(_gauss, 3, 1, [0]*3, [1]*3, vectorized=True, relerr=1e-2,
+             split=3, tracer=tracer)
+    it = tracer.iterations
+    assert it[0]['nregions'] == 1 and it[1]['nregions'] == 8
+    assert it[1]['npts'] == 8*it[0]['npts']
+
+    # more halvings than dimensions
+    tracer = Tracer()
+    val, err = cubature(_gauss, 1, 1, [0], [1], vectorized=True, split=4,
+                        tracer=tracer)
+    assert tracer.iterations[1]['nregions'] == 16
+    assert val[0] == pytest.approx(_exact(1), rel=1e-10)
+
+
+def test_simplex_and_integrator():
+    f = lambda x: x[:, 0]*x[:, 1]
+    val, err = cubature(f, 2, 1, None, None, vectorized=True,
+                        simplex=[[0, 0], [1, 0], [0, 1]], split=3)
+    assert val[0] == pytest.approx(1/24.)
+
+    integ = Integrator(_gauss, 2, 1, vectorized=True, relerr=1e-8, split=2)
+    for _ in range(2):
+        val, err = integ.integrate([0, 0], [1, 1])
+        assert val[0] == pytest.approx(_exact(2), rel=1e-8)
+
+
+def test_invalid():
+    for split in (0, 7):
+        with pytest.raises(ValueError):
+            cubature(_gauss, 2, 1, [0, 0], [1, 1], vectorized=True,
+                     split=split)
+    with pytest.raises(ValueError):
+        cubature(_gauss, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 adaptive='p', split=2)
+    with pytest.raises(ValueError):
+        Integrator(_gauss, 2, 1, vectorized=True, adaptive='p', split=2)
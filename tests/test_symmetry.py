@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Tracer
+
+
+def _gauss_exact(ndim):
+    return (np.sqrt(np.pi)*math.erf(1.))**ndim
+
+
+def _gauss(x):
+    return np.exp(-np.sum(x**2, axis=-1))
+
+
+def _gauss_dim_major(x):
+    return np.exp(-np.sum(x**2, axis=0))
+
+
+def _npts(tracer):
+    return sum(it['npts'] for it in tracer.iterations)
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+@pytest.mark.parametrize('vectorized, layout, func', [
+    (True, 'point-major', _gauss),
+    (True, 'dim-major', _gauss_dim_major),
+    (False, 'point-major', _gauss)])
+@pytest.mark.parametrize('symmetry', [
+    {'even': [0, 1, 2]},
+    {'permutation': [[0, 1, 2]]},
+    {'permutation': [[0, 2]]},
+    {'even': [0, 1, 2], 'permutation': [[0, 1, 2]]}])
+def test_symmetric_gauss(adaptive, vectorized, layout, func, symmetry):
+    val, err = cubature(func, 3, 1, -np.ones(3), np.ones(3), relerr=1e-7,
+                        adaptive=adaptive, vectorized=vectorized,
+                        layout=layout, symmetry=symmetry)
+    assert val[0] == pytest.approx(_gauss_exact(3), rel=1e-6)
+
+
+def test_even_fewer_evaluations():
+    full, reduced = Tracer(), Tracer()
+    v1, e1 = cubature(_gauss, 4, 1, -np.ones(4), np.ones(4), relerr=1e-8,
+                      vectorized=True, tracer=full)
+    v2, e2 = cubature(_gauss, 4, 1, -np.ones(4), np.ones(4), relerr=1e-8,
+                      vectorized=True, symmetry={'even': range(4)},
+                      tracer=reduced)
+    assert v2[0] == pytest.approx(v1[0], rel=1e-7)
+    assert _npts(reduced) < _npts(full)/8
+
+
+def test_periodic():
+    f = lambda x: np.array([np.cos(x[0])**2 * (1 + x[1]),
+                            np.sin(3*x[0])**2])
+    tracer = Tracer()
+    val, err = cubature(f, 2, 2, [0, 0], [6*np.pi, 1], relerr=1e-10,
+                        symmetry={'periodic': {0: np.pi}}, tracer=tracer)
+    assert np.allclose(val, [3*np.pi*1.5, 3*np.pi], rtol=1e-9)
+    assert tracer.events[-1][4]['ndim'] == 2
+
+
+def test_permutation_vector_valued():
+    # the components are symmetric under the exchange of x0 and x1
+    f = lambda x: np.stack([x[:, 0]*x[:, 1]*x[:, 2],
+                            x[:, 0]**2 + x[:, 1]**2], axis=1)
+    val, err = cubature(f, 3, 2, [0, 0, 0], [1, 1, 2], vectorized=True,
+                        symmetry={'permutation': [[0, 1]]})
+    assert np.allclose(val, [0.5, 4./3], rtol=1e-8)
+
+
+def test_abserr_applies_to_full_domain():
+    val, err = cubature(_gauss, 2, 1, -np.ones(2), np.ones(2), abserr=1e-4,
+                        relerr=0, vectorized=True,
+                        symmetry={'even': [0, 1], 'permutation': [[0, 1]]})
+    assert err[0] <= 1e-4
+    assert val[0] == pytest.approx(_gauss_exact(2), abs=1e-4)
+
+
+def test_invalid_symmetry():
+    f = lambda x: x[0]*x[1]
+    with pytest.raises(ValueError, match='unknown symmetry'):
+        cubature(f, 2, 1, [0, 0], [1, 1], symmetry={'odd': [0]})
+    with pytest.raises(ValueError, match='out of range'):
+        cubature(f, 2, 1, [0, 0], [1, 1], symmetry={'even': [2]})
+    with pytest.raises(ValueError, match='same interval'):
+        cubature(f, 2, 1, [0, 0], [1, 2], symmetry={'permutation': [[0, 1]]})
+    with pytest.raises(ValueError, match='multiple of its period'):
+        cubature(f, 2, 1, [0, 0], [1, 1], symmetry={'periodic': {0: 0.3}})
+    with pytest.raises(ValueError, match='periodic'):
+        cubature(f, 2, 1, [0, 0], [1, 1],
+                 symmetry={'periodic': {0: 0.5}, 'even': [0]})
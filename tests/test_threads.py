@@ -0,0 +1,78 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Integrator, GridIntegrand, Tracer
+
+
+def _gauss(x, a):
+    return np.exp(-a*np.sum(x**2, axis=1))
+
+
+def _exact(a, ndim=2):
+    return (np.sqrt(np.pi/(4*a))*math.erf(np.sqrt(a)))**ndim
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+def test_concurrent_cubature(adaptive):
+    a = [1. + 0.25*k for k in range(32)]
+
+    def task(ak):
+        return cubature(_gauss, 2, 1, [0, 0], [1, 1], args=(ak,),
+                        vectorized=True, adaptive=adaptive, relerr=1e-10)[0][0]
+
+    with ThreadPoolExecutor(8) as ex:
+        vals = list(ex.map(task, a))
+    assert vals == [task(ak) for ak in a]
+    assert vals == pytest.approx([_exact(ak) for ak in a], rel=1e-7)
+
+
+def test_concurrent_errors_stay_in_their_thread():
+    def f(x, fail):
+        if fail:
+            raise KeyError(fail)
+        return np.ones(x.shape[0])
+
+    def task(k):
+        try:
+            return cubature(f, 1, 1, [0], [1], args=(k % 2 and k,),
+                            vectorized=True)[0][0]
+        except KeyError as e:
+            return e.args[0]
+
+    with ThreadPoolExecutor(8) as ex:
+        res = list(ex.map(task, range(64)))
+    assert res == [k if k % 2 else 1. for k in range(64)]
+
+
+def test_shared_integrator():
+    integ = Integrator(_gauss, 2, 1, vectorized=True, relerr=1e-10)
+    a = [1. + 0.25*k for k in range(32)]
+
+    def task(ak):
+        return integ.integrate([0, 0], [1, 1], args=(ak,))[0][0]
+
+    with ThreadPoolExecutor(8) as ex:
+        vals = list(ex.map(task, a))
+    assert vals == pytest.approx([_exact(ak) for ak in a], rel=1e-7)
+
+
+def test_concurrent_grid_and_tracer():
+    axes = [np.linspace(0, 1, 33)]*2
+    grid = GridIntegrand(np.add.outer(axes[0], axes[1]), axes)
+    tracer = Tracer()
+
+    def task(b):
+        return cubature(grid, 2, 1, [0, 0], [b, 1], vectorized=True,
+                        tracer=tracer)[0][0]
+
+    b = np.linspace(0.5, 1, 16)
+    with ThreadPoolExecutor(4) as ex:
+        vals = list(ex.map(task, b))
+    assert vals == pytest.approx(b**2/2 + b/2, rel=1e-10)
+    ends = [ev for ev in tracer.events if ev[0] == 'cubature']
+    assert len(ends) == len(b)
+    assert all(ev[4]['status'] == 'success' for ev in ends)
+    assert all(ev[1] <= ev[2] for ev in tracer.events)
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pytest
+
+from cubature import cubature, GridIntegrand, Tracer
+
+
+def _gauss_v(x):
+    return np.exp(-np.sum(x**2, axis=1))
+
+
+@pytest.mark.parametrize('adaptive', ['h', 'p'])
+def test_iterations(adaptive):
+    tracer = Tracer()
+    val, err = cubature(_gauss_v, 2, 1, [-1, -1], [1, 1], adaptive=adaptive,
+                        vectorized=True, relerr=1e-10, tracer=tracer)
+    its = tracer.iterations
+    assert len(its) > 1
+    assert [it['iteration'] for it in its] == list(range(len(its)))
+    calls = [ev for ev in tracer.events if ev[0] == 'integrand']
+    assert len(calls) == len(its)
+    assert sum(ev[4]['npts'] for ev in calls) == sum(it['npts'] for it in its)
+    for call, it in zip(calls, its):
+        assert call[4]['npts'] == it['npts']
+    assert its[-1]['err'] == pytest.approx(err[0])
+    if adaptive == 'h':
+        # one region plus one more per bisection
+        assert its[0]['nregions'] == 1
+        assert all(b['nregions'] > a['nregions'] for a, b in zip(its, its[1:]))
+
+
+def test_untraced_results_unchanged():
+    tracer = Tracer()
+    traced = cubature(_gauss_v, 3, 1, [0]*3, [1]*3, vectorized=True,
+                      tracer=tracer)
+    plain = cubature(_gauss_v, 3, 1, [0]*3, [1]*3, vectorized=True)
+    assert np.all(traced[0] == plain[0]) and np.all(traced[1] == plain[1])
+
+
+def test_scalar_integrand_calls():
+    tracer = Tracer()
+    cubature(lambda x: x[0]**2, 1, 1, [0], [1], tracer=tracer)
+    calls = [ev for ev in tracer.events if ev[0] == 'integrand']
+    assert len(calls) == sum(it['npts'] for it in tracer.iterations)
+
+
+def test_grid_integrand_iterations():
+    ax = [np.linspace(0, 1, 11)]*2
+    X, Y = np.meshgrid(*ax, indexing='ij')
+    tracer = Tracer()
+    cubature(GridIntegrand(X*Y, ax), 2, 1, [0, 0], [1, 1], tracer=tracer)
+    names = {ev[0] for ev in tracer.events}
+    assert names == {'cubature', 'iteration'}
+
+
+def test_chrome_trace(tmpdir):
+    tracer = Tracer()
+    cubature(_gauss_v, 2, 1, [0, 0], [1, 1], vectorized=True, tracer=tracer)
+    cubature(_gauss_v, 2, 1, [0, 0], [1, 1], vectorized=True, adaptive='p',
+             tracer=tracer)
+    fname = str(tmpdir.join('trace.json'))
+    tracer.save(fname)
+    with open(fname) as f:
+        trace = json.load(f)
+    events = trace['traceEvents']
+    runs = [ev for ev in events if ev['name'] == 'cubature']
+    assert [ev['args']['method'] for ev in runs] == ['hcubature_v',
+                                                     'pcubature_v']
+    assert all(ev['args']['status'] == 'success' for ev in runs)
+    # every iteration lies within its integration
+    for ev in events:
+        if ev['name'] == 'iteration':
+            assert any(run['ts'] <= ev['ts'] and
+                       ev['ts'] + ev['dur'] <= run['ts'] + run['dur'] + 1e-3
+                       for run in runs)
+    assert any(ev['ph'] == 'C' and ev['name'] == 'err' for ev in events)
+
+    tracer.clear()
+    assert tracer.to_chrome_trace()['traceEvents'] == []
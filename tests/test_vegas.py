@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+
+from cubature import cubature, Integrator, Tracer
+
+
+def _peak(x):
+    # normalized Gaussian peak, integral erf(2)**ndim over the unit cube
+    ndim = x.shape[1]
+    return (np.exp(-64*np.sum((x - 0.5)**2, axis=1))
+            * (64/np.pi)**(ndim/2.))
+
+
+def test_peak_6d():
+    tracer = Tracer()
+    val, err = cubature(_peak, 6, 1, [0]*6, [1]*6, vectorized=True,
+                        adaptive='vegas', relerr=2e-3, abserr=0, seed=1,
+                        tracer=tracer)
+    assert err[0] <= 2e-3*abs(val[0])
+    assert abs(val[0] - math.erf(4.)**6) < 4*err[0]
+    # the first iteration only trains the grid
+    its = tracer.iterations
+    assert [it['nregions'] for it in its] == list(range(len(its)))
+    assert its[-1]['err'] == pytest.approx(err[0])
+
+
+def test_seed_reproducible():
+    kw = dict(vectorized=True, adaptive='vegas', relerr=1e-2)
+    val1, err1 = cubature(_peak, 3, 1, [0]*3, [1]*3, seed=7, **kw)
+    val2, err2 = cubature(_peak, 3, 1, [0]*3, [1]*3, seed=7, **kw)
+    val3, err3 = cubature(_peak, 3, 1, [0]*3, [1]*3, seed=8, **kw)
+    assert val1[0] == val2[0] and err1[0] == err2[0]
+    assert val1[0] != val3[0]
+
+    integ = Integrator(_peak, 3, 1, seed=7, **kw)
+    assert integ.integrate([0]*3, [1]*3)[0][0] == val1[0]
+    assert integ.integrate([0]*3, [1]*3)[0][0] == val1[0]
+
+
+@pytest.mark.parametrize('vectorized, layout', [
+    (True, 'point-major'), (True, 'dim-major'), (False, 'point-major')])
+def test_fdim2_layouts(vectorized, layout):
+    if not vectorized:
+        def f(x):
+            return np.array([x[0]*x[1], 1.])
+    elif layout == 'dim-major':
+        def f(x):
+            return np.array([x[0]*x[1], np.ones_like(x[0])])
+    else:
+        def f(x):
+            return np.column_stack((x[:, 0]*x[:, 1], np.ones(x.shape[0])))
+
+    maxEval = 20000 if not vectorized else 0
+    val, err = cubature(f, 2, 2, [0, 0], [1, 2], vectorized=vectorized,
+                        layout=layout, adaptive='vegas', relerr=1e-2,
+                        maxEval=maxEval, seed=3)
+    assert val == pytest.approx([1., 2.], abs=4*max(err))
+
+
+def test_max_eval():
+    tracer = Tracer()
+    val, err = cubature(_peak, 4, 1, [0]*4, [1]*4, vectorized=True,
+                        adaptive='vegas', relerr=1e-12, maxEval=40000,
+                        seed=2, tracer=tracer)
+    npts = [it['npts'] for it in tracer.iterations]
+    assert npts == [10000]*4
+    assert val[0] == pytest.approx(math.erf(4.)**4, abs=4*err[0])
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        cubature(_peak, 2, 1, [0, 0], [1, 1], vectorized=True, seed=1)
+    with pytest.raises(ValueError):
+        cubature(_peak, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 adaptive='vegas', seed=-1)
+    with pytest.raises(ValueError):
+        cubature(_peak, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 adaptive='vegas', dtype=np.float32)
+    with pytest.raises(ValueError):
+        cubature(_peak, 2, 1, [0, 0], [1, 1], vectorized=True,
+                 adaptive='vegas', points=[[0.5], None])